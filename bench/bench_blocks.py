@@ -0,0 +1,63 @@
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from main import block_to_block_type, markdown_to_blocks
+
+
+def findall_block_to_block_type(block):
+    # The previous classifier: literal patterns per call and a freshly built
+    # pattern per ordered-list line.
+    if re.findall(r"^#{1,6} .+", block):
+        return "heading"
+    if re.findall(r"^`{3}.+`{3}$", block):
+        return "code"
+    if re.findall(r"^> .+", block):
+        return "quote"
+    lines = [l for l in block.split("\n") if l]
+    if all(re.findall(r"^(\*|-) .+", line) for line in lines):
+        return "unordered_list"
+    if all(re.findall("^" + str(i + 1) + r"\. .+", line) for i, line in enumerate(lines)):
+        return "ordered_list"
+    return "paragraph"
+
+
+def compare(label, blocks, number):
+    for block in blocks:
+        assert block_to_block_type(block) == findall_block_to_block_type(block)
+    before = timeit.timeit(
+        lambda: [findall_block_to_block_type(b) for b in blocks], number=number
+    )
+    after = timeit.timeit(lambda: [block_to_block_type(b) for b in blocks], number=number)
+    print(
+        f"  {label:<28} findall {before / number * 1000:9.3f} ms, "
+        f"compiled {after / number * 1000:9.3f} ms, speedup {before / after:6.2f}x"
+    )
+
+
+def main():
+    ordered = "\n".join(f"{i}. Item number {i}" for i in range(1, 10001))
+    unordered = "\n".join(f"* Item number {i}" for i in range(10000))
+    paragraphs = markdown_to_blocks(
+        "\n\n".join(
+            f"Paragraph {i} of prose that goes on for a while, as docs do."
+            for i in range(10000)
+        )
+    )
+    mixed = markdown_to_blocks(
+        "\n\n".join(
+            f"## Heading {i}\n\nParagraph {i} text.\n\n> Quote {i}\n\n```code {i}```"
+            for i in range(2500)
+        )
+    )
+    compare("10k-item ordered list", [ordered], 5)
+    compare("10k-item unordered list", [unordered], 5)
+    compare("10k paragraphs", paragraphs, 5)
+    compare("10k mixed blocks", mixed, 5)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from build import build
+
+
+PAGE = """# Page {i}
+
+This is **page {i}** with *some* `inline` formatting and a [link](https://example.com/{i}).
+
+* First item
+* Second item
+
+> A short quote
+"""
+
+
+def make_site(root, pages):
+    content = os.path.join(root, "content")
+    for i in range(pages):
+        section = os.path.join(content, f"section{i % 100}")
+        os.makedirs(section, exist_ok=True)
+        with open(os.path.join(section, f"page{i}.md"), "w") as f:
+            f.write(PAGE.format(i=i))
+    template = os.path.join(root, "template.html")
+    with open(template, "w") as f:
+        f.write("<html><title>{{ Title }}</title><body>{{ Content }}</body></html>")
+    return content, os.path.join(root, "public"), template
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    built = fn()
+    print(f"  {label:<16} {time.perf_counter() - start:8.3f} s  ({len(built)} pages)")
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    with tempfile.TemporaryDirectory() as root:
+        content, dest, template = make_site(root, pages)
+        print(f"{pages} pages")
+        timed("full build", lambda: build(content, dest, template))
+        timed("no-op rebuild", lambda: build(content, dest, template))
+        with open(os.path.join(content, "section7", "page7.md"), "a") as f:
+            f.write("\nOne more paragraph.\n")
+        timed("one-file edit", lambda: build(content, dest, template))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import devserver
+from build import build
+from devserver import (
+    DevBuilder,
+    LiveReloadHandler,
+    LiveReloadSite,
+    ReloadBroadcaster,
+    SiteWatcher,
+)
+from staticserver import make_server
+
+
+PAGE = """# Page {i}
+
+Some **bold** text, some *italic* text and a [link](/page{i}).
+
+* one
+* two
+* three
+
+> a quote
+
+```code block```
+"""
+
+
+def make_content(root, pages):
+    for i in range(pages):
+        directory = os.path.join(root, f"section{i % 100}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"page{i}.md"), "w") as f:
+            f.write(PAGE.format(i=i))
+
+
+def open_event_stream(port):
+    sock = socket.create_connection(("127.0.0.1", port))
+    sock.sendall(b"GET /__livereload HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    head = b""
+    while b"\r\n\r\n" not in head:
+        head += sock.recv(4096)
+    return sock
+
+
+def wait_for_reload(sock):
+    data = b""
+    while b"data: reload" not in data:
+        data += sock.recv(4096)
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    edits = 20
+    backend = "watchdog" if devserver.Observer is not None else "polling"
+    sys.stderr = open(os.devnull, "w")
+    with tempfile.TemporaryDirectory() as root:
+        content = os.path.join(root, "content")
+        dest = os.path.join(root, "public")
+        make_content(content, pages)
+        start = time.perf_counter()
+        build(content, dest)
+        print(f"initial build of {pages} pages: {time.perf_counter() - start:.1f} s")
+
+        reloads = ReloadBroadcaster()
+        builder = DevBuilder(content, dest)
+
+        def rebuild(paths):
+            if builder.rebuild(paths):
+                reloads.notify()
+
+        watcher = SiteWatcher(content, None, rebuild)
+        site = LiveReloadSite(dest, reloads)
+        httpd = make_server(
+            site, port=0, mode="threaded", handler_class=LiveReloadHandler
+        )
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        try:
+            latencies = []
+            for edit in range(edits):
+                sock = open_event_stream(httpd.server_address[1])
+                path = os.path.join(content, "section7", "page7.md")
+                start = time.perf_counter()
+                with open(path, "w") as f:
+                    f.write(PAGE.format(i=7) + f"\nedit {edit}\n")
+                wait_for_reload(sock)
+                latencies.append(time.perf_counter() - start)
+                sock.close()
+        finally:
+            watcher.close()
+            reloads.close()
+            httpd.shutdown()
+            thread.join()
+            httpd.server_close()
+            site.close()
+
+    print(
+        f"edit-to-reload ({backend}, {pages} pages): "
+        f"p50 {statistics.median(latencies) * 1000:.1f} ms  "
+        f"max {max(latencies) * 1000:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import gzip
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_server import load, start, stop
+from main import markdown_to_html_node
+from staticserver import StaticSite
+
+
+def typical_page():
+    markdown = "\n\n".join(
+        f"## Section {i}\n\n"
+        f"Some **text** with *emphasis*, `code` and a [link](https://example.com/{i}).\n\n"
+        "* first point\n* second point"
+        for i in range(150)
+    )
+    body = markdown_to_html_node(markdown).to_html()
+    return f"<html><head><title>Docs</title></head><body>{body}</body></html>"
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    requests = clients * 50
+    sys.stderr = open(os.devnull, "w")
+    with tempfile.TemporaryDirectory() as root:
+        page = typical_page().encode()
+        for name in ("plain.html", "precompressed.html"):
+            with open(os.path.join(root, name), "wb") as f:
+                f.write(page)
+        with open(os.path.join(root, "precompressed.html.gz"), "wb") as f:
+            f.write(gzip.compress(page, compresslevel=9, mtime=0))
+
+        httpd, thread = start("pool", StaticSite(root))
+        port = httpd.server_address[1]
+        gzip_header = {"Accept-Encoding": "gzip, deflate, br"}
+        try:
+            for label, path, headers in (
+                ("identity", "/plain.html", None),
+                ("gzip sibling", "/precompressed.html", gzip_header),
+                ("gzip on the fly", "/plain.html", gzip_header),
+            ):
+                rps, _, p99, size, failed = load(port, clients, requests, path, headers)
+                print(
+                    f"{label:<16} {size / requests:8.0f} bytes/response  "
+                    f"{rps:7.0f} req/s  p99 {p99 * 1000:6.1f} ms  failed {failed}"
+                )
+        finally:
+            stop(httpd, thread)
+            httpd.site.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import html
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import htmlnode
+import leafnode
+from htmlnode import escape_attribute, escape_html
+from main import markdown_to_html_node
+
+
+# prose with the occasional special character, a code block full of them,
+# and repeated link targets
+SECTION = """## Section {i}
+
+This paragraph is ordinary prose about **section {i}**, the kind of text that
+makes up most pages, with a [link to the docs](https://example.com/docs) and
+a [link to the index](/index.html) in it.
+
+Compare the results with `x < y` when tuning R&D budgets.
+
+```
+if (a < b && c > d) {{ return a & b; }}
+```
+
+* Plain list item {i}
+* Another *plain* item linking [home](/)
+"""
+
+
+def make_page(sections):
+    return "# Text heavy page\n\n" + "\n".join(
+        SECTION.format(i=i) for i in range(sections)
+    )
+
+
+def html_escape_props(node):
+    # the same serialization with html.escape and no props cache
+    if not node.props:
+        return ""
+    return "".join(
+        [f' {k}="{html.escape(str(v))}"' for k, v in node.props.items()]
+    )
+
+
+def best(fn, rounds=5):
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def per_call(fn, values, rounds=50):
+    def run():
+        for value in values:
+            fn(value)
+
+    return best(run, rounds) / len(values) * 1e9
+
+
+def main():
+    node = markdown_to_html_node(make_page(2000))
+    leaves = []
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current.children is None:
+            leaves.append(current)
+        else:
+            stack.extend(current.children)
+    texts = [leaf.value for leaf in leaves]
+    props = [leaf for leaf in leaves if leaf.props]
+    special = sum(1 for text in texts if escape_html(text) is not text)
+    print(
+        f"{len(texts)} text nodes ({special} needing escapes), "
+        f"{len(props)} nodes with props:"
+    )
+
+    print(f"  escape_html          {per_call(escape_html, texts):7.1f} ns/text")
+    print(
+        f"  html.escape          "
+        f"{per_call(lambda t: html.escape(t, quote=False), texts):7.1f} ns/text"
+    )
+    urls = [leaf.props.get("href", "") for leaf in props]
+    print(f"  escape_attribute     {per_call(escape_attribute, urls):7.1f} ns/value")
+    print(f"  html.escape (quote)  {per_call(html.escape, urls):7.1f} ns/value")
+    print(
+        f"  props_to_html cached "
+        f"{per_call(htmlnode.HTMLNode.props_to_html, props):7.1f} ns/node"
+    )
+    print(f"  props html.escape    {per_call(html_escape_props, props):7.1f} ns/node")
+
+    print(f"Whole page, {len(node.to_html()) >> 10} KiB:")
+    print(f"  to_html              {best(node.to_html) * 1000:7.1f} ms")
+    # the same render with html.escape in place of escape_html, and with the
+    # previous unescaped output for reference
+    leafnode.escape_html = lambda text: html.escape(text, quote=False)
+    try:
+        print(f"  to_html, html.escape {best(node.to_html) * 1000:7.1f} ms")
+        leafnode.escape_html = str
+        htmlnode.escape_attribute = str
+        htmlnode._props_cache.clear()
+        print(f"  to_html, unescaped   {best(node.to_html) * 1000:7.1f} ms")
+    finally:
+        leafnode.escape_html = escape_html
+        htmlnode.escape_attribute = escape_attribute
+
+
+if __name__ == "__main__":
+    main()
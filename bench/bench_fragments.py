@@ -0,0 +1,85 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import parentnode
+from blockcache import BlockCache
+from fragmentcache import FragmentCache
+from main import markdown_to_html_node
+
+
+# every page repeats the navigation, a notice and a snippet around its own text
+SHARED = """* [Home](/)
+* [Guide](/guide/)
+* [Reference](/reference/)
+* [Changelog](/changelog/)
+* [About](/about/)
+
+> **Note:** this documentation covers the current release only.
+
+```
+pip install example && example --init --config example.toml
+```
+"""
+
+PAGE = """# Page {i}
+
+Page **{i}** describes one part of the system with `code` and a [link](/{i}).
+
+{shared}
+Closing words for page {i}.
+"""
+
+
+def make_pages(pages):
+    return [PAGE.format(i=i, shared=SHARED) for i in range(pages)]
+
+
+def render_all(nodes):
+    for node in nodes:
+        node.to_html()
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def run(label, markdowns, block_cache):
+    nodes = [markdown_to_html_node(markdown, block_cache) for markdown in markdowns]
+    parentnode.fragment_cache = None
+    plain = min(timed(lambda: render_all(nodes)) for _ in range(5))
+
+    cache = FragmentCache()
+    parentnode.fragment_cache = cache
+    cold = timed(lambda: render_all(nodes))
+    cold_ratio = cache.hit_ratio()
+    warm = min(timed(lambda: render_all(nodes)) for _ in range(5))
+    parentnode.fragment_cache = None
+    print(
+        f"  {label:<16} off {plain * 1000:7.1f} ms   "
+        f"first {cold * 1000:7.1f} ms ({cold_ratio:5.1%} hits)   "
+        f"again {warm * 1000:7.1f} ms ({cache.hit_ratio():5.1%} hits overall)"
+    )
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    markdowns = make_pages(pages)
+    print(f"to_html of {pages} pages sharing a nav list, a notice and a snippet:")
+    # with a block cache the shared blocks are the same node objects, without
+    # one they are equal trees built separately for each page
+    run("block cache", markdowns, BlockCache())
+    run("no block cache", markdowns, None)
+
+    # nothing repeats, and the page is too big to be a fragment itself: the
+    # first render pays for hashing every node
+    page = "\n\n".join(f"Paragraph {i} with *some* text." for i in range(20000))
+    run("unique page", [page], None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from textnode import TextNode
+from main import (
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+    text_to_textnodes,
+)
+
+
+SENTENCE = (
+    "This is **bold** and *italic* text with `code`, an "
+    "![image](https://example.com/img.png) and a [link](https://example.com). "
+)
+
+
+def chained_passes(text):
+    nodes = [TextNode(text, "text")]
+    nodes = split_nodes_delimiter(nodes, "**", "bold")
+    nodes = split_nodes_delimiter(nodes, "*", "italic")
+    nodes = split_nodes_delimiter(nodes, "`", "code")
+    nodes = split_nodes_image(nodes)
+    nodes = split_nodes_link(nodes)
+    return nodes
+
+
+def main():
+    for repeat in (10, 100, 1000, 10000):
+        text = SENTENCE * repeat
+        assert chained_passes(text) == text_to_textnodes(text)
+        number = max(1, 10000 // repeat)
+        chained = timeit.timeit(lambda: chained_passes(text), number=number)
+        single = timeit.timeit(lambda: text_to_textnodes(text), number=number)
+        print(
+            f"{len(text):>9} chars: chained {chained / number * 1000:8.3f} ms, "
+            f"single pass {single / number * 1000:8.3f} ms, "
+            f"speedup {chained / single:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import http.client
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_server import start, stop
+from staticserver import StaticSite
+
+
+ASSET_COUNT = 12
+REFERENCE_PATTERN = re.compile(rb'(?:href|src)="([^"]+)"')
+
+
+def make_site(root):
+    """A page linking a stylesheet, a script and a dozen images."""
+    assets = ["styles.css", "app.js"] + [f"img{i}.png" for i in range(ASSET_COUNT)]
+    for name in assets:
+        with open(os.path.join(root, name), "wb") as f:
+            f.write(os.urandom(4096))
+    body = "".join(f'<img src="{name}">' for name in assets[2:])
+    with open(os.path.join(root, "index.html"), "w") as f:
+        f.write(
+            '<html><head><link rel="stylesheet" href="styles.css">'
+            '<script src="app.js"></script></head>'
+            f"<body>{body}</body></html>"
+        )
+
+
+def load_page(port, reuse):
+    """Fetch the page then each asset it references, as a browser with a
+    single connection would; returns (seconds, failed requests)."""
+    start = time.perf_counter()
+    conn = None
+    failed = 0
+
+    def get(path):
+        nonlocal conn
+        if conn is None:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        conn.request("GET", path)
+        response = conn.getresponse()
+        body = response.read()
+        if response.will_close or not reuse:
+            conn.close()
+            conn = None
+        return response.status, body
+
+    try:
+        status, page = get("/")
+        failed += status != 200
+        for ref in REFERENCE_PATTERN.findall(page):
+            status, _ = get("/" + ref.decode())
+            failed += status != 200
+    except OSError:
+        failed += 1
+    finally:
+        if conn is not None:
+            conn.close()
+    return time.perf_counter() - start, failed
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    pages = clients * 20
+    sys.stderr = open(os.devnull, "w")
+    with tempfile.TemporaryDirectory() as root:
+        make_site(root)
+        for mode in ("threaded", "asyncio"):
+            for keep_alive in (False, True):
+                httpd, thread = start(mode, StaticSite(root), keep_alive=keep_alive)
+                port = httpd.server_address[1]
+                try:
+                    begin = time.perf_counter()
+                    with ThreadPoolExecutor(max_workers=clients) as executor:
+                        results = list(
+                            executor.map(
+                                lambda _: load_page(port, keep_alive), range(pages)
+                            )
+                        )
+                    elapsed = time.perf_counter() - begin
+                finally:
+                    stop(httpd, thread)
+                    httpd.site.close()
+                latencies = sorted(latency for latency, _ in results)
+                failed = sum(failed for _, failed in results)
+                label = f"{mode}{'+keep-alive' if keep_alive else ''}"
+                print(
+                    f"{label:<19} {clients} clients: {pages / elapsed:7.0f} pages/s  "
+                    f"p50 {latencies[len(latencies) // 2] * 1000:6.1f} ms  "
+                    f"({ASSET_COUNT + 3} requests/page)  failed {failed}"
+                )
+
+
+if __name__ == "__main__":
+    main()
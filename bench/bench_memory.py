@@ -0,0 +1,77 @@
+import gc
+import os
+import resource
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import main as generator
+from leafnode import LeafNode
+from parentnode import ParentNode
+from textnode import TextNode
+
+
+# Subclasses without __slots__ get a per-instance __dict__ again, which is
+# what every node carried before.
+class DictTextNode(TextNode):
+    pass
+
+
+class DictLeafNode(LeafNode):
+    pass
+
+
+class DictParentNode(ParentNode):
+    pass
+
+
+DOCUMENT = "\n\n".join(
+    f"# Section {i}\n\n"
+    f"Paragraph {i} with **bold**, *italic*, `code` and a [link](https://example.com/{i}).\n\n"
+    f"* item **one**\n* item *two*\n* item `three`"
+    for i in range(5000)
+)
+
+
+PARAGRAPH = " ".join(
+    f"Sentence {i} with **bold**, *italic* and a [link](https://example.com/{i})."
+    for i in range(20000)
+)
+
+
+def count_nodes(node):
+    return 1 + sum(count_nodes(child) for child in node.children or [])
+
+
+def measure(label):
+    gc.collect()
+    tracemalloc.start()
+    html_node = generator.markdown_to_html_node(DOCUMENT)
+    text_nodes = generator.text_to_textnodes(PARAGRAPH)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    nodes = count_nodes(html_node) + len(text_nodes)
+    print(
+        f"  {label:<8} {nodes} nodes, {current / nodes:6.1f} bytes/node "
+        f"(incl. strings), peak {peak / 2**20:6.2f} MiB"
+    )
+
+
+def main():
+    print(f"document of {len(DOCUMENT) / 2**20:.2f} MiB")
+    originals = (generator.TextNode, generator.LeafNode, generator.ParentNode)
+    generator.TextNode, generator.LeafNode, generator.ParentNode = (
+        DictTextNode,
+        DictLeafNode,
+        DictParentNode,
+    )
+    measure("__dict__")
+    generator.TextNode, generator.LeafNode, generator.ParentNode = originals
+    measure("__slots__")
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"peak RSS {max_rss / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
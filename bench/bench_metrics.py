@@ -0,0 +1,89 @@
+import os
+import sys
+import tempfile
+import time
+import timeit
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_server import PUBLIC_DIR, load, start, stop
+from staticserver import AccessLog, FileCache, Metrics, StaticHandler, StaticSite
+
+
+class SyncLogHandler(StaticHandler):
+    # the previous behaviour: format and write each line on the request path
+    log_request = BaseHTTPRequestHandler.log_request
+
+
+def per_call_costs(sink, number=200000):
+    """Microseconds each handler thread spends per request on bookkeeping."""
+    metrics = Metrics()
+    access_log = AccessLog(sink)
+
+    def sync_log():
+        # what BaseHTTPRequestHandler.log_message does on every request
+        sink.write(
+            "%s - - [%s] %s\n"
+            % (
+                "127.0.0.1",
+                time.strftime("%d/%b/%Y %H:%M:%S"),
+                '"GET /styles.css HTTP/1.1" 200 -',
+            )
+        )
+        sink.flush()
+
+    costs = {
+        "metrics.record": lambda: metrics.record("/styles.css", 200, 331, 0.0004),
+        "access_log.log": lambda: access_log.log(
+            "127.0.0.1", "GET", "/styles.css", "HTTP/1.1", 200, 331
+        ),
+        "sync stderr write": sync_log,
+    }
+    for label, call in costs.items():
+        seconds = min(timeit.repeat(call, number=number, repeat=3))
+        print(f"{label:<17} {seconds / number * 1e6:6.2f} us/request")
+    access_log.close()
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    requests = clients * 40
+    runs = 3
+    # a real file, so logging pays for actual writes
+    sink = tempfile.TemporaryFile("w")
+    sys.stderr = sink
+    configs = [
+        ("no logging", {}, False),
+        ("metrics", {}, True),
+        ("sync log", {"handler_class": SyncLogHandler}, False),
+        ("buffered log", {"access_log": AccessLog(sink)}, False),
+        ("buffered+metrics", {"access_log": AccessLog(sink)}, True),
+    ]
+    for label, kwargs, metrics in configs:
+        site = StaticSite(
+            PUBLIC_DIR,
+            cache=FileCache(64 * 2**20),
+            metrics=Metrics() if metrics else None,
+        )
+        httpd, thread = start("pool", site, **kwargs)
+        try:
+            # best of a few runs: the clients share this process and its GIL
+            rps, p50, p99, _, failed = max(
+                load(httpd.server_address[1], clients, requests)
+                for _ in range(runs)
+            )
+        finally:
+            stop(httpd, thread)
+            site.close()
+            if "access_log" in kwargs:
+                kwargs["access_log"].close()
+        print(
+            f"{label:<17} {clients} clients: {rps:8.0f} req/s  "
+            f"p50 {p50 * 1000:6.1f} ms  p99 {p99 * 1000:6.1f} ms  failed {failed}"
+        )
+    per_call_costs(sink)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bench_devserver import make_content
+from bench_server import PUBLIC_DIR, fetch, load, start, stop
+from build import build
+from staticserver import MarkdownSite
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    clients = 50
+    sys.stderr = open(os.devnull, "w")
+    with tempfile.TemporaryDirectory() as root:
+        content = os.path.join(root, "content")
+        make_content(content, pages)
+
+        start_time = time.perf_counter()
+        build(content, os.path.join(root, "public"))
+        print(f"prebuild of {pages} pages: {time.perf_counter() - start_time:.2f} s")
+
+        site = MarkdownSite(PUBLIC_DIR, content)
+        httpd, thread = start("pool", site)
+        port = httpd.server_address[1]
+        try:
+            cold = [fetch(port, f"/section{i % 100}/page{i}")[0] for i in range(200)]
+            warm = [fetch(port, f"/section{i % 100}/page{i}")[0] for i in range(200)]
+            print(
+                f"first request (render): {sorted(cold)[100] * 1000:.2f} ms p50  "
+                f"cached: {sorted(warm)[100] * 1000:.2f} ms p50"
+            )
+
+            rps, p50, p99, _, failed = load(
+                port, clients, clients * 40, "/section1/page1"
+            )
+            print(
+                f"cached page, {clients} clients: {rps:.0f} req/s  "
+                f"p99 {p99 * 1000:.1f} ms  failed {failed}"
+            )
+
+            renders = site.renders
+            path = "/section2/page202"
+            with ThreadPoolExecutor(max_workers=clients) as executor:
+                statuses = list(
+                    executor.map(lambda _: fetch(port, path)[1], range(clients))
+                )
+            print(
+                f"{clients} concurrent requests for one uncached page: "
+                f"{site.renders - renders} render(s), "
+                f"{statuses.count(200)} ok"
+            )
+        finally:
+            stop(httpd, thread)
+            site.close()
+
+
+if __name__ == "__main__":
+    main()
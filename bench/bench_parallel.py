@@ -0,0 +1,33 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_build import make_site
+from build import build
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    print(f"{pages} pages, {os.cpu_count()} CPU(s)")
+    with tempfile.TemporaryDirectory() as root:
+        content, dest, template = make_site(root, pages)
+        baseline = None
+        for jobs in (1, 2, 4, 8, 16):
+            shutil.rmtree(dest, ignore_errors=True)
+            start = time.perf_counter()
+            build(content, dest, template, jobs=jobs)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(
+                f"  {jobs:>2} worker(s) {elapsed:8.3f} s  "
+                f"speedup {baseline / elapsed:5.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
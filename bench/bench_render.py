@@ -0,0 +1,68 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from leafnode import LeafNode
+from parentnode import ParentNode
+
+
+def concat_to_html(node):
+    # The previous ParentNode.to_html: every level re-copies its descendants.
+    if isinstance(node, LeafNode):
+        return node.to_html()
+    html = f"<{node.tag}{node.props_to_html()}>"
+    for child in node.children:
+        html += concat_to_html(child)
+    html += f"</{node.tag}>"
+    return html
+
+
+def changelog(releases, entries):
+    return ParentNode(
+        "div",
+        [
+            ParentNode(
+                "section",
+                [LeafNode("h2", f"Release {r}")]
+                + [
+                    ParentNode(
+                        "ul",
+                        [
+                            LeafNode("li", f"Fixed issue #{r * entries + e} in the parser")
+                            for e in range(entries)
+                        ],
+                    )
+                ],
+            )
+            for r in range(releases)
+        ],
+    )
+
+
+def measure(label, render):
+    tracemalloc.start()
+    start = time.perf_counter()
+    render()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<12} {elapsed * 1000:9.1f} ms  peak {peak / 2**20:8.2f} MiB")
+
+
+def main():
+    for releases in (100, 1000, 5000):
+        tree = changelog(releases, 40)
+        size = len(tree.to_html())
+        print(f"{releases} releases, {size / 2**20:.1f} MiB of HTML")
+        measure("concat", lambda: concat_to_html(tree))
+        measure("to_html", tree.to_html)
+        with tempfile.TemporaryFile("w") as f:
+            measure("render_to", lambda: tree.render_to(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_server import load
+from staticserver import StaticHandler, StaticSite, make_server
+
+
+class CopyFileObjHandler(StaticHandler):
+    # The previous body path: every byte copied through Python buffers.
+    def write_body(self, response):
+        if response.file is not None:
+            response.file.seek(response.offset)
+            shutil.copyfileobj(response.file, self.wfile)
+        else:
+            self.wfile.write(response.body)
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    clients = 4
+    requests = 40
+    sys.stderr = open(os.devnull, "w")
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, "large.bin"), "wb") as f:
+            f.write(os.urandom(size_mb * 2**20))
+
+        for label, handler_class in (
+            ("copyfileobj", CopyFileObjHandler),
+            ("sendfile", StaticHandler),
+        ):
+            httpd = make_server(
+                StaticSite(root), port=0, mode="threaded", handler_class=handler_class
+            )
+            thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+            thread.start()
+            try:
+                rps, _, p99, size, failed = load(
+                    httpd.server_address[1], clients, requests, "/large.bin"
+                )
+            finally:
+                httpd.shutdown()
+                thread.join()
+                httpd.server_close()
+                httpd.site.close()
+            print(
+                f"{label:<12} {size_mb} MiB file: {rps * size_mb:8.0f} MiB/s  "
+                f"p99 {p99 * 1000:7.1f} ms  failed {failed}"
+            )
+
+
+if __name__ == "__main__":
+    main()
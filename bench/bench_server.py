@@ -0,0 +1,88 @@
+import http.client
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from staticserver import MODES, FileCache, StaticSite, make_server
+
+
+PUBLIC_DIR = os.path.join(os.path.dirname(__file__), "..", "public")
+
+
+def start(mode, site=None, **kwargs):
+    httpd = make_server(site or StaticSite(PUBLIC_DIR), port=0, mode=mode, **kwargs)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    return httpd, thread
+
+
+def stop(httpd, thread):
+    httpd.shutdown()
+    thread.join()
+    httpd.server_close()
+
+
+def fetch(port, path, headers=None):
+    start = time.perf_counter()
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        conn.request("GET", path, headers=headers or {})
+        response = conn.getresponse()
+        status, body = response.status, response.read()
+    except OSError:
+        status, body = None, b""
+    finally:
+        conn.close()
+    return time.perf_counter() - start, status, len(body)
+
+
+def load(port, clients, requests, path="/", headers=None):
+    """Run requests GETs from clients concurrent connections; returns
+    (requests/sec, p50, p99, bytes received, failed requests)."""
+    def client(_):
+        return [fetch(port, path, headers) for _ in range(requests // clients)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        results = [r for batch in executor.map(client, range(clients)) for r in batch]
+    elapsed = time.perf_counter() - start
+
+    failed = sum(1 for _, status, _ in results if status != 200)
+    latencies = sorted(latency for latency, _, _ in results)
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    size = sum(size for _, _, size in results)
+    return (len(results) - failed) / elapsed, p50, p99, size, failed
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    requests = clients * 10
+    # the per-request access log would dominate the measurement
+    sys.stderr = open(os.devnull, "w")
+    configs = [(mode, mode, None) for mode in MODES]
+    configs += [
+        (f"{mode}+cache", mode, FileCache(64 * 2**20)) for mode in ("pool", "asyncio")
+    ]
+    for label, mode, cache in configs:
+        httpd, thread = start(mode, StaticSite(PUBLIC_DIR, cache=cache))
+        try:
+            rps, p50, p99, _, failed = load(
+                httpd.server_address[1], clients, requests
+            )
+        finally:
+            stop(httpd, thread)
+            httpd.site.close()
+        print(
+            f"{label:<13} {clients} clients: {rps:8.0f} req/s  "
+            f"p50 {p50 * 1000:7.1f} ms  p99 {p99 * 1000:7.1f} ms  "
+            f"failed {failed}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Why inline text is not split into spans over its source.
+
+A TextSpan would keep its source with start and end offsets instead of a
+copy of its text. It was tried and reverted; this keeps the measurement.
+Every leaf still copies its text out when it is written, so the HTML tree
+and markdown_to_html_node stay the same either way, and only the
+TextNodes between tokenizing and rendering can get smaller:
+
+  tracemalloc, blocks / MiB still allocated, copies -> spans
+    text_to_textnodes, 20000 short paragraphs: 400516 / 23.1 -> 240520 / 18.8
+    text_to_textnodes, one 1.4 MB paragraph:   260521 / 15.3 -> 379994 / 17.9
+    markdown_to_html_node:                     265525 / 15.5 -> 265524 / 15.5
+
+Those nodes are dropped as soon as a block is rendered, so the saving on
+short paragraphs never shows up in the build's peak. On a long paragraph
+spans are a loss. Past 256, each offset is an int object of its own, and
+two of them outweigh the short substring they replace.
+
+The figures above come from the reverted tokenizer. This script builds the
+same nodes both ways from the current tokenizer's output, and shows the
+same split: about 22 -> 17 MiB on short paragraphs, 14 -> 17 MiB on the
+long one.
+"""
+
+import gc
+import os
+import sys
+import tracemalloc
+from array import array
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import main as generator
+from bench_memory import PARAGRAPH
+from textnode import TextNode
+
+
+class TextSpan(TextNode):
+    __slots__ = ("source", "start", "end")
+
+    def __init__(self, source, start, end, text_type, url=None):
+        self.source = source
+        self.start = start
+        self.end = end
+        self.text_type = text_type
+        self.url = url
+
+    @property
+    def text(self):
+        return self.source[self.start : self.end]
+
+
+PARAGRAPHS = [
+    f"Paragraph {i} with **bold**, *italic*, `code` and a [link](https://example.com/{i})."
+    for i in range(20000)
+]
+
+
+def offsets(text):
+    # where each part text_to_textnodes found sits in its text; kept in arrays
+    # so that each node gets int objects of its own, as it would from a match
+    starts, ends, kinds = array("q"), array("q"), []
+    pos = 0
+    for node in generator.text_to_textnodes(text):
+        start = text.index(node.text, pos)
+        pos = start + len(node.text)
+        starts.append(start)
+        ends.append(pos)
+        kinds.append((node.text_type, node.url))
+    return text, starts, ends, kinds
+
+
+def copies(texts):
+    return [
+        [
+            TextNode(text[start:end], text_type, url)
+            for start, end, (text_type, url) in zip(starts, ends, kinds)
+        ]
+        for text, starts, ends, kinds in texts
+    ]
+
+
+def spans(texts):
+    return [
+        [
+            TextSpan(text, start, end, text_type, url)
+            for start, end, (text_type, url) in zip(starts, ends, kinds)
+        ]
+        for text, starts, ends, kinds in texts
+    ]
+
+
+def measure(fn, texts):
+    gc.collect()
+    tracemalloc.start()
+    result = fn(texts)
+    snapshot = tracemalloc.take_snapshot()
+    blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return blocks, current, peak
+
+
+def main():
+    cases = [
+        ("short paragraphs", [offsets(text) for text in PARAGRAPHS]),
+        ("one long paragraph", [offsets(PARAGRAPH)]),
+    ]
+    print("memory blocks and bytes still allocated afterwards, and peak bytes:")
+    for label, texts in cases:
+        print(f"{label}:")
+        for name, fn in (("copies", copies), ("spans", spans)):
+            blocks, current, peak = measure(fn, texts)
+            print(
+                f"  {name:<7} {blocks:8} blocks {current / 2**20:7.2f} MiB "
+                f"  peak {peak / 2**20:7.2f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import mmap
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from main import markdown_to_html_node, write_markdown_html
+
+
+ENTRY = """## Event {i}
+
+Service **api-{i}** logged a warning at `12:{m:02d}` with [trace](https://logs.example.com/{i}).
+
+* field *one*
+* field *two*
+
+"""
+
+
+def make_digest(path, entries):
+    with open(path, "w") as f:
+        for i in range(entries):
+            f.write(ENTRY.format(i=i, m=i % 60))
+
+
+def measure(label, render):
+    tracemalloc.start()
+    start = time.perf_counter()
+    render()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<10} {elapsed:7.2f} s  peak {peak / 2**20:8.2f} MiB")
+
+
+def in_memory(source, dest):
+    with open(source) as f:
+        html = markdown_to_html_node(f.read()).to_html()
+    with open(dest, "w") as f:
+        f.write(html)
+
+
+def streaming(source, dest):
+    with open(source) as f, open(dest, "w") as out:
+        write_markdown_html(f, out)
+
+
+def streaming_mmap(source, dest):
+    with open(source, "rb") as f, open(dest, "w") as out:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            write_markdown_html(iter(mm.readline, b""), out)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as root:
+        source = os.path.join(root, "digest.md")
+        dest = os.path.join(root, "digest.html")
+        for entries in (2000, 10000, 30000):
+            make_digest(source, entries)
+            print(f"{os.path.getsize(source) / 2**20:.1f} MiB of markdown")
+            measure("in memory", lambda: in_memory(source, dest))
+            measure("streaming", lambda: streaming(source, dest))
+            measure("mmap", lambda: streaming_mmap(source, dest))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bench_build import make_site
+from build import build
+from template import Template
+
+
+# a realistic page shell: head, navigation and footer around the two slots
+TEMPLATE = (
+    "<!DOCTYPE html><html><head><meta charset='utf-8'><title>{{ Title }}</title>"
+    + "<link rel='stylesheet' href='/index.css'>" * 5
+    + "</head><body><nav>"
+    + "".join(f"<a href='/section{i}/'>Section {i}</a>" for i in range(50))
+    + "</nav><main>{{ Content }}</main><footer>"
+    + "<p>Footer text that is part of every page.</p>" * 20
+    + "</footer></body></html>"
+)
+
+
+def replace_render(template, title, content):
+    # The previous fill_template: two searches of the template text, two
+    # intermediate strings, then an encode of the whole page.
+    return (
+        template.replace("{{ Title }}", title)
+        .replace("{{ Content }}", content)
+        .encode("utf-8")
+    )
+
+
+def per_page(label, fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<24} {elapsed / rounds * 1e6:8.2f} µs/page")
+
+
+def template_edit(pages):
+    with tempfile.TemporaryDirectory() as root:
+        content, dest, template = make_site(root, pages)
+        section = os.path.join(content, "section0", "_template.html")
+        with open(section, "w") as f:
+            f.write("<article>{{ Content }}</article>")
+        build(content, dest, template)
+
+        with open(section, "w") as f:
+            f.write("<main>{{ Content }}</main>")
+        start = time.perf_counter()
+        built = build(content, dest, template)
+        elapsed = time.perf_counter() - start
+        print(
+            f"  section template edit  {elapsed:8.3f} s  "
+            f"({len(built)} of {pages} pages)"
+        )
+
+
+def main():
+    rounds = 20000
+    # a mid-sized page body
+    content = "<div>" + "<p>Some <b>rendered</b> paragraph text.</p>" * 200 + "</div>"
+    content_bytes = content.encode("utf-8")
+    compiled = Template(TEMPLATE)
+
+    print(f"Filling a {len(TEMPLATE)} byte template, {len(content)} byte content:")
+    per_page(
+        "str.replace + encode",
+        lambda: replace_render(TEMPLATE, "Page", content),
+        rounds,
+    )
+    # the compiled path gets content already encoded, as render_page does
+    per_page(
+        "encode + Template.render",
+        lambda: compiled.render(
+            {"Title": b"Page", "Content": content.encode("utf-8")}
+        ),
+        rounds,
+    )
+    per_page(
+        "Template.render",
+        lambda: compiled.render({"Title": b"Page", "Content": content_bytes}),
+        rounds,
+    )
+    per_page("compile (once per build)", lambda: Template(TEMPLATE), 1000)
+
+    template_edit(10000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from leafnode import LeafNode
+from parentnode import ParentNode
+
+
+def recursive_to_html(node):
+    # The previous ParentNode.to_html: one call per nesting level.
+    if node.children is None:
+        return node.to_html()
+    children_html = "".join([recursive_to_html(child) for child in node.children])
+    return f"<{node.tag}{node.props_to_html()}>{children_html}</{node.tag}>"
+
+
+def recursive_iter_html(node):
+    # The previous ParentNode.iter_html: a generator per level, so each chunk
+    # is passed up through every enclosing generator.
+    if node.children is None:
+        yield node.to_html()
+        return
+    yield f"<{node.tag}{node.props_to_html()}>"
+    for child in node.children:
+        yield from recursive_iter_html(child)
+    yield f"</{node.tag}>"
+
+
+def recursive_eq(a, b):
+    # The previous HTMLNode.__eq__, through list equality of the children.
+    if a.tag != b.tag or a.value != b.value or a.props != b.props:
+        return False
+    if a.children is None or b.children is None:
+        return a.children is b.children
+    return len(a.children) == len(b.children) and all(
+        recursive_eq(x, y) for x, y in zip(a.children, b.children)
+    )
+
+
+def recursive_hash(node):
+    props = frozenset(node.props.items()) if node.props is not None else None
+    children = node.children
+    if children is not None:
+        children = tuple(recursive_hash(child) for child in children)
+    return hash((node.tag, node.value, props, children))
+
+
+def wide(sections, items):
+    return ParentNode(
+        "div",
+        [
+            ParentNode(
+                "ul",
+                [LeafNode("li", f"Item {s}.{i}") for i in range(items)],
+                {"class": "section"},
+            )
+            for s in range(sections)
+        ],
+    )
+
+
+def outline(depth):
+    # an outline nested depth levels deep, a few items per level
+    node = ParentNode("ul", LeafNode("li", "leaf"))
+    for level in reversed(range(depth)):
+        node = ParentNode(
+            "ul", [LeafNode("li", f"Point {level}.{i}") for i in range(3)] + [node]
+        )
+    return node
+
+
+def best(fn, rounds=5):
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        try:
+            fn()
+        except RecursionError:
+            return None
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def compare(label, recursive, iterative):
+    old, new = best(recursive), best(iterative)
+    old_text = "RecursionError" if old is None else f"{old * 1000:9.2f} ms"
+    print(f"  {label:<10} recursive {old_text:>14}  iterative {new * 1000:9.2f} ms")
+
+
+def main():
+    trees = [
+        ("wide 2000x50", lambda: wide(2000, 50)),
+        ("outline 500", lambda: outline(500)),
+        ("outline 20000", lambda: outline(20000)),
+    ]
+    for label, make in trees:
+        tree, copy = make(), make()
+        print(f"{label}:")
+        compare("to_html", lambda: recursive_to_html(tree), tree.to_html)
+        compare(
+            "iter_html",
+            lambda: "".join(recursive_iter_html(tree)),
+            lambda: "".join(tree.iter_html()),
+        )
+        compare("eq", lambda: recursive_eq(tree, copy), lambda: tree == copy)
+        # a hashed tree keeps its fingerprint, so each round hashes a fresh one
+        fresh = [make() for _ in range(5)]
+        compare("hash", lambda: recursive_hash(tree), lambda: hash(fresh.pop()))
+        compare("hash again", lambda: recursive_hash(tree), lambda: hash(tree))
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1 @@
-python src/main.py
\ No newline at end of file
+python src/main.py build "$@"
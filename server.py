@@ -1,28 +1,10 @@
 import os
-import argparse
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+import sys
 
-
-def run(
-    server_class=HTTPServer,
-    handler_class=SimpleHTTPRequestHandler,
-    port=8888,
-    directory=None,
-):
-    if directory:  # Change the current working directory if directory is specified
-        os.chdir(directory)
-    server_address = ("", port)
-    httpd = server_class(server_address, handler_class)
-    print(f"Serving HTTP on http://localhost:{port} from directory '{directory}'...")
-    httpd.serve_forever()
+# The server lives in src/staticserver.py next to the generator it imports;
+# running it as a script puts src/ on the import path.
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "staticserver.py")
 
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="HTTP Server")
-    parser.add_argument(
-        "--dir", type=str, help="Directory to serve files from", default="."
-    )
-    parser.add_argument("--port", type=int, help="Port to serve HTTP on", default=8888)
-    args = parser.parse_args()
-
-    run(port=args.port, directory=args.dir)
+    os.execv(sys.executable, [sys.executable, SCRIPT, *sys.argv[1:]])
@@ -0,0 +1,255 @@
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+ASSETS_MANIFEST_NAME = ".assets-manifest.json"
+FINGERPRINT_EXTENSIONS = {
+    ".css",
+    ".js",
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".gif",
+    ".svg",
+    ".webp",
+    ".ico",
+    ".woff",
+    ".woff2",
+}
+COMPRESSIBLE_EXTENSIONS = {".html", ".css", ".js", ".svg", ".json", ".xml", ".txt"}
+# the siblings written for each Content-Encoding, in order of preference
+CODING_EXTENSIONS = {"br": ".br", "gzip": ".gz"}
+COMPRESSED_EXTENSIONS = tuple(CODING_EXTENSIONS.values())
+# smaller bodies gain little and can grow once compressed
+MIN_COMPRESS_SIZE = 1024
+REFERENCE_PATTERN = re.compile(r'(\b(?:href|src)=")([^"]*)(")')
+
+
+def process_assets(public_dir, html_paths=None, min_size=MIN_COMPRESS_SIZE):
+    """Fingerprint static assets, point HTML at them and precompress files.
+
+    html_paths are public-relative pages to rewrite. Every page is rewritten
+    when it is None or when any fingerprint changed since the last run.
+    """
+    previous = load_assets_manifest(public_dir)
+    fingerprints = fingerprint_assets(public_dir, previous)
+
+    if html_paths is None or previous != fingerprints:
+        html_paths = [
+            rel_path
+            for rel_path in iter_public_files(public_dir)
+            if rel_path.endswith(".html")
+        ]
+    # pages still pointing at an earlier copy follow it to its original
+    originals = {copy: original for original, copy in previous.items()}
+    for rel_path in html_paths:
+        rewrite_references(public_dir, rel_path, fingerprints, originals)
+
+    return compress_files(public_dir, min_size)
+
+
+def fingerprint_assets(public_dir, previous=None):
+    """Copy each static asset to name.<hash>.ext and drop stale copies.
+
+    Originals are left in place so existing links keep working. The copies
+    are recorded in the assets manifest, and only copies recorded there by
+    an earlier run are ever taken for copies or removed: any other file is
+    an original, whatever its name. previous is the manifest as returned by
+    load_assets_manifest, if the caller has already read it.
+
+    Returns a mapping of public-relative original paths to their
+    fingerprinted paths, using "/" separators.
+    """
+    if previous is None:
+        previous = load_assets_manifest(public_dir)
+    copies = set(previous.values())
+
+    fingerprints = {}
+    for rel_path in iter_public_files(public_dir):
+        url_path = _to_url_path(rel_path)
+        if (
+            os.path.splitext(rel_path)[1] not in FINGERPRINT_EXTENSIONS
+            or url_path in copies
+        ):
+            continue
+        path = os.path.join(public_dir, rel_path)
+        with open(path, "rb") as f:
+            data = f.read()
+        stem, ext = os.path.splitext(rel_path)
+        digest = hashlib.sha256(data).hexdigest()[:8]
+        target = f"{stem}.{digest}{ext}"
+
+        target_path = os.path.join(public_dir, target)
+        if not os.path.exists(target_path):
+            with open(target_path, "wb") as f:
+                f.write(data)
+        fingerprints[url_path] = _to_url_path(target)
+
+    # copies of changed or deleted originals
+    current = set(fingerprints.values())
+    for copy in copies - current:
+        _remove_with_siblings(os.path.join(public_dir, *copy.split("/")))
+
+    if fingerprints != previous:
+        save_assets_manifest(public_dir, fingerprints)
+    return fingerprints
+
+
+def load_assets_manifest(public_dir):
+    """Return the original to fingerprinted path mapping of the last run."""
+    manifest_path = os.path.join(public_dir, ASSETS_MANIFEST_NAME)
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if not isinstance(manifest, dict):
+        return {}
+    return manifest
+
+
+def save_assets_manifest(public_dir, fingerprints):
+    manifest_path = os.path.join(public_dir, ASSETS_MANIFEST_NAME)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(fingerprints))
+    os.replace(tmp_path, manifest_path)
+
+
+def rewrite_references(public_dir, rel_path, fingerprints, originals=None):
+    """Point href/src attributes in one page at fingerprinted assets.
+
+    originals maps earlier fingerprinted paths to their originals, so
+    references to an outdated copy are updated too.
+    """
+    if originals is None:
+        originals = {}
+    path = os.path.join(public_dir, rel_path)
+    with open(path, encoding="utf-8") as f:
+        html = f.read()
+
+    page_dir = posixpath.dirname(_to_url_path(rel_path))
+
+    def replace(match):
+        url = match.group(2)
+        if not url or url.startswith(("#", "//")) or ":" in url.split("/", 1)[0]:
+            return match.group(0)
+
+        path_part, sep, suffix = _split_url(url)
+        if path_part.startswith("/"):
+            target = posixpath.normpath(path_part.lstrip("/"))
+        else:
+            target = posixpath.normpath(posixpath.join(page_dir, path_part))
+        target = originals.get(target, target)
+        if target not in fingerprints:
+            return match.group(0)
+
+        new_name = posixpath.basename(fingerprints[target])
+        new_path = posixpath.join(posixpath.dirname(path_part), new_name)
+        return match.group(1) + new_path + sep + suffix + match.group(3)
+
+    rewritten = REFERENCE_PATTERN.sub(replace, html)
+    if rewritten != html:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(rewritten)
+
+
+def compress_files(public_dir, min_size=MIN_COMPRESS_SIZE, workers=None):
+    """Write .gz (and .br when brotli is installed) next to text files.
+
+    Siblings newer than their source are left alone. zlib and brotli release
+    the GIL, so files are compressed on a thread pool. Returns the
+    public-relative paths of the siblings written.
+    """
+    jobs = []
+    for rel_path in iter_public_files(public_dir):
+        if os.path.splitext(rel_path)[1] not in COMPRESSIBLE_EXTENSIONS:
+            continue
+        stat = os.stat(os.path.join(public_dir, rel_path))
+        if stat.st_size < min_size:
+            continue
+        for coding, ext in CODING_EXTENSIONS.items():
+            if not can_compress(coding):
+                continue
+            try:
+                fresh = (
+                    os.stat(os.path.join(public_dir, rel_path + ext)).st_mtime_ns
+                    >= stat.st_mtime_ns
+                )
+            except FileNotFoundError:
+                fresh = False
+            if not fresh:
+                jobs.append((rel_path, coding, ext))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(
+            executor.map(lambda job: _compress_file(public_dir, *job), jobs)
+        )
+
+
+def can_compress(coding):
+    return coding == "gzip" or (coding == "br" and brotli is not None)
+
+
+def compress(data, coding):
+    """Compress data with a coding from CODING_EXTENSIONS."""
+    if coding == "br":
+        return brotli.compress(data, mode=brotli.MODE_TEXT)
+    # a fixed mtime keeps output byte-identical between builds
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _compress_file(public_dir, rel_path, coding, ext):
+    path = os.path.join(public_dir, rel_path)
+    with open(path, "rb") as f:
+        data = f.read()
+    compressed = compress(data, coding)
+
+    tmp_path = path + ext + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(compressed)
+    os.replace(tmp_path, path + ext)
+    return rel_path + ext
+
+
+def iter_public_files(public_dir, prefix=""):
+    """Yield public-relative paths of servable files, skipping dotfiles and
+    precompressed siblings."""
+    with os.scandir(os.path.join(public_dir, prefix)) as it:
+        entries = sorted(it, key=lambda entry: entry.name)
+    for entry in entries:
+        if entry.name.startswith("."):
+            continue
+        if entry.is_dir():
+            yield from iter_public_files(public_dir, prefix + entry.name + os.sep)
+        elif not entry.name.endswith(COMPRESSED_EXTENSIONS + (".tmp",)):
+            yield prefix + entry.name
+
+
+def _remove_with_siblings(path):
+    for sibling in (path,) + tuple(path + ext for ext in COMPRESSED_EXTENSIONS):
+        try:
+            os.remove(sibling)
+        except FileNotFoundError:
+            pass
+
+
+def _split_url(url):
+    for i, char in enumerate(url):
+        if char in "?#":
+            return url[:i], char, url[i + 1 :]
+    return url, "", ""
+
+
+def _to_url_path(rel_path):
+    return rel_path.replace(os.sep, "/")
@@ -0,0 +1,124 @@
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+
+from htmlnode import HTMLNode
+
+
+# bump when block rendering changes so persisted caches are discarded
+CACHE_VERSION = 2
+
+
+class BlockCache:
+    """Bounded LRU cache of rendered blocks, keyed by a hash of the block text.
+
+    Cached nodes are shared by every page containing the block, so callers
+    must not mutate the trees they get back.
+
+    A copy in a worker process can track its changes, which the original
+    then merges, so a parallel build fills the cache like a serial one.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._added = None
+
+    def get_or_render(self, block, render):
+        key = block_key(block)
+        node = self._entries.get(key)
+        if node is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return node
+
+        self.misses += 1
+        node = render(block)
+        self._add(key, node)
+        if self._added is not None:
+            self._added.append((key, node))
+        return node
+
+    def track_changes(self):
+        """Count hits and misses from zero and record new entries, until
+        take_changes()."""
+        self.hits = 0
+        self.misses = 0
+        self._added = []
+
+    def take_changes(self):
+        """Return the changes tracked since the last call, for merge(), and
+        start tracking again."""
+        changes = (self.hits, self.misses, self._added)
+        self.track_changes()
+        return changes
+
+    def merge(self, changes):
+        """Add the counters and new entries taken from a copy of this cache;
+        blocks it already holds are kept."""
+        hits, misses, added = changes
+        self.hits += hits
+        self.misses += misses
+        for key, node in added:
+            if key not in self._entries:
+                self._add(key, node)
+
+    def _add(self, key, node):
+        self._entries[key] = node
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def hit_ratio(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def save(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(
+                {"version": CACHE_VERSION, "entries": list(self._entries.items())},
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, maxsize=4096):
+        """Return a cache filled from path, or an empty one if it is unusable.
+
+        The file is unpickled, so only load caches this build wrote itself.
+        A truncated or corrupted file, or one from an older build that refers
+        to classes that have since moved or gone, is unusable; unpickling
+        such a file can raise almost anything.
+        """
+        cache = cls(maxsize)
+        try:
+            with open(path, "rb") as f:
+                data = pickle.load(f)
+        except Exception:
+            return cache
+
+        if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+            return cache
+        entries = data.get("entries")
+        if not isinstance(entries, list) or not all(
+            isinstance(entry, tuple)
+            and len(entry) == 2
+            and isinstance(entry[0], bytes)
+            and isinstance(entry[1], HTMLNode)
+            for entry in entries
+        ):
+            return cache
+        # keep the most recently used entries if maxsize shrank
+        cache._entries.update(entries[max(0, len(entries) - maxsize) :])
+        return cache
+
+
+def block_key(block):
+    return hashlib.blake2b(block.encode("utf-8"), digest_size=16).digest()
@@ -0,0 +1,237 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from main import markdown_to_html_node
+from template import TemplateSet
+
+
+MANIFEST_NAME = ".build-manifest.json"
+# 2: templates are recorded per page; 3: text and attributes are escaped;
+# 4: so are titles
+MANIFEST_VERSION = 4
+# aim for a few chunks per worker so stragglers even out without paying
+# per-page IPC overhead
+CHUNKS_PER_WORKER = 4
+
+
+class PageError(ValueError):
+    """A page that could not be rendered, such as one without an h1 for its
+    template's title."""
+
+    def __init__(self, rel_path, error):
+        super().__init__(f"Could not build '{rel_path}': {error}")
+        self.rel_path = rel_path
+
+
+def build(
+    content_dir,
+    dest_dir,
+    template_path=None,
+    jobs=1,
+    block_cache=None,
+    profile=None,
+):
+    """Render every markdown file under content_dir into dest_dir.
+
+    Each page uses the nearest _template.html at or above its directory, or
+    template_path. Pages whose source and template are unchanged since the
+    last build are skipped, so editing one template only rebuilds the pages
+    that use it. With jobs > 1 pages are rendered in a process pool, where each
+    worker starts from a copy of block_cache and sends back the blocks it
+    added, which are merged into block_cache. A profiler.BuildProfile
+    renders every page, serially, and times it. Returns the content-relative
+    paths of the pages that were written.
+
+    Raises PageError, naming the page, when a page cannot be rendered;
+    pages are still written up to that one.
+    """
+    if not os.path.isdir(content_dir):
+        raise FileNotFoundError(f"Content directory '{content_dir}' does not exist.")
+
+    templates = TemplateSet(content_dir, template_path)
+    manifest_path = os.path.join(dest_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    previous = manifest["pages"]
+    if profile is not None:
+        # a profile of skipped pages would be empty
+        previous = {}
+
+    pages = {}
+    built = []
+    markdowns = []
+    page_templates = []
+    for rel_path in iter_sources(content_dir):
+        source_path = os.path.join(content_dir, rel_path)
+        dest_path = os.path.join(dest_dir, page_dest(rel_path))
+        stat = os.stat(source_path)
+        template = templates.for_page(rel_path)
+        template_hash = template.digest if template is not None else None
+        entry = previous.get(rel_path)
+        if entry and (
+            entry["template"] != template_hash or not os.path.exists(dest_path)
+        ):
+            entry = None
+
+        # the stat check lets unchanged pages skip reading the source at all
+        if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            pages[rel_path] = entry
+            continue
+
+        with open(source_path, "rb") as f:
+            source = f.read()
+        source_hash = hashlib.sha256(source).hexdigest()
+        if not entry or entry["hash"] != source_hash:
+            try:
+                markdown = source.decode("utf-8")
+            except UnicodeDecodeError as e:
+                raise PageError(rel_path, e) from e
+            built.append(rel_path)
+            markdowns.append(markdown)
+            page_templates.append(template)
+
+        pages[rel_path] = {
+            "hash": source_hash,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "template": template_hash,
+        }
+
+    if profile is not None:
+        rendered = profile.render_pages(
+            built, markdowns, page_templates, block_cache
+        )
+    else:
+        rendered = render_pages(markdowns, page_templates, jobs, block_cache)
+    written = 0
+    try:
+        # under jobs, a worker's exception is raised here at its page
+        for html in rendered:
+            write_page(os.path.join(dest_dir, page_dest(built[written])), html)
+            written += 1
+    except ValueError as e:
+        raise PageError(built[written], e) from e
+
+    removed = [rel_path for rel_path in manifest["pages"] if rel_path not in pages]
+    for rel_path in removed:
+        remove_page(os.path.join(dest_dir, page_dest(rel_path)))
+
+    if built or removed or pages != manifest["pages"]:
+        save_manifest(
+            manifest_path,
+            {"version": MANIFEST_VERSION, "pages": pages},
+        )
+    return built
+
+
+def iter_sources(content_dir, prefix=""):
+    # os.scandir with string prefixes avoids os.walk + relpath, which
+    # dominated no-op rebuilds of large sites.
+    with os.scandir(os.path.join(content_dir, prefix)) as it:
+        entries = sorted(it, key=lambda entry: entry.name)
+    for entry in entries:
+        if entry.is_dir():
+            yield from iter_sources(content_dir, prefix + entry.name + os.sep)
+        elif entry.name.endswith(".md"):
+            yield prefix + entry.name
+
+
+def page_dest(rel_path):
+    return os.path.splitext(rel_path)[0] + ".html"
+
+
+def render_pages(markdowns, templates=None, jobs=1, block_cache=None):
+    """Yield the encoded HTML of each page, in order. templates holds each
+    page's Template, or None for pages rendered bare."""
+    if templates is None:
+        templates = [None] * len(markdowns)
+    if jobs <= 1 or len(markdowns) <= 1:
+        for markdown, template in zip(markdowns, templates):
+            yield render_page(markdown, template, block_cache)
+        return
+
+    # each distinct template goes to a worker once; pages refer to it by index
+    distinct = list({id(template): template for template in templates}.values())
+    indexes = {id(template): i for i, template in enumerate(distinct)}
+    jobs = min(jobs, len(markdowns))
+    chunksize = max(1, len(markdowns) // (jobs * CHUNKS_PER_WORKER))
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(distinct, block_cache),
+    ) as executor:
+        # workers send back bytes, which pickle far cheaper than node trees;
+        # only the blocks new to a worker's cache come back as trees
+        for html, changes in executor.map(
+            _render_in_worker,
+            markdowns,
+            [indexes[id(template)] for template in templates],
+            chunksize=chunksize,
+        ):
+            if changes is not None:
+                block_cache.merge(changes)
+            yield html
+
+
+_worker_templates = None
+_worker_block_cache = None
+
+
+def _init_worker(templates, block_cache):
+    global _worker_templates, _worker_block_cache
+    _worker_templates = templates
+    _worker_block_cache = block_cache
+    if block_cache is not None:
+        block_cache.track_changes()
+
+
+def _render_in_worker(markdown, template_index):
+    html = render_page(
+        markdown, _worker_templates[template_index], _worker_block_cache
+    )
+    if _worker_block_cache is None:
+        return html, None
+    return html, _worker_block_cache.take_changes()
+
+
+def render_page(markdown, template=None, block_cache=None):
+    """Return the encoded HTML of a page, filled into template if given."""
+    node = markdown_to_html_node(markdown, block_cache)
+    if template is None:
+        return node.to_html().encode("utf-8")
+    return template.render_page(markdown, node)
+
+
+def write_page(dest_path, html):
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    with open(dest_path, "wb") as f:
+        f.write(html)
+
+
+def remove_page(dest_path):
+    try:
+        os.remove(dest_path)
+    except FileNotFoundError:
+        pass
+
+
+def load_manifest(manifest_path):
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        manifest = None
+
+    if not manifest or manifest.get("version") != MANIFEST_VERSION:
+        return {"version": MANIFEST_VERSION, "pages": {}}
+    return manifest
+
+
+def save_manifest(manifest_path, manifest):
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        # dumps uses the C encoder; dump streams through the pure-Python one
+        f.write(json.dumps(manifest))
+    os.replace(tmp_path, manifest_path)
@@ -0,0 +1,586 @@
+import heapq
+import math
+import os
+import sys
+import threading
+import time
+import traceback
+import urllib.parse
+from collections import OrderedDict
+from http import HTTPStatus
+
+import parentnode
+from blockcache import BlockCache
+from build import (
+    PageError,
+    build,
+    iter_sources,
+    page_dest,
+    remove_page,
+    render_page,
+    write_page,
+)
+from fragmentcache import FragmentCache
+from staticserver import AccessLog, StaticHandler, StaticSite, guess_type, make_server
+from template import TEMPLATE_NAME, TemplateSet
+
+try:
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+
+LIVE_RELOAD_PATH = "/__livereload"
+LIVE_RELOAD_SCRIPT = (
+    f'<script>new EventSource("{LIVE_RELOAD_PATH}").onmessage = '
+    "() => location.reload();</script>"
+).encode()
+# editors often save in several steps (write, rename, chmod); wait for the
+# events to go quiet, but never hold a batch back for long
+DEBOUNCE_SECONDS = 0.02
+MAX_BATCH_DELAY = 0.25
+# only used without watchdog, which needs no polling: directories and
+# recently changed files are checked every POLL_INTERVAL, and the other
+# files a slice at a time, each once per POLL_SCAN_INTERVAL
+POLL_INTERVAL = 0.05
+POLL_SCAN_INTERVAL = 1.0
+HOT_FILES = 64
+# comment lines keep idle event streams open through proxies, and let the
+# handler notice clients that went away
+HEARTBEAT_SECONDS = 15
+
+
+def serve(
+    content_dir,
+    dest_dir,
+    template_path=None,
+    port=8888,
+    watch=False,
+    debounce=DEBOUNCE_SECONDS,
+):
+    """Build the site, then serve dest_dir until interrupted.
+
+    With watch, pages are rebuilt as their sources or templates change and
+    open pages reload themselves.
+    """
+    built = build(content_dir, dest_dir, template_path=template_path)
+    print(f"Built {len(built)} page(s) into '{dest_dir}'.")
+
+    access_log = AccessLog(sys.stderr)
+    watcher = None
+    if watch:
+        reloads = ReloadBroadcaster()
+        site = LiveReloadSite(dest_dir, reloads)
+        # rebuilds render the same blocks out of the block cache again and
+        # again, which the fragment cache then recognizes by identity
+        parentnode.fragment_cache = FragmentCache()
+        builder = DevBuilder(content_dir, dest_dir, template_path)
+
+        def rebuild(paths):
+            start = time.perf_counter()
+            rel_paths = builder.rebuild(paths)
+            for error in builder.errors:
+                print(error, file=sys.stderr)
+            if rel_paths:
+                elapsed = (time.perf_counter() - start) * 1000
+                print(f"Rebuilt {len(rel_paths)} page(s) in {elapsed:.1f} ms.")
+                reloads.notify()
+
+        watcher = SiteWatcher(content_dir, template_path, rebuild, debounce=debounce)
+        httpd = make_server(
+            site,
+            port=port,
+            mode="threaded",
+            handler_class=LiveReloadHandler,
+            access_log=access_log,
+        )
+    else:
+        site = StaticSite(dest_dir)
+        httpd = make_server(site, port=port, mode="threaded", access_log=access_log)
+
+    print(
+        f"Serving '{dest_dir}' on http://localhost:{port}"
+        + (f" and watching '{content_dir}'..." if watch else "...")
+    )
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if watcher is not None:
+            watcher.close()
+            site.reloads.close()
+        httpd.server_close()
+        site.close()
+        access_log.close()
+
+
+class DevBuilder:
+    """Rebuilds only the pages behind a batch of changed paths.
+
+    The compiled templates and a block cache stay in memory between batches,
+    so editing one block of a page re-renders just that block, and editing a
+    template re-renders just the pages that use it. The build manifest is not
+    updated; the next full build re-checks the pages rebuilt here.
+
+    Pages that fail to render keep their last output, and the PageErrors of
+    the last batch are left in errors.
+    """
+
+    def __init__(self, content_dir, dest_dir, template_path=None, block_cache=None):
+        self.content_dir = os.path.abspath(content_dir)
+        self.dest_dir = dest_dir
+        self.template_path = template_path and os.path.abspath(template_path)
+        self.block_cache = block_cache if block_cache is not None else BlockCache()
+        self.templates = TemplateSet(self.content_dir, self.template_path)
+        self.errors = []
+
+    def rebuild(self, paths):
+        """Rebuild the pages affected by paths, absolute paths of changed
+        files where directories end with a separator. Returns the
+        content-relative paths of the pages written or removed."""
+        self.errors = []
+        content_prefix = self.content_dir + os.sep
+        if any(
+            path.startswith(content_prefix) and path.endswith(os.sep)
+            for path in paths
+        ):
+            # a directory came or went; only a scan can tell which pages
+            self.templates = TemplateSet(self.content_dir, self.template_path)
+            try:
+                rel_paths = build(
+                    self.content_dir,
+                    self.dest_dir,
+                    template_path=self.template_path,
+                    block_cache=self.block_cache,
+                )
+            except PageError as e:
+                self.errors.append(e)
+                rel_paths = []
+        else:
+            pages = {
+                path[len(content_prefix) :]
+                for path in paths
+                if path.startswith(content_prefix) and path.endswith(".md")
+            }
+            templates = {
+                path
+                for path in paths
+                if path == self.template_path
+                or (
+                    path.startswith(content_prefix)
+                    and os.path.basename(path) == TEMPLATE_NAME
+                )
+            }
+            if templates:
+                pages.update(self.template_pages(templates))
+            rel_paths = []
+            for rel_path in sorted(pages):
+                try:
+                    self.build_page(rel_path)
+                except PageError as e:
+                    self.errors.append(e)
+                else:
+                    rel_paths.append(rel_path)
+        return rel_paths
+
+    def build_page(self, rel_path):
+        """Write or remove the output of one page; raises PageError if its
+        source could not be rendered."""
+        dest_path = os.path.join(self.dest_dir, page_dest(rel_path))
+        try:
+            with open(os.path.join(self.content_dir, rel_path), "rb") as f:
+                markdown = f.read().decode("utf-8")
+        except FileNotFoundError:
+            remove_page(dest_path)
+            return
+
+        try:
+            html = render_page(
+                markdown, self.templates.for_page(rel_path), self.block_cache
+            )
+        except ValueError as e:
+            # a half-written page is normal while editing; keep the last output
+            raise PageError(rel_path, e) from e
+        write_page(dest_path, html)
+
+    def template_pages(self, changed):
+        """Recompile the templates and return the pages affected by the
+        changed template paths.
+
+        A _template.html only applies below its directory, so a page there
+        needs rebuilding if it uses a changed template, or if its template now
+        lies above that directory because the one it used was removed.
+        """
+        self.templates = TemplateSet(self.content_dir, self.template_path)
+        scopes = [
+            os.path.dirname(path) + os.sep
+            for path in changed
+            if path != self.template_path
+        ]
+        pages = []
+        for rel_path in iter_sources(self.content_dir):
+            path = self.templates.path_for(rel_path)
+            source_path = os.path.join(self.content_dir, rel_path)
+            if path in changed or any(
+                source_path.startswith(scope)
+                and not (path and path.startswith(scope))
+                for scope in scopes
+            ):
+                pages.append(rel_path)
+        return pages
+
+
+class SiteWatcher:
+    """Calls callback with sets of changed pages and templates under
+    content_dir or of the default template, batched until events have been
+    quiet for debounce seconds.
+
+    Uses watchdog's native file events when it is installed. Otherwise a
+    _Poller checks for changes every poll_interval seconds.
+    """
+
+    def __init__(
+        self,
+        content_dir,
+        template_path,
+        callback,
+        debounce=DEBOUNCE_SECONDS,
+        poll_interval=POLL_INTERVAL,
+    ):
+        self.content_dir = os.path.abspath(content_dir)
+        self.template_path = template_path and os.path.abspath(template_path)
+        self.callback = callback
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._paths = set()
+        self._first_event = 0.0
+        self._last_event = 0.0
+        self._lock = threading.Lock()
+        self._pending = threading.Event()
+        self._closed = threading.Event()
+        threading.Thread(target=self._run, daemon=True).start()
+
+        self._observer = None
+        if Observer is not None:
+            self._observer = Observer()
+            handler = _EventHandler(self.add)
+            self._observer.schedule(handler, self.content_dir, recursive=True)
+            if self.template_path:
+                self._observer.schedule(
+                    handler, os.path.dirname(self.template_path), recursive=False
+                )
+            self._observer.start()
+        else:
+            # scan now so changes made right after construction are seen
+            poller = _Poller(self.content_dir, self.template_path)
+            threading.Thread(target=self._poll, args=(poller,), daemon=True).start()
+
+    def add(self, path):
+        now = time.monotonic()
+        with self._lock:
+            if not self._paths:
+                self._first_event = now
+            self._paths.add(path)
+            self._last_event = now
+        self._pending.set()
+
+    def close(self):
+        self._closed.set()
+        self._pending.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+
+    def _run(self):
+        while True:
+            self._pending.wait()
+            if self._closed.is_set():
+                return
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    delay = min(
+                        self._last_event + self.debounce - now,
+                        self._first_event + MAX_BATCH_DELAY - now,
+                    )
+                if delay <= 0:
+                    break
+                time.sleep(delay)
+
+            with self._lock:
+                paths, self._paths = self._paths, set()
+                self._pending.clear()
+            try:
+                self.callback(paths)
+            except Exception:
+                # a failed rebuild must not stop the watcher
+                traceback.print_exc()
+
+    def _poll(self, poller):
+        share = self.poll_interval / POLL_SCAN_INTERVAL
+        while not self._closed.wait(self.poll_interval):
+            for path in poller.poll(share):
+                self.add(path)
+
+
+class _EventHandler:
+    """Forwards the watchdog events that can change a page to add, marking
+    directories with a trailing separator."""
+
+    def __init__(self, add):
+        self.add = add
+
+    def dispatch(self, event):
+        if event.event_type not in ("created", "modified", "deleted", "moved"):
+            return
+        if event.is_directory and event.event_type == "modified":
+            return
+        suffix = os.sep if event.is_directory else ""
+        self.add(os.fsdecode(event.src_path) + suffix)
+        if event.event_type == "moved":
+            self.add(os.fsdecode(event.dest_path) + suffix)
+
+
+class _Poller:
+    """Finds changed sources by polling, at a per-poll cost that grows with
+    the number of directories rather than pages.
+
+    Creating, removing or renaming an entry changes its directory's mtime,
+    which covers new and deleted pages and editors that save by renaming
+    over the old file. Writes in place only show on the file itself, so
+    recently changed files, likely the ones being edited, are stat'ed on
+    every poll and the others a share at a time.
+    """
+
+    def __init__(self, content_dir, template_path=None):
+        self.template_path = template_path
+        # directory -> (mtime_ns, names of its sources, names of its subdirs)
+        self.dirs = {}
+        # source path -> (mtime_ns, size)
+        self.files = {}
+        self.hot = OrderedDict()
+        self._order = []
+        self._cursor = 0
+        self._scan(content_dir, [])
+        self._template = _version(template_path) if template_path else None
+        for path in heapq.nlargest(HOT_FILES, self.files, key=self.files.get):
+            self.hot[path] = None
+
+    def poll(self, share=1.0):
+        """Return the paths of sources changed, added or removed since the
+        last poll, having stat'ed about share of the files that are not hot."""
+        changed = []
+        for directory, (mtime_ns, _, _) in list(self.dirs.items()):
+            # a directory forgotten with its parent earlier in this loop
+            if directory in self.dirs and _mtime_ns(directory) != mtime_ns:
+                self._rescan(directory, changed)
+
+        if self.template_path:
+            version = _version(self.template_path)
+            if version != self._template:
+                self._template = version
+                changed.append(self.template_path)
+
+        if self._cursor >= len(self._order):
+            self._order = list(self.files)
+            self._cursor = 0
+        count = math.ceil(len(self._order) * share)
+        paths = self._order[self._cursor : self._cursor + count]
+        self._cursor += count
+        for path in list(self.hot) + paths:
+            version = self.files.get(path)
+            if version is None:
+                continue
+            current = _version(path)
+            # a file gone without its directory changing yet is left to it
+            if current is not None and current != version:
+                self.files[path] = current
+                self._heat(path)
+                changed.append(path)
+        return changed
+
+    def _heat(self, path):
+        self.hot[path] = None
+        self.hot.move_to_end(path)
+        if len(self.hot) > HOT_FILES:
+            self.hot.popitem(last=False)
+
+    def _scan(self, directory, added):
+        """Record directory and everything under it, appending its sources
+        to added."""
+        names, subdirs = set(), set()
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        subdirs.add(entry.name)
+                        self._scan(entry.path, added)
+                    elif entry.name.endswith(".md") or entry.name == TEMPLATE_NAME:
+                        stat = entry.stat()
+                        names.add(entry.name)
+                        self.files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+                        added.append(entry.path)
+        except FileNotFoundError:
+            return
+        self.dirs[directory] = (mtime_ns, names, subdirs)
+
+    def _forget(self, directory, removed):
+        """Drop directory and everything under it, appending its sources to
+        removed."""
+        _, names, subdirs = self.dirs.pop(directory)
+        for name in names:
+            path = os.path.join(directory, name)
+            del self.files[path]
+            self.hot.pop(path, None)
+            removed.append(path)
+        for name in subdirs:
+            path = os.path.join(directory, name)
+            if path in self.dirs:
+                self._forget(path, removed)
+
+    def _rescan(self, directory, changed):
+        _, old_names, old_subdirs = self.dirs[directory]
+        names, subdirs = set(), set()
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        subdirs.add(entry.name)
+                    elif entry.name.endswith(".md") or entry.name == TEMPLATE_NAME:
+                        names.add(entry.name)
+        except FileNotFoundError:
+            self._forget(directory, changed)
+            return
+        self.dirs[directory] = (mtime_ns, names, subdirs)
+
+        for name in old_subdirs - subdirs:
+            path = os.path.join(directory, name)
+            if path in self.dirs:
+                self._forget(path, changed)
+        for name in subdirs - old_subdirs:
+            self._scan(os.path.join(directory, name), changed)
+        for name in old_names - names:
+            path = os.path.join(directory, name)
+            del self.files[path]
+            self.hot.pop(path, None)
+            changed.append(path)
+        # a file renamed over another keeps its name but not its stat
+        for name in names:
+            path = os.path.join(directory, name)
+            version = _version(path)
+            if version is not None and self.files.get(path) != version:
+                self.files[path] = version
+                self._heat(path)
+                changed.append(path)
+
+
+def _version(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+class ReloadBroadcaster:
+    """Wakes every waiting live reload stream when the site was rebuilt."""
+
+    def __init__(self):
+        self.version = 0
+        self.closed = False
+        self._condition = threading.Condition()
+
+    def notify(self):
+        with self._condition:
+            self.version += 1
+            self._condition.notify_all()
+
+    def wait(self, version, timeout=None):
+        """Block until the version moves past version or timeout passes;
+        returns the current version, or None once closed."""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self.closed or self.version != version, timeout
+            )
+            return None if self.closed else self.version
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+class LiveReloadSite(StaticSite):
+    """Serves the built site with a script in each page that reloads it when
+    reloads is notified."""
+
+    def __init__(self, directory, reloads):
+        super().__init__(directory)
+        self.reloads = reloads
+
+    def file_response(self, path, request_headers, cache_key=None, codings=()):
+        if guess_type(path) != "text/html":
+            return super().file_response(path, request_headers, cache_key, codings)
+
+        # the script goes into the plain page, so never compress it
+        response = super().file_response(path, request_headers, cache_key)
+        if response.status != HTTPStatus.OK:
+            return response
+        if response.file is not None:
+            with response.file:
+                body = response.file.read(response.length)
+            response.file = None
+        else:
+            body = bytes(response.body)
+        response.body = inject_script(body)
+        response.length = len(response.body)
+        return response
+
+
+def inject_script(html):
+    index = html.rfind(b"</body>")
+    if index == -1:
+        return html + LIVE_RELOAD_SCRIPT
+    return html[:index] + LIVE_RELOAD_SCRIPT + html[index:]
+
+
+class LiveReloadHandler(StaticHandler):
+    def do_GET(self):
+        if urllib.parse.urlsplit(self.path).path == LIVE_RELOAD_PATH:
+            self.stream_reloads()
+        else:
+            super().do_GET()
+
+    def stream_reloads(self):
+        """Hold the connection open as a server-sent event stream, sending a
+        reload event after each rebuild."""
+        reloads = self.server.site.reloads
+        version = reloads.version
+        self.close_connection = True
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        try:
+            while True:
+                current = reloads.wait(version, HEARTBEAT_SECONDS)
+                if current is None:
+                    return
+                if current != version:
+                    self.wfile.write(b"data: reload\n\n")
+                    version = current
+                else:
+                    self.wfile.write(b": ping\n\n")
+        except OSError:
+            # the page was closed or reloaded
+            pass
@@ -0,0 +1,78 @@
+import threading
+from collections import OrderedDict
+
+
+# enough for the repeated blocks of a large site; sizes are in characters,
+# and entries also keep their nodes alive
+FRAGMENT_CACHE_SIZE = 4 * 2**20
+# subtrees, in nodes, worth a lookup: smaller ones render faster than they
+# are looked up, bigger ones are whole pages that rarely recur, and joining
+# them at every level would be quadratic in depth
+MIN_FRAGMENT_NODES = 8
+MAX_FRAGMENT_NODES = 512
+
+
+class FragmentCache:
+    """Bounded LRU cache of the rendered HTML of subtrees, keyed by their
+    fingerprint digest.
+
+    Each entry keeps the node it was rendered from. A lookup with another
+    node only hits if the two trees are equal, so a hash collision can never
+    return the wrong HTML; with the same node, the usual case for blocks
+    shared through a BlockCache, the check is free.
+    """
+
+    def __init__(self, max_size=FRAGMENT_CACHE_SIZE):
+        self.max_size = max_size
+        # fragments above this are near whole pages, which rarely recur and
+        # would each evict many of the blocks that do
+        self.max_fragment_size = max_size // 16
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, node, key=None):
+        """Return the HTML of a tree equal to node, or None. key is the
+        digest of node.fingerprint() if the caller already has it."""
+        if key is None:
+            key = node.fingerprint()[0]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        hit = entry is not None and (entry[0] is node or entry[0] == node)
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entry[1] if hit else None
+
+    def put(self, node, html, key=None):
+        if len(html) > self.max_fragment_size:
+            return
+        if key is None:
+            key = node.fingerprint()[0]
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[1])
+            self._entries[key] = (node, html)
+            self.size += len(html)
+            while self.size > self.max_size:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def hit_ratio(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
@@ -1,29 +1,286 @@
+import hashlib
+
+# each special character and its entity, & first so the entities are not
+# escaped again; attributes are always written in double quotes
+TEXT_ESCAPES = (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"))
+ATTRIBUTE_ESCAPES = TEXT_ESCAPES + (('"', "&quot;"),)
+# serialized props, keyed by their items; links to the same target share one
+PROPS_CACHE_SIZE = 4096
+_props_cache = {}
+# the _hash of a fingerprinted leaf, whose digest is not kept
+_FROZEN = ()
+_set = object.__setattr__
+
+
 class HTMLNode:
+    """A node of an HTML tree.
+
+    Nodes compare and hash structurally. Once a tree is fingerprinted, which
+    hash() and to_html() with a fragment cache do, each parent keeps its
+    fingerprint, and the tree is frozen so the fingerprint stays valid:
+    assigning a field or changing a children list or props raises. props
+    are copied into FrozenProps for that, so changing the dict a node was
+    built from does not reach it either. Build a new node instead, or a copy
+    from pickle, which is not frozen.
+    """
+
+    __slots__ = ("tag", "value", "children", "props", "_hash")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
-        self.tag = tag
-        self.value = value
-        self.children = children
-        self.props = props
+        # a new node cannot be in any cached tree yet, so its fields are set
+        # through the slots directly, which is also cheaper than __setattr__
+        _set_tag(self, tag)
+        _set_value(self, value)
+        _set_children(self, children)
+        _set_props(self, props)
+        _set_hash(self, None)
+
+    def __setattr__(self, name, value):
+        if self._hash is not None:
+            raise AttributeError("Cannot change a node once it is fingerprinted.")
+        _set(self, name, value)
+
+    def __getstate__(self):
+        # a copy starts out unfrozen, its children pickled as a NodeList and
+        # its props as a dict
+        return None, {
+            "tag": self.tag,
+            "value": self.value,
+            "children": self.children,
+            "props": self.props,
+        }
+
+    def __setstate__(self, state):
+        for name, value in state[1].items():
+            _set(self, name, value)
+        _set_hash(self, None)
 
     def to_html(self):
+        return "".join(self.iter_html())
+
+    def iter_html(self):
         raise NotImplementedError()
 
+    def render_to(self, writer):
+        # writer is anything with writelines(), e.g. an open file or
+        # socket.makefile("w"); chunks are streamed without building the page.
+        writer.writelines(self.iter_html())
+
     def props_to_html(self):
         if not self.props:
             return ""
 
-        html_props = ""
-        for k, v in self.props.items():
-            html_props += f' {k}="{v}"'
+        key = tuple(self.props.items())
+        html_props = _props_cache.get(key)
+        if html_props is None:
+            if len(_props_cache) >= PROPS_CACHE_SIZE:
+                _props_cache.clear()
+            html_props = _props_cache[key] = "".join(
+                [f' {k}="{escape_attribute(str(v))}"' for k, v in key]
+            )
         return html_props
 
     def __repr__(self):
         return f"HTMLNode({self.tag}, {self.value}, {self.children}, {self.props})"
 
     def __eq__(self, other):
-        return (
-            self.tag == other.tag
-            and self.value == other.value
-            and self.children == other.children
-            and self.props == other.props
-        )
+        if not isinstance(other, HTMLNode):
+            return NotImplemented
+        # compares pairs of parents from an explicit stack rather than through
+        # list equality, which would recurse once per level; leaves are
+        # compared in the loop over their parent's children
+        stack = [(self, other)]
+        while stack:
+            a, b = stack.pop()
+            if a.tag != b.tag or a.value != b.value or a.props != b.props:
+                return False
+            a_children, b_children = a.children, b.children
+            if a_children is None or b_children is None:
+                if a_children is not b_children:
+                    return False
+                continue
+            if len(a_children) != len(b_children):
+                return False
+            for x, y in zip(a_children, b_children):
+                if x is y:
+                    # shared subtrees, e.g. from a BlockCache
+                    continue
+                if x.children is None and y.children is None:
+                    if x.tag != y.tag or x.value != y.value or x.props != y.props:
+                        return False
+                else:
+                    stack.append((x, y))
+        return True
+
+    def __hash__(self):
+        """Hash the tree structurally, consistently with __eq__. Like any
+        fingerprint, this freezes the whole tree, so a tree in a set or dict
+        cannot change under it."""
+        return int(self.fingerprint()[0][:16], 16)
+
+    def fingerprint(self):
+        """Return a digest of the tree's structure and its number of nodes.
+
+        The digest is a blake2b over each parent's fields, its leaves' fields
+        and its other children's digests, so unlike hash() it is the same in
+        every process. Fields are joined without escaping, so different
+        trees can share a digest: compare trees before relying on a match.
+
+        Computed once per parent: a subtree whose fingerprint is cached is
+        not walked again.
+        """
+        cached = self._hash
+        if cached:
+            return cached
+        if self.children is None:
+            _set_hash(self, _FROZEN)
+            return _digest([_freeze_fields(self)]), 1
+
+        # like ParentNode.to_html, a stack of partly visited parents; a
+        # parent is digested from its fields and its children's
+        node = self
+        children = iter(self.children)
+        parts = [_freeze_fields(self)]
+        size = 1
+        stack = []
+        while True:
+            for child in children:
+                if child.children is None:
+                    _set_hash(child, _FROZEN)
+                    parts.append(_freeze_fields(child))
+                    size += 1
+                else:
+                    cached = child._hash
+                    if cached:
+                        parts.append(cached[0])
+                        size += cached[1]
+                        continue
+                    stack.append((node, children, parts, size))
+                    node, children, size = child, iter(child.children), 1
+                    parts = [_freeze_fields(child)]
+                    break
+            else:
+                fingerprint = (_digest(parts), size)
+                if isinstance(node.children, NodeList):
+                    node.children.__class__ = FrozenNodeList
+                else:
+                    _set_children(node, FrozenNodeList(node.children))
+                _set_hash(node, fingerprint)
+                if not stack:
+                    return fingerprint
+                node, children, parts, size = stack.pop()
+                parts.append(fingerprint[0])
+                size += fingerprint[1]
+
+
+def _freeze_fields(node):
+    # props in key order, as dicts with the same items compare equal
+    props = node.props
+    if props is None:
+        return f"{node.tag}\x01{node.value}"
+    if type(props) is not FrozenProps:
+        props = FrozenProps(props)
+        _set_props(node, props)
+    return f"{node.tag}\x01{node.value}\x01{sorted(props.items())}"
+
+
+def _digest(parts):
+    text = "\x00".join(parts).encode("utf-8")
+    return hashlib.blake2b(text, digest_size=16).hexdigest()
+
+
+_set_tag = HTMLNode.tag.__set__
+_set_value = HTMLNode.value.__set__
+_set_children = HTMLNode.children.__set__
+_set_props = HTMLNode.props.__set__
+_set_hash = HTMLNode._hash.__set__
+
+
+class NodeList(list):
+    """The children of a parent, which become a FrozenNodeList in place
+    when the parent is fingerprinted."""
+
+    __slots__ = ()
+
+
+class FrozenNodeList(NodeList):
+    """The children of a fingerprinted parent, which cannot be changed."""
+
+    __slots__ = ()
+
+    def __reduce__(self):
+        return NodeList, (list(self),)
+
+
+class FrozenProps(dict):
+    """A copy of the props of a fingerprinted node, which cannot be changed."""
+
+    __slots__ = ()
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+def _frozen(self, *args, **kwargs):
+    raise TypeError("Cannot change the children of a fingerprinted node.")
+
+
+def _frozen_props(self, *args, **kwargs):
+    raise TypeError("Cannot change the props of a fingerprinted node.")
+
+
+for _name in (
+    "__setitem__",
+    "__delitem__",
+    "__iadd__",
+    "__imul__",
+    "append",
+    "extend",
+    "insert",
+    "pop",
+    "remove",
+    "clear",
+    "sort",
+    "reverse",
+):
+    setattr(FrozenNodeList, _name, _frozen)
+for _name in (
+    "__setitem__",
+    "__delitem__",
+    "__ior__",
+    "clear",
+    "pop",
+    "popitem",
+    "setdefault",
+    "update",
+):
+    setattr(FrozenProps, _name, _frozen_props)
+del _name
+
+
+def escape_html(text):
+    """Escape text for use as element content.
+
+    Most text has nothing to escape, and is returned as is after a scan for
+    each special character. Otherwise each is replaced in turn, which is
+    faster than str.translate whenever a character maps to several.
+    """
+    if "&" not in text and "<" not in text and ">" not in text:
+        return text
+    for char, entity in TEXT_ESCAPES:
+        text = text.replace(char, entity)
+    return text
+
+
+def escape_attribute(text):
+    """Escape text for use inside a double quoted attribute value."""
+    if (
+        "&" not in text
+        and "<" not in text
+        and ">" not in text
+        and '"' not in text
+    ):
+        return text
+    for char, entity in ATTRIBUTE_ESCAPES:
+        text = text.replace(char, entity)
+    return text
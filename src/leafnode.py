@@ -1,15 +1,34 @@
-from htmlnode import HTMLNode
+from htmlnode import (
+    HTMLNode,
+    _set_children,
+    _set_hash,
+    _set_props,
+    _set_tag,
+    _set_value,
+    escape_html,
+)
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag=None, value=None, props=None):
-        super().__init__(tag=tag, value=value, props=props)
+        # HTMLNode.__init__, inlined: leaves are the most common node
+        _set_tag(self, tag)
+        _set_value(self, value)
+        _set_children(self, None)
+        _set_props(self, props)
+        _set_hash(self, None)
 
     def to_html(self):
-        if not self.value:
+        if self.value is None:
             raise ValueError("Leaf Node requires a non-null value.")
 
+        value = escape_html(str(self.value))
         if not self.tag:
-            return str(self.value)
+            return value
+
+        return f"<{self.tag}{self.props_to_html()}>{value}</{self.tag}>"
 
-        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+    def iter_html(self):
+        yield self.to_html()
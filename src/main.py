@@ -1,27 +1,196 @@
+import argparse
+import os
 import re
+import time
+from assets import process_assets
+import parentnode
+from blockcache import BlockCache
+from fragmentcache import FragmentCache
 from parentnode import ParentNode
 from textnode import TextNode
 from leafnode import LeafNode
 
 
-def main():
-    # node = TextNode(
-    #     "This is text with an ![image](https://storage.googleapis.com/qvault-webapp-dynamic-assets/course_assets/zjjcJKZ.png) and another ![second image](https://storage.googleapis.com/qvault-webapp-dynamic-assets/course_assets/3elNhQu.png)",
-    #     "text",
-    # )
-    # new_nodes = split_nodes_image([node])
-    # print(new_nodes)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Static site generator")
+    subparsers = parser.add_subparsers(dest="command", required=True)
 
-    markdown = "```import pandas as pd```"
-    html_node = markdown_to_html_node(markdown)
+    site_parser = argparse.ArgumentParser(add_help=False)
+    site_parser.add_argument(
+        "--content", type=str, help="Directory of markdown pages", default="content"
+    )
+    site_parser.add_argument(
+        "--dest", type=str, help="Directory to write HTML to", default="public"
+    )
+    site_parser.add_argument(
+        "--template",
+        type=str,
+        help="HTML template for pages without a _template.html",
+        default=None,
+    )
 
-    expected = ParentNode(
-        tag="div",
-        children=ParentNode(
-            tag="pre", children=LeafNode(tag=f"code", value="import pandas as pd")
-        ),
+    build_parser = subparsers.add_parser(
+        "build", parents=[site_parser], help="Build the site"
+    )
+    build_parser.add_argument(
+        "--jobs",
+        type=int,
+        help="Worker processes to render pages with (0 for one per CPU)",
+        default=1,
+    )
+    build_parser.add_argument(
+        "--block-cache",
+        type=str,
+        help="File to keep rendered blocks in between builds",
+        default=None,
+    )
+    build_parser.add_argument(
+        "--block-cache-size",
+        type=int,
+        help="Maximum number of cached blocks",
+        default=4096,
+    )
+    build_parser.add_argument(
+        "--fragment-cache-mb",
+        type=int,
+        help="Reuse the rendered HTML of repeated subtrees, keeping up to this "
+        "many MiB per process (0 disables)",
+        default=0,
+    )
+    build_parser.add_argument(
+        "--optimize-assets",
+        action="store_true",
+        help="Fingerprint static assets and precompress text files",
+    )
+    build_parser.add_argument(
+        "--profile",
+        type=str,
+        metavar="REPORT",
+        help="Rebuild every page serially, timing each phase, and write a "
+        "JSON report to REPORT",
+        default=None,
     )
-    print(html_node == expected)
+    build_parser.add_argument(
+        "--profile-top",
+        type=int,
+        help="Number of slowest pages to summarise",
+        default=10,
+    )
+    build_parser.add_argument(
+        "--profile-page",
+        type=str,
+        metavar="PAGE",
+        help="Run cProfile over rendering one content-relative page",
+        default=None,
+    )
+    build_parser.add_argument(
+        "--profile-stats",
+        type=str,
+        help="File to dump --profile-page pstats data to",
+        default=None,
+    )
+    serve_parser = subparsers.add_parser(
+        "serve", parents=[site_parser], help="Build the site and serve it"
+    )
+    serve_parser.add_argument(
+        "--port", type=int, help="Port to serve HTTP on", default=8888
+    )
+    serve_parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Rebuild changed pages and reload them in open browsers",
+    )
+    serve_parser.add_argument(
+        "--debounce-ms",
+        type=float,
+        help="Quiet period that ends a batch of file changes",
+        default=20,
+    )
+    args = parser.parse_args(argv)
+
+    # imported here because build depends on this module
+    from build import PageError, build, page_dest
+
+    if args.command == "serve":
+        from devserver import serve
+
+        serve(
+            args.content,
+            args.dest,
+            template_path=args.template,
+            port=args.port,
+            watch=args.watch,
+            debounce=args.debounce_ms / 1000,
+        )
+        return
+
+    block_cache = None
+    if args.block_cache:
+        block_cache = BlockCache.load(args.block_cache, args.block_cache_size)
+
+    fragment_cache = None
+    if args.fragment_cache_mb > 0:
+        # worker processes forked by --jobs start from a copy of it
+        fragment_cache = FragmentCache(args.fragment_cache_mb * 2**20)
+        parentnode.fragment_cache = fragment_cache
+
+    profile = None
+    if args.profile:
+        from profiler import BuildProfile
+
+        profile = BuildProfile()
+
+    jobs = args.jobs or os.cpu_count()
+    start = time.perf_counter()
+    try:
+        built = build(
+            args.content,
+            args.dest,
+            template_path=args.template,
+            jobs=jobs,
+            block_cache=block_cache,
+            profile=profile,
+        )
+    except PageError as e:
+        parser.exit(1, f"{e}\n")
+    print(f"Built {len(built)} page(s) into '{args.dest}'.")
+
+    if profile is not None:
+        profile.save(args.profile, args.profile_top, time.perf_counter() - start)
+        print(profile.summary(args.profile_top))
+        print(f"Wrote profile report to '{args.profile}'.")
+
+    if args.profile_page:
+        from profiler import profile_page
+        from template import TemplateSet
+
+        with open(os.path.join(args.content, args.profile_page), encoding="utf-8") as f:
+            markdown = f.read()
+        template = TemplateSet(args.content, args.template).for_page(
+            args.profile_page
+        )
+        print(profile_page(markdown, template, args.profile_stats))
+
+    if args.optimize_assets:
+        compressed = process_assets(
+            args.dest, html_paths=[page_dest(rel_path) for rel_path in built]
+        )
+        print(f"Wrote {len(compressed)} precompressed file(s).")
+
+    if block_cache is not None:
+        block_cache.save(args.block_cache)
+        print(
+            f"Block cache: {block_cache.hits} hit(s), {block_cache.misses} miss(es), "
+            f"{block_cache.hit_ratio():.1%} hit ratio."
+        )
+
+    if fragment_cache is not None and jobs == 1:
+        # worker processes keep their own counters
+        print(
+            f"Fragment cache: {fragment_cache.hits} hit(s), "
+            f"{fragment_cache.misses} miss(es), "
+            f"{fragment_cache.hit_ratio():.1%} hit ratio."
+        )
 
 
 def text_node_to_html_node(text_node):
@@ -42,110 +211,128 @@ def text_node_to_html_node(text_node):
             raise Exception("Unknown text type for TextNode.")
 
 
+INLINE_DELIMITERS = {"**": "bold", "*": "italic", "`": "code"}
+INLINE_DELIMITER_PATTERN = re.compile(r"\*\*|\*|`")
+IMAGE_PATTERN = re.compile(r"!\[(.*?)\]\((.*?)\)")
+LINK_PATTERN = re.compile(r"\[(.*?)\]\((.*?)\)")
+HEADING_PATTERN = re.compile(r"#{1,6} .+")
+CODE_PATTERN = re.compile(r"`{3}.+`{3}$")
+QUOTE_PATTERN = re.compile(r"> .+")
+
+
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
+    pattern = re.compile(re.escape(delimiter))
     new_nodes = []
     for old_node in old_nodes:
         if old_node.text_type != "text":
             new_nodes.append(old_node)
             continue
 
-        split_nodes = []
-        sections = old_node.text.split(delimiter)
+        _append_delimited(
+            new_nodes, old_node.text, pattern, {delimiter: text_type}, _append_text
+        )
+    return new_nodes
+
 
-        if len(sections) % 2 == 0:
+def _append_delimited(nodes, text, pattern, text_types, append_plain):
+    # Delimiters listed first in text_types bind tightest, e.g. a "*" inside
+    # "**...**" is literal but a "**" inside "*...*" closes nothing and is an
+    # error, the same result as splitting on each delimiter in turn.
+    precedence = {delimiter: i for i, delimiter in enumerate(text_types)}
+    opened = None
+    pos = 0
+    for match in pattern.finditer(text):
+        delimiter = match.group()
+        start = match.start()
+        if opened is None:
+            if start > pos:
+                append_plain(nodes, text, pos, start)
+            opened = delimiter
+            pos = match.end()
+        elif delimiter == opened:
+            # don't create nodes for empty string
+            if start > pos:
+                nodes.append(TextNode(text[pos:start], text_types[opened]))
+            opened = None
+            pos = match.end()
+        elif precedence[delimiter] < precedence[opened]:
             raise ValueError("Invalid markdown, formatted section not closed")
 
-        for i in range(len(sections)):
-            if sections[i] == "":
-                continue
-            if i % 2 == 0:
-                split_nodes.append(TextNode(sections[i], "text"))
-            else:
-                split_nodes.append(TextNode(sections[i], text_type))
+    if opened is not None:
+        raise ValueError("Invalid markdown, formatted section not closed")
 
-        new_nodes.extend(split_nodes)
-    return new_nodes
+    if pos < len(text):
+        append_plain(nodes, text, pos, len(text))
 
 
-def extract_markdown_images(text):
-    return re.findall(r"!\[(.*?)\]\((.*?)\)", text)
+def _append_text(nodes, text, pos, endpos):
+    nodes.append(TextNode(text[pos:endpos], "text"))
 
 
-def extract_markdown_links(text):
-    return re.findall(r"\[(.*?)\]\((.*?)\)", text)
+def _append_matches(nodes, text, pos, endpos, pattern, text_type, append_plain):
+    for match in pattern.finditer(text, pos, endpos):
+        start = match.start()
+        if start > pos:
+            append_plain(nodes, text, pos, start)
+        nodes.append(TextNode(match.group(1), text_type, url=match.group(2)))
+        pos = match.end()
 
+    if pos < endpos:
+        append_plain(nodes, text, pos, endpos)
 
-def split_nodes_image(old_nodes):
-    new_nodes = []
-    for old_node in old_nodes:
-        if old_node.text_type != "text":
-            new_nodes.append(old_node)
-            continue
 
-        split_nodes = []
-        images = extract_markdown_images(old_node.text)
+def _append_links(nodes, text, pos, endpos):
+    _append_matches(nodes, text, pos, endpos, LINK_PATTERN, "link", _append_text)
 
-        if len(images) == 0:
-            new_nodes.append(old_node)
-            new_nodes.extend(split_nodes)
-            continue
 
-        text = old_node.text
-        for i in range(len(images)):
-            split = text.split(f"![{images[i][0]}]({images[i][1]})", 1)
+def _append_images_and_links(nodes, text, pos, endpos):
+    _append_matches(nodes, text, pos, endpos, IMAGE_PATTERN, "image", _append_links)
 
-            # don't create nodes for empty string
-            if len(split[0]):
-                split_nodes.append(TextNode(split[0], "text"))
-            split_nodes.append(TextNode(images[i][0], "image", url=images[i][1]))
-            text = split[1]
 
-        if text:
-            split_nodes.append(TextNode(text, "text"))
+def extract_markdown_images(text):
+    return IMAGE_PATTERN.findall(text)
 
-        new_nodes.extend(split_nodes)
-    return new_nodes
+
+def extract_markdown_links(text):
+    return LINK_PATTERN.findall(text)
+
+
+def split_nodes_image(old_nodes):
+    return _split_nodes_pattern(old_nodes, IMAGE_PATTERN, "image")
 
 
 def split_nodes_link(old_nodes):
-    new_nodes = []
-    for old_node in old_nodes:
-        if old_node.text_type != "text":
-            new_nodes.append(old_node)
-            continue
+    return _split_nodes_pattern(old_nodes, LINK_PATTERN, "link")
 
-        split_nodes = []
-        links = extract_markdown_links(old_node.text)
 
-        if len(links) == 0:
+def _split_nodes_pattern(old_nodes, pattern, text_type):
+    # Slice the original text around each match span rather than re-splitting
+    # the remainder, so each node costs one pass however many matches it has.
+    new_nodes = []
+    for old_node in old_nodes:
+        if old_node.text_type != "text" or not old_node.text:
             new_nodes.append(old_node)
-            new_nodes.extend(split_nodes)
             continue
 
         text = old_node.text
-        for i in range(len(links)):
-            split = text.split(f"[{links[i][0]}]({links[i][1]})", 1)
-
-            # don't create nodes for empty string
-            if len(split[0]):
-                split_nodes.append(TextNode(split[0], "text"))
-            split_nodes.append(TextNode(links[i][0], "link", url=links[i][1]))
-            text = split[1]
-
-        if text:
-            split_nodes.append(TextNode(text, "text"))
-
-        new_nodes.extend(split_nodes)
+        _append_matches(
+            new_nodes, text, 0, len(text), pattern, text_type, _append_text
+        )
     return new_nodes
 
 
 def text_to_textnodes(text):
-    node = TextNode(text, text_type="text")
-    nodes = split_nodes_delimiter([node], delimiter="**", text_type="bold")
-    nodes = split_nodes_delimiter(nodes, delimiter="*", text_type="italic")
-    nodes = split_nodes_delimiter(nodes, delimiter="`", text_type="code")
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
+    # One scan over the text instead of chaining split_nodes_delimiter,
+    # split_nodes_image and split_nodes_link; images and links are only
+    # looked for in the plain runs between delimiters.
+    nodes = []
+    _append_delimited(
+        nodes,
+        text,
+        INLINE_DELIMITER_PATTERN,
+        INLINE_DELIMITERS,
+        _append_images_and_links,
+    )
     return nodes
 
 
@@ -153,101 +340,145 @@ def markdown_to_blocks(markdown):
     return [b.strip() for b in markdown.split("\n\n") if b.strip()]
 
 
+def iter_markdown_blocks(lines):
+    """Yield the same blocks as markdown_to_blocks, reading lines lazily.
+
+    lines is any iterable of lines, such as an open text file. Byte lines,
+    e.g. from iter(mmap_obj.readline, b""), are decoded as UTF-8.
+    """
+    block = []
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if line.endswith("\n"):
+            line = line[:-1]
+
+        # a run of two or more newlines is an empty line ending the block
+        if line:
+            block.append(line)
+            continue
+        if block:
+            text = "\n".join(block).strip()
+            if text:
+                yield text
+            block = []
+
+    if block:
+        text = "\n".join(block).strip()
+        if text:
+            yield text
+
+
 def block_to_block_type(block):
-    if re.findall(r"^#{1,6} .+", block):
-        return "heading"
-    if re.findall(r"^`{3}.+`{3}$", block):
-        return "code"
-    if re.findall(r"^> .+", block):
-        return "quote"
-    if is_unordered_list(block):
+    # Every block type but paragraph is recognisable by its first character,
+    # so plain paragraphs never touch a regex.
+    first = block[:1]
+    if first == "#":
+        return "heading" if HEADING_PATTERN.match(block) else "paragraph"
+    if first == "`":
+        return "code" if CODE_PATTERN.match(block) else "paragraph"
+    if first == ">":
+        return "quote" if QUOTE_PATTERN.match(block) else "paragraph"
+
+    # list checks skip blank lines, so look past leading newlines
+    lead = block.lstrip("\n")[:1]
+    if lead in ("*", "-", "") and is_unordered_list(block):
         return "unordered_list"
-    if is_ordered_list(block):
+    if lead == "1" and is_ordered_list(block):
         return "ordered_list"
     return "paragraph"
 
 
 def is_unordered_list(block):
-    lines = [l for l in block.split("\n") if l]
-
-    for line in lines:
-        pattern = r"^(\*|-) .+"
-        temp = re.findall(pattern, line)
-        if not temp:
+    for line in block.split("\n"):
+        if line and (len(line) < 3 or line[:2] not in ("* ", "- ")):
             return False
 
     return True
 
 
 def is_ordered_list(block):
-    lines = [l for l in block.split("\n") if l]
-
-    for i, line in enumerate(lines):
-        pattern = "^" + str(i + 1) + r"\. .+"
-        temp = re.findall(pattern, line)
-        if not temp:
+    number = 1
+    for line in block.split("\n"):
+        if not line:
+            continue
+        prefix = f"{number}. "
+        if len(line) <= len(prefix) or not line.startswith(prefix):
             return False
+        number += 1
 
     return True
 
 
-def markdown_to_html_node(markdown):
+def markdown_to_html_node(markdown, block_cache=None):
     blocks = markdown_to_blocks(markdown)
+    if block_cache is None:
+        children = [block_to_html_node(block) for block in blocks]
+    else:
+        children = [
+            block_cache.get_or_render(block, block_to_html_node) for block in blocks
+        ]
+    return ParentNode(tag="div", children=children)
+
+
+def write_markdown_html(lines, writer):
+    """Render markdown read lazily from lines (e.g. an open file) to writer.
 
-    children = []
+    Produces the same HTML as markdown_to_html_node(...).to_html(), but only
+    one block is held in memory at a time.
+    """
+    blocks = iter_markdown_blocks(lines)
     for block in blocks:
-        block_type = block_to_block_type(block)
-        match block_type:
-            case "heading":
-                hashtags_before_text = block.split(" ")[0]
-                num_of_hashtags = len(hashtags_before_text)
-                text_after_hashtags = block[num_of_hashtags + 1 :]
-                children.append(
-                    ParentNode(
-                        tag=f"h{num_of_hashtags}",
-                        children=text_to_children(text_after_hashtags),
-                    )
-                )
-            case "code":
-                children.append(
-                    ParentNode(
-                        tag="pre",
-                        children=ParentNode(
-                            tag="code", children=text_to_children(block[3:-3])
-                        ),
-                    )
-                )
-            case "quote":
-                children.append(
-                    ParentNode(
-                        tag="blockquote",
-                        children=text_to_children(block[2:]),
-                    )
-                )
-            case "unordered_list":
-                children.append(
-                    ParentNode(
-                        tag="ul",
-                        children=[
-                            ParentNode(tag="li", children=text_to_children(text[2:]))
-                            for text in block.split("\n")
-                        ],
-                    )
-                )
-            case "ordered_list":
-                children.append(
-                    ParentNode(
-                        tag="ol",
-                        children=[
-                            ParentNode(tag="li", children=text_to_children(text[3:]))
-                            for text in block.split("\n")
-                        ],
-                    )
-                )
-            case _:
-                children.append(ParentNode(tag="p", children=text_to_children(block)))
+        writer.write("<div>")
+        block_to_html_node(block).render_to(writer)
+        break
+    else:
+        raise ValueError("ParentNode children attribute cannot be None.")
 
-    return ParentNode(tag="div", children=children)
+    for block in blocks:
+        block_to_html_node(block).render_to(writer)
+    writer.write("</div>")
+
+
+def block_to_html_node(block):
+    block_type = block_to_block_type(block)
+    match block_type:
+        case "heading":
+            hashtags_before_text = block.split(" ")[0]
+            num_of_hashtags = len(hashtags_before_text)
+            text_after_hashtags = block[num_of_hashtags + 1 :]
+            return ParentNode(
+                tag=f"h{num_of_hashtags}",
+                children=text_to_children(text_after_hashtags),
+            )
+        case "code":
+            return ParentNode(
+                tag="pre",
+                children=ParentNode(tag="code", children=text_to_children(block[3:-3])),
+            )
+        case "quote":
+            return ParentNode(
+                tag="blockquote",
+                children=text_to_children(block[2:]),
+            )
+        case "unordered_list":
+            return ParentNode(
+                tag="ul",
+                children=[
+                    ParentNode(tag="li", children=text_to_children(text[2:]))
+                    for text in block.split("\n")
+                ],
+            )
+        case "ordered_list":
+            return ParentNode(
+                tag="ol",
+                children=[
+                    ParentNode(tag="li", children=text_to_children(text[3:]))
+                    for text in block.split("\n")
+                ],
+            )
+        case _:
+            return ParentNode(tag="p", children=text_to_children(block))
 
 
 def text_to_children(text):
@@ -1,24 +1,121 @@
-from htmlnode import HTMLNode
+from fragmentcache import MAX_FRAGMENT_NODES, MIN_FRAGMENT_NODES
+from htmlnode import (
+    HTMLNode,
+    NodeList,
+    _set_children,
+    _set_hash,
+    _set_props,
+    _set_tag,
+    _set_value,
+)
+
+
+# a FragmentCache shared by every tree in the process, or None. Off by
+# default: hashing a tree costs about as much as rendering it, which only
+# pays off where the same subtrees are rendered again and again
+fragment_cache = None
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         if children is None:
             children = []
         if not isinstance(children, list):
             children = [children]
-        super().__init__(tag, None, children, props)
+        # HTMLNode.__init__, inlined like in LeafNode
+        _set_tag(self, tag)
+        _set_value(self, None)
+        _set_children(self, NodeList(children))
+        _set_props(self, props)
+        _set_hash(self, None)
 
     def to_html(self):
+        # nesting is followed with an explicit stack of child iterators rather
+        # than recursion, so depth is not limited by the recursion limit; a
+        # node's leaves render in one loop and only nested parents are pushed.
+        # Parents of a cacheable size are looked up in the fragment cache
+        # before they are walked, and stored once rendered.
+        cache = fragment_cache
+        key = None
+        if cache is not None:
+            key, size = self.fingerprint()
+            if MIN_FRAGMENT_NODES <= size <= MAX_FRAGMENT_NODES:
+                html = cache.get(self, key)
+                if html is not None:
+                    return html
+            else:
+                key = None
+
+        self._validate()
+        parts = [f"<{self.tag}{self.props_to_html()}>"]
+        append = parts.append
+        node = self
+        start = 0
+        children = iter(self.children)
+        close = f"</{self.tag}>"
+        stack = []
+        while True:
+            for child in children:
+                if isinstance(child, ParentNode):
+                    child_key = None
+                    if cache is not None:
+                        child_key, size = child.fingerprint()
+                        if MIN_FRAGMENT_NODES <= size <= MAX_FRAGMENT_NODES:
+                            html = cache.get(child, child_key)
+                            if html is not None:
+                                append(html)
+                                continue
+                        else:
+                            child_key = None
+                    child._validate()
+                    stack.append((node, key, start, children, close))
+                    node = child
+                    key = child_key
+                    start = len(parts)
+                    append(f"<{child.tag}{child.props_to_html()}>")
+                    children = iter(child.children)
+                    close = f"</{child.tag}>"
+                    break
+                append(child.to_html())
+            else:
+                append(close)
+                html = None
+                if key is not None:
+                    html = "".join(parts[start:])
+                    cache.put(node, html, key)
+                if not stack:
+                    return "".join(parts) if html is None else html
+                node, key, start, children, close = stack.pop()
+
+    def iter_html(self):
+        # the same walk as to_html, yielding each chunk; streaming renders do
+        # not use the fragment cache, which would mean holding chunks back
+        self._validate()
+        yield f"<{self.tag}{self.props_to_html()}>"
+        children = iter(self.children)
+        close = f"</{self.tag}>"
+        stack = []
+        while True:
+            for child in children:
+                if isinstance(child, ParentNode):
+                    child._validate()
+                    yield f"<{child.tag}{child.props_to_html()}>"
+                    stack.append((children, close))
+                    children = iter(child.children)
+                    close = f"</{child.tag}>"
+                    break
+                yield child.to_html()
+            else:
+                yield close
+                if not stack:
+                    return
+                children, close = stack.pop()
+
+    def _validate(self):
         if not self.tag:
             raise ValueError("ParentNode tag attribute cannot be None.")
 
         if not self.children:
             raise ValueError("ParentNode children attribute cannot be None.")
-
-        props = self.props if self.props else ""
-        html = f"<{self.tag}{props}>"
-        for node in self.children:
-            html += node.to_html()
-        html += f"</{self.tag}>"
-        return html
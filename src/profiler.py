@@ -0,0 +1,167 @@
+import cProfile
+import io
+import json
+import pstats
+import time
+
+import main
+from build import render_page
+
+
+# split, classify and inline are measured by wrapping the module functions
+# below; tree is the rest of markdown_to_html_node, i.e. building nodes;
+# serialize includes the title and TOC slots when the template uses them
+PHASES = ("split", "classify", "inline", "tree", "serialize", "template")
+WRAPPED_FUNCTIONS = {
+    "markdown_to_blocks": "split",
+    "block_to_block_type": "classify",
+    "text_to_textnodes": "inline",
+}
+
+
+class BuildProfile:
+    """Per-page wall and CPU time of each rendering phase, plus node counts.
+
+    Pass one to build() to render through render_pages below. The phase
+    functions in main are only wrapped while that runs, so an ordinary build
+    pays nothing for profiling being available. Wrapping adds a few timer
+    calls per block, which shows up in the small phases on tiny pages.
+    """
+
+    def __init__(self):
+        self.pages = []
+        self._wall = None
+        self._cpu = None
+
+    def render_pages(self, rel_paths, markdowns, templates, block_cache=None):
+        """Yield the encoded HTML of each page like build.render_pages, serially
+        and with every page timed."""
+        originals = {name: getattr(main, name) for name in WRAPPED_FUNCTIONS}
+        for name, phase in WRAPPED_FUNCTIONS.items():
+            setattr(main, name, self._timed(phase, originals[name]))
+        try:
+            for rel_path, markdown, template in zip(rel_paths, markdowns, templates):
+                yield self.render_page(rel_path, markdown, template, block_cache)
+        finally:
+            for name, func in originals.items():
+                setattr(main, name, func)
+
+    def render_page(self, rel_path, markdown, template=None, block_cache=None):
+        self._wall = dict.fromkeys(PHASES, 0.0)
+        self._cpu = dict.fromkeys(PHASES, 0.0)
+        wall, cpu = time.perf_counter(), time.thread_time()
+
+        node = main.markdown_to_html_node(markdown, block_cache)
+        tree_wall, tree_cpu = time.perf_counter(), time.thread_time()
+        if template is None:
+            values = node.to_html().encode("utf-8")
+        else:
+            values = template.page_values(markdown, node)
+        serialize_wall, serialize_cpu = time.perf_counter(), time.thread_time()
+        html = values if template is None else template.render(values)
+        end_wall, end_cpu = time.perf_counter(), time.thread_time()
+
+        nested = ("split", "classify", "inline")
+        self._wall["tree"] = tree_wall - wall - sum(self._wall[p] for p in nested)
+        self._cpu["tree"] = tree_cpu - cpu - sum(self._cpu[p] for p in nested)
+        self._wall["serialize"] = serialize_wall - tree_wall
+        self._cpu["serialize"] = serialize_cpu - tree_cpu
+        self._wall["template"] = end_wall - serialize_wall
+        self._cpu["template"] = end_cpu - serialize_cpu
+
+        self.pages.append(
+            {
+                "page": rel_path,
+                "wall": end_wall - wall,
+                "cpu": end_cpu - cpu,
+                "phases": {
+                    phase: {"wall": self._wall[phase], "cpu": self._cpu[phase]}
+                    for phase in PHASES
+                },
+                "blocks": len(node.children),
+                **count_nodes(node),
+                "bytes": len(html),
+            }
+        )
+        return html
+
+    def _timed(self, phase, func):
+        def timed(*args, **kwargs):
+            wall, cpu = time.perf_counter(), time.thread_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._wall[phase] += time.perf_counter() - wall
+                self._cpu[phase] += time.thread_time() - cpu
+
+        return timed
+
+    def slowest(self, top=10):
+        return sorted(self.pages, key=lambda page: page["wall"], reverse=True)[:top]
+
+    def report(self, top=10, build_seconds=None):
+        totals = {phase: {"wall": 0.0, "cpu": 0.0} for phase in PHASES}
+        for page in self.pages:
+            for phase, times in page["phases"].items():
+                totals[phase]["wall"] += times["wall"]
+                totals[phase]["cpu"] += times["cpu"]
+        return {
+            "build_seconds": build_seconds,
+            "pages": len(self.pages),
+            "nodes": sum(page["nodes"] for page in self.pages),
+            "phases": totals,
+            "slowest": [page["page"] for page in self.slowest(top)],
+            "page_details": self.pages,
+        }
+
+    def save(self, path, top=10, build_seconds=None):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self.report(top, build_seconds), indent=1))
+
+    def summary(self, top=10):
+        """Return a human readable table of phase totals and slowest pages."""
+        report = self.report(top)
+        total = sum(times["wall"] for times in report["phases"].values()) or 1.0
+        lines = [f"Profiled {report['pages']} page(s), {report['nodes']} node(s)."]
+        for phase, times in report["phases"].items():
+            lines.append(
+                f"  {phase:<10} {times['wall'] * 1000:9.1f} ms wall "
+                f"{times['cpu'] * 1000:9.1f} ms cpu "
+                f"{times['wall'] / total:6.1%}"
+            )
+        lines.append(f"Slowest {min(top, len(self.pages))} page(s):")
+        for page in self.slowest(top):
+            lines.append(
+                f"  {page['wall'] * 1000:8.2f} ms  {page['page']} "
+                f"({page['blocks']} blocks, {page['nodes']} nodes)"
+            )
+        return "\n".join(lines)
+
+
+def count_nodes(root):
+    """Count the nodes of a tree, and how many of them are leaves."""
+    nodes = leaves = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        nodes += 1
+        children = node.children
+        if children is None:
+            leaves += 1
+        elif isinstance(children, list):
+            stack.extend(children)
+        else:
+            stack.append(children)
+    return {"nodes": nodes, "leaves": leaves}
+
+
+def profile_page(markdown, template=None, stats_path=None, limit=20):
+    """Render one page under cProfile. Dumps pstats data to stats_path when
+    given and returns the top functions by cumulative time as text."""
+    profiler = cProfile.Profile()
+    profiler.runcall(render_page, markdown, template)
+    if stats_path:
+        profiler.dump_stats(stats_path)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
@@ -0,0 +1,35 @@
+import os
+import tempfile
+import unittest
+
+
+class SiteTestCase(unittest.TestCase):
+    """A test case with a small site in a temporary directory: the pages in
+    PAGES under content, a default template, and public for the output."""
+
+    TEMPLATE = "<title>{{ Title }}</title>{{ Content }}"
+    PAGES = {
+        "index.md": "# Home\n\nWelcome.",
+        os.path.join("blog", "post.md"): "# Post\n\nSome *text*.",
+    }
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.dest = os.path.join(self.tmp.name, "public")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        self.write(self.template, self.TEMPLATE)
+        for rel_path, markdown in self.PAGES.items():
+            self.write(os.path.join(self.content, rel_path), markdown)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
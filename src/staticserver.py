@@ -0,0 +1,1475 @@
+import os
+import sys
+import argparse
+import asyncio
+import bisect
+import email.parser
+import email.utils
+import hashlib
+import http.client
+import mimetypes
+import posixpath
+import socket
+import threading
+import time
+import urllib.parse
+from datetime import timezone
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+
+from assets import (
+    ASSETS_MANIFEST_NAME,
+    CODING_EXTENSIONS,
+    MIN_COMPRESS_SIZE,
+    can_compress,
+    compress,
+    load_assets_manifest,
+)
+
+
+MODES = ("single", "threaded", "pool", "asyncio")
+# an idle kept-alive client holds its thread until it times out, so modes
+# with a bounded number of threads would stall every other client
+KEEP_ALIVE_MODES = ("threaded", "asyncio")
+DEFAULT_WORKERS = 32
+MAX_HEADER_LINES = 100
+# socketserver's default listen backlog of 5 drops connections under bursts
+REQUEST_QUEUE_SIZE = 128
+# idle seconds before a kept-alive connection is closed
+KEEP_ALIVE_TIMEOUT = 5.0
+MAX_KEEP_ALIVE_REQUESTS = 100
+DEFAULT_MAX_AGE = 0
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+COMPRESSIBLE_TYPES = {
+    "application/javascript",
+    "application/json",
+    "application/xml",
+    "image/svg+xml",
+}
+MAX_COMPRESS_SIZE = 8 * 2**20
+COMPRESSED_CACHE_BYTES = 32 * 2**20
+SERVER_VERSION = "StaticSite/1.0"
+METRICS_PATH = "/__metrics"
+# upper bounds in seconds, as in Prometheus client defaults but finer at the
+# low end where a static server spends its time
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+# distinct paths with their own counters; the rest are counted as "other"
+MAX_METRIC_PATHS = 1000
+ACCESS_LOG_FLUSH_INTERVAL = 0.5
+PAGE_CACHE_BYTES = 64 * 2**20
+
+
+class Response:
+    """A response produced by StaticSite, written out by either transport.
+
+    The body is either a bytes-like object or length bytes of an open binary
+    file starting at offset, which transports hand to sendfile.
+    """
+
+    __slots__ = ("status", "headers", "body", "file", "offset", "length")
+
+    def __init__(
+        self, status, headers=None, body=b"", file=None, offset=0, length=None
+    ):
+        self.status = status
+        self.headers = headers if headers is not None else []
+        self.body = body
+        self.file = file
+        self.offset = offset
+        self.length = len(body) if length is None else length
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+class CachedFile:
+    """A body cached from the file at path. depends holds (path, mtime_ns)
+    pairs of other files it was made from, such as the original of a
+    precompressed sibling; the entry is stale once any of them changes."""
+
+    __slots__ = ("path", "body", "headers", "etag", "mtime_ns", "depends", "size")
+
+    def __init__(self, path, body, headers, etag, mtime_ns, depends=()):
+        self.path = path
+        self.body = body
+        self.headers = headers
+        self.etag = etag
+        self.mtime_ns = mtime_ns
+        self.depends = depends
+        self.size = len(body)
+
+
+class FileCache:
+    """LRU of file bodies and headers keyed by URL path, capped in bytes.
+
+    With check_interval > 0 a background thread drops entries whose file
+    changed, so a hit costs no syscalls; with 0 every hit stats the file.
+    """
+
+    def __init__(self, max_bytes, check_interval=1.0):
+        self.max_bytes = max_bytes
+        # files above a quarter of the budget are served from disk instead
+        self.max_file_bytes = max_bytes // 4
+        self.check_interval = check_interval
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        if check_interval > 0:
+            threading.Thread(target=self._watch, daemon=True).start()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+
+        if not self.check_interval and not self._is_fresh(entry):
+            self.discard(key, entry)
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        if entry.size > self.max_file_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old.size
+            self._entries[key] = entry
+            self.size += entry.size
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted.size
+
+    def hit_ratio(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def discard(self, key, entry):
+        with self._lock:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+                self.size -= entry.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def close(self):
+        self._closed.set()
+
+    def _watch(self):
+        while not self._closed.wait(self.check_interval):
+            with self._lock:
+                entries = list(self._entries.items())
+            for key, entry in entries:
+                if not self._is_fresh(entry):
+                    self.discard(key, entry)
+
+    def _is_fresh(self, entry):
+        try:
+            if os.stat(entry.path).st_mtime_ns != entry.mtime_ns:
+                return False
+            return all(
+                os.stat(path).st_mtime_ns == mtime_ns
+                for path, mtime_ns in entry.depends
+            )
+        except OSError:
+            return False
+
+
+class Metrics:
+    """Request counters and a latency histogram, rendered in the Prometheus
+    text format.
+
+    Recording takes one short lock. Paths past max_paths are counted under
+    "other" so a scan of random URLs cannot grow memory without bound.
+    """
+
+    def __init__(self, max_paths=MAX_METRIC_PATHS):
+        self.max_paths = max_paths
+        # path -> [requests, bytes sent]
+        self._paths = {}
+        self._statuses = {}
+        # counts per bucket, plus one for slower requests
+        self._buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self._latency_sum = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, target, status, sent_bytes, seconds):
+        path = target.partition("?")[0]
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            counters = self._paths.get(path)
+            if counters is None:
+                if len(self._paths) >= self.max_paths:
+                    path = "other"
+                counters = self._paths.setdefault(path, [0, 0])
+            counters[0] += 1
+            counters[1] += sent_bytes
+            self._statuses[status] = self._statuses.get(status, 0) + 1
+            self._buckets[bucket] += 1
+            self._latency_sum += seconds
+
+    def render(self, caches=None):
+        """Return the metrics as Prometheus text; caches maps a label to
+        each FileCache to report on."""
+        with self._lock:
+            paths = {path: list(counters) for path, counters in self._paths.items()}
+            statuses = dict(self._statuses)
+            buckets = list(self._buckets)
+            latency_sum = self._latency_sum
+
+        lines = [
+            "# HELP static_requests_total Requests served, by path.",
+            "# TYPE static_requests_total counter",
+        ]
+        for path, (requests, _) in sorted(paths.items()):
+            lines.append(
+                f'static_requests_total{{path="{label_value(path)}"}} {requests}'
+            )
+        lines += [
+            "# HELP static_sent_bytes_total Body bytes sent, by path.",
+            "# TYPE static_sent_bytes_total counter",
+        ]
+        for path, (_, sent_bytes) in sorted(paths.items()):
+            lines.append(
+                f'static_sent_bytes_total{{path="{label_value(path)}"}} {sent_bytes}'
+            )
+        lines += [
+            "# HELP static_responses_total Responses sent, by status code.",
+            "# TYPE static_responses_total counter",
+        ]
+        for status, count in sorted(statuses.items()):
+            lines.append(f'static_responses_total{{status="{status}"}} {count}')
+
+        lines += [
+            "# HELP static_request_duration_seconds Time to handle a request.",
+            "# TYPE static_request_duration_seconds histogram",
+        ]
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), buckets):
+            cumulative += count
+            lines.append(
+                f'static_request_duration_seconds_bucket{{le="{bound}"}} {cumulative}'
+            )
+        lines.append(f"static_request_duration_seconds_sum {latency_sum}")
+        lines.append(f"static_request_duration_seconds_count {cumulative}")
+
+        if caches:
+            lines += [
+                "# HELP static_cache_hits_total Lookups answered from memory.",
+                "# TYPE static_cache_hits_total counter",
+                *(
+                    f'static_cache_hits_total{{cache="{name}"}} {cache.hits}'
+                    for name, cache in caches.items()
+                ),
+                "# HELP static_cache_misses_total Lookups that went to disk.",
+                "# TYPE static_cache_misses_total counter",
+                *(
+                    f'static_cache_misses_total{{cache="{name}"}} {cache.misses}'
+                    for name, cache in caches.items()
+                ),
+                "# HELP static_cache_hit_ratio Share of lookups answered from memory.",
+                "# TYPE static_cache_hit_ratio gauge",
+                *(
+                    f'static_cache_hit_ratio{{cache="{name}"}} {cache.hit_ratio():.6f}'
+                    for name, cache in caches.items()
+                ),
+                "# HELP static_cache_bytes Bytes held in memory.",
+                "# TYPE static_cache_bytes gauge",
+                *(
+                    f'static_cache_bytes{{cache="{name}"}} {cache.size}'
+                    for name, cache in caches.items()
+                ),
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def label_value(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class AccessLog:
+    """Writes access log lines to stream from a background thread.
+
+    Handlers only append a tuple to a deque; formatting and the write happen
+    in batches every flush_interval seconds, so a slow stream never holds up
+    a request.
+    """
+
+    def __init__(self, stream, flush_interval=ACCESS_LOG_FLUSH_INTERVAL):
+        self.stream = stream
+        self.flush_interval = flush_interval
+        self._entries = deque()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def log(self, host, method, target, version, status, length):
+        # deque.append is atomic, so no lock is needed
+        self._entries.append(
+            (host, time.time(), method, target, version, status, length)
+        )
+
+    def flush(self):
+        lines = []
+        while self._entries:
+            host, when, method, target, version, status, length = (
+                self._entries.popleft()
+            )
+            stamp = time.strftime("%d/%b/%Y %H:%M:%S", time.localtime(when))
+            lines.append(
+                f'{host} - - [{stamp}] "{method} {target} {version}" '
+                f"{status} {'-' if length is None else length}\n"
+            )
+        if lines:
+            self.stream.write("".join(lines))
+            self.stream.flush()
+
+    def close(self):
+        self._closed.set()
+        self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+
+class StaticSite:
+    """Maps request targets to files under directory.
+
+    Knows nothing about sockets, so the thread-based servers and the asyncio
+    server share all request handling. An optional FileCache serves repeat
+    requests from memory. With metrics, transports record each request there
+    and its counters are served at METRICS_PATH.
+
+    The fingerprinted copies listed in the assets manifest written by
+    "main.py build --optimize-assets" are sent with an immutable
+    Cache-Control; everything else gets max_age, or must revalidate when
+    max_age is 0.
+    """
+
+    def __init__(
+        self,
+        directory,
+        cache=None,
+        max_age=DEFAULT_MAX_AGE,
+        immutable_max_age=IMMUTABLE_MAX_AGE,
+        metrics=None,
+    ):
+        self.directory = os.path.abspath(directory)
+        self.cache = cache
+        self.metrics = metrics
+        self.max_age = max_age
+        self.immutable_max_age = immutable_max_age
+        # on-the-fly compression results are always cached; without a file
+        # cache they get a small one of their own
+        self._compressed_cache = cache or FileCache(
+            COMPRESSED_CACHE_BYTES, check_interval=0
+        )
+        # path -> ((mtime_ns, size), etag) for files served from disk
+        self._etags = {}
+        self._etags_lock = threading.Lock()
+        self._immutable = frozenset()
+        self._manifest_mtime_ns = None
+        self._manifest_lock = threading.Lock()
+
+    def close(self):
+        self._compressed_cache.close()
+
+    def respond(self, method, target, headers):
+        if method not in ("GET", "HEAD"):
+            return error_response(HTTPStatus.NOT_IMPLEMENTED)
+
+        url = urllib.parse.urlsplit(target)
+        if self.metrics is not None and url.path == METRICS_PATH:
+            return self.metrics_response()
+        codings = accepted_encodings(headers)
+        # the representation depends on which codings the client accepts,
+        # unless the file is of a type that is never compressed; a directory
+        # is served as its index.html
+        if not url.path.endswith("/") and not is_compressible(guess_type(url.path)):
+            codings = ()
+        cache_key = (url.path, codings)
+        if self.cache is not None or codings:
+            entry = self._compressed_cache.get(cache_key)
+            if entry is not None:
+                if is_not_modified(headers, entry.etag, entry.mtime_ns):
+                    return not_modified_response(entry.headers)
+                return apply_range(
+                    Response(HTTPStatus.OK, list(entry.headers), body=entry.body),
+                    headers,
+                )
+
+        path = self.translate_path(url.path)
+        if os.path.isdir(path):
+            if not url.path.endswith("/"):
+                location = urllib.parse.urlunsplit(
+                    ("", "", url.path + "/", url.query, url.fragment)
+                )
+                return Response(HTTPStatus.MOVED_PERMANENTLY, [("Location", location)])
+            for index in ("index.html", "index.htm"):
+                if os.path.isfile(os.path.join(path, index)):
+                    path = os.path.join(path, index)
+                    break
+            else:
+                return error_response(HTTPStatus.NOT_FOUND)
+        elif url.path.endswith("/"):
+            return error_response(HTTPStatus.NOT_FOUND)
+
+        return self.file_response(path, headers, cache_key, codings)
+
+    def file_response(self, path, request_headers, cache_key=None, codings=()):
+        content_type = guess_type(path)
+        compressible = is_compressible(content_type)
+        source = path
+        encoding = None
+        depends = ()
+        if compressible and codings:
+            # a cached sibling goes stale with the original it was made from
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                return error_response(HTTPStatus.NOT_FOUND)
+            depends = ((path, mtime_ns),)
+            for coding in codings:
+                sibling = path + CODING_EXTENSIONS[coding]
+                if is_fresh_sibling(sibling, mtime_ns):
+                    source, encoding = sibling, coding
+                    break
+
+        try:
+            f = open(source, "rb")
+        except OSError:
+            return error_response(HTTPStatus.NOT_FOUND)
+        stat = os.fstat(f.fileno())
+
+        body = None
+        cache = self.cache
+        if (
+            encoding is None
+            and compressible
+            and MIN_COMPRESS_SIZE <= stat.st_size <= MAX_COMPRESS_SIZE
+        ):
+            # no precompressed sibling: compress once and keep the result
+            encoding = next((c for c in codings if can_compress(c)), None)
+            if encoding is not None:
+                with f:
+                    body = compress(f.read(), encoding)
+                cache = self._compressed_cache
+        if body is None and cache is not None and stat.st_size <= cache.max_file_bytes:
+            with f:
+                body = f.read()
+
+        if body is not None:
+            etag = make_etag(hashlib.sha256(body))
+        else:
+            etag = self.file_etag(source, f, stat)
+
+        headers = [
+            ("Content-Type", content_type),
+            ("Last-Modified", email.utils.formatdate(stat.st_mtime, usegmt=True)),
+            ("ETag", etag),
+            ("Cache-Control", self.cache_control(path)),
+            ("Accept-Ranges", "bytes"),
+        ]
+        if encoding is not None:
+            headers.append(("Content-Encoding", encoding))
+        if compressible:
+            headers.append(("Vary", "Accept-Encoding"))
+        if body is not None:
+            if source == path:
+                depends = ()
+            cache.put(
+                cache_key,
+                CachedFile(source, body, headers, etag, stat.st_mtime_ns, depends),
+            )
+
+        if is_not_modified(request_headers, etag, stat.st_mtime_ns):
+            if body is None:
+                f.close()
+            return not_modified_response(headers)
+        if body is not None:
+            response = Response(HTTPStatus.OK, list(headers), body=body)
+        else:
+            response = Response(HTTPStatus.OK, headers, file=f, length=stat.st_size)
+        return apply_range(response, request_headers)
+
+    def metrics_response(self):
+        body = self.metrics.render(self.metric_caches()).encode()
+        return Response(
+            HTTPStatus.OK,
+            [
+                ("Content-Type", "text/plain; version=0.0.4; charset=utf-8"),
+                ("Cache-Control", "no-store"),
+            ],
+            body=body,
+        )
+
+    def metric_caches(self):
+        if self.cache is not None:
+            return {"files": self.cache}
+        return {"compressed": self._compressed_cache}
+
+    def file_etag(self, path, f, stat):
+        """Hash f once per (mtime, size) version and remember the result."""
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._etags_lock:
+            known = self._etags.get(path)
+        if known is not None and known[0] == version:
+            return known[1]
+
+        digest = hashlib.sha256()
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+        f.seek(0)
+        etag = make_etag(digest)
+        with self._etags_lock:
+            self._etags[path] = (version, etag)
+        return etag
+
+    def cache_control(self, path):
+        rel_path = os.path.relpath(path, self.directory).replace(os.sep, "/")
+        if rel_path in self.immutable_paths():
+            return f"public, max-age={self.immutable_max_age}, immutable"
+        if self.max_age > 0:
+            return f"public, max-age={self.max_age}"
+        return "no-cache"
+
+    def immutable_paths(self):
+        """Return the directory-relative paths of the fingerprinted copies
+        in the assets manifest, reading it again when it changed."""
+        try:
+            mtime_ns = os.stat(
+                os.path.join(self.directory, ASSETS_MANIFEST_NAME)
+            ).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        with self._manifest_lock:
+            if mtime_ns != self._manifest_mtime_ns:
+                manifest = load_assets_manifest(self.directory) if mtime_ns else {}
+                self._immutable = frozenset(manifest.values())
+                self._manifest_mtime_ns = mtime_ns
+            return self._immutable
+
+    def translate_path(self, url_path):
+        return safe_join(self.directory, url_path)
+
+
+class MarkdownSite(StaticSite):
+    """Renders markdown under content_dir on request instead of serving a
+    prebuilt site; other paths fall through to the files in directory.
+
+    /a/b.html and /a/b map to a/b.md, and /a/ to a/index.md. Rendered pages
+    live in page_cache, which drops a page when its source changes. A
+    template change empties the cache. Every page uses template_path;
+    per-directory _template.html files are a build feature. Concurrent
+    requests for a page that is not cached wait for a single render.
+    """
+
+    def __init__(
+        self, directory, content_dir, template_path=None, page_cache=None, **kwargs
+    ):
+        super().__init__(directory, **kwargs)
+        # imported here so serving a prebuilt site does not load the generator
+        from build import render_page
+        from template import Template
+
+        self._render_page = render_page
+        self._load_template = Template.load
+        self.content_dir = os.path.abspath(content_dir)
+        self.template_path = template_path
+        self.page_cache = page_cache or FileCache(PAGE_CACHE_BYTES)
+        self.renders = 0
+        self._template = None
+        self._template_mtime_ns = None
+        self._template_lock = threading.Lock()
+        # (cache key, template mtime) -> Future of the render in progress
+        self._renders = {}
+        self._renders_lock = threading.Lock()
+
+    def close(self):
+        super().close()
+        self.page_cache.close()
+
+    def respond(self, method, target, headers):
+        if method not in ("GET", "HEAD"):
+            return super().respond(method, target, headers)
+
+        url_path = urllib.parse.urlsplit(target).path
+        if url_path == METRICS_PATH or posixpath.splitext(url_path)[1] not in (
+            "",
+            ".html",
+        ):
+            # never pages; keep them out of the page cache stats
+            return super().respond(method, target, headers)
+        template, template_mtime_ns = self.load_template()
+        entry = self.page_cache.get(url_path)
+        if entry is None:
+            source = self.source_path(url_path)
+            if source is None:
+                return super().respond(method, target, headers)
+            try:
+                entry = self.render(url_path, source, template, template_mtime_ns)
+            except (OSError, UnicodeDecodeError):
+                return error_response(HTTPStatus.NOT_FOUND)
+            except ValueError:
+                # invalid markdown, or no title for the template
+                return error_response(HTTPStatus.INTERNAL_SERVER_ERROR)
+
+        if is_not_modified(headers, entry.etag, entry.mtime_ns):
+            return not_modified_response(entry.headers)
+        return apply_range(
+            Response(HTTPStatus.OK, list(entry.headers), body=entry.body), headers
+        )
+
+    def source_path(self, url_path):
+        path = safe_join(self.content_dir, url_path)
+        if url_path.endswith("/"):
+            path = os.path.join(path, "index")
+        elif path.endswith(".html"):
+            path = path[: -len(".html")]
+        path += ".md"
+        return path if os.path.isfile(path) else None
+
+    def render(self, key, source, template, template_mtime_ns=None):
+        """Render source into the page cache, or wait for the render of key
+        with the same template another request already started.
+
+        The page depends on the template's mtime too: a template change
+        during the render leaves it stale, not cached for good.
+        """
+        render_key = (key, template_mtime_ns)
+        with self._renders_lock:
+            future = self._renders.get(render_key)
+            owner = future is None
+            if owner:
+                future = self._renders[render_key] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            # stat first: an edit during the render then leaves a stale mtime
+            stat = os.stat(source)
+            with open(source, "rb") as f:
+                markdown = f.read().decode("utf-8")
+            body = self._render_page(markdown, template)
+            etag = make_etag(hashlib.sha256(body))
+            headers = [
+                ("Content-Type", "text/html"),
+                ("Last-Modified", email.utils.formatdate(stat.st_mtime, usegmt=True)),
+                ("ETag", etag),
+                ("Cache-Control", self.cache_control(source)),
+                ("Accept-Ranges", "bytes"),
+            ]
+            depends = ()
+            if template_mtime_ns is not None:
+                depends = ((self.template_path, template_mtime_ns),)
+            entry = CachedFile(source, body, headers, etag, stat.st_mtime_ns, depends)
+            self.renders += 1
+            self.page_cache.put(key, entry)
+            future.set_result(entry)
+            return entry
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._renders_lock:
+                del self._renders[render_key]
+
+    def load_template(self):
+        """Return the compiled template and the mtime it was compiled at,
+        recompiling it and dropping every rendered page when it changed on
+        disk."""
+        if not self.template_path:
+            return None, None
+        try:
+            mtime_ns = os.stat(self.template_path).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        with self._template_lock:
+            if mtime_ns != self._template_mtime_ns:
+                self._template = self._load_template(self.template_path)
+                self._template_mtime_ns = mtime_ns
+                self.page_cache.clear()
+            return self._template, self._template_mtime_ns
+
+    def metric_caches(self):
+        return {**super().metric_caches(), "pages": self.page_cache}
+
+
+def safe_join(root, url_path):
+    # same rules as SimpleHTTPRequestHandler: drop empty, "." and ".."
+    # components so a request can never escape root
+    path = posixpath.normpath(urllib.parse.unquote(url_path))
+    result = root
+    for word in path.split("/"):
+        if not word or os.path.dirname(word) or word in (os.curdir, os.pardir):
+            continue
+        result = os.path.join(result, word)
+    return result
+
+
+def make_etag(digest):
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def is_not_modified(request_headers, etag, mtime_ns):
+    """Evaluate If-None-Match, or If-Modified-Since when it is absent."""
+    if_none_match = request_headers.get("If-None-Match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # GET compares weakly, so W/"x" matches "x"
+        tags = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+        return etag in tags
+
+    if_modified_since = request_headers.get("If-Modified-Since")
+    if not if_modified_since:
+        return False
+    try:
+        since = email.utils.parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # Last-Modified only has whole seconds
+    return mtime_ns // 10**9 <= since.timestamp()
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def apply_range(response, request_headers):
+    """Narrow a full 200 response to the single byte range requested, if any.
+
+    Multiple ranges are not supported; like an unparsable Range header they
+    get the whole body, which the spec allows.
+    """
+    range_header = request_headers.get("Range")
+    if not range_header:
+        return response
+
+    if_range = request_headers.get("If-Range")
+    if if_range is not None and if_range.strip() not in (
+        header_value(response.headers, "ETag"),
+        header_value(response.headers, "Last-Modified"),
+    ):
+        return response
+
+    size = response.length
+    try:
+        byte_range = parse_range(range_header, size)
+    except RangeNotSatisfiable:
+        response.close()
+        unsatisfiable = error_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+        unsatisfiable.headers.append(("Content-Range", f"bytes */{size}"))
+        return unsatisfiable
+    if byte_range is None:
+        return response
+
+    start, end = byte_range
+    response.status = HTTPStatus.PARTIAL_CONTENT
+    response.headers.append(("Content-Range", f"bytes {start}-{end}/{size}"))
+    response.length = end - start + 1
+    if response.file is not None:
+        response.offset = start
+    else:
+        response.body = memoryview(response.body)[start : end + 1]
+    return response
+
+
+def parse_range(range_header, size):
+    """Return the inclusive (start, end) of a single bytes range, or None
+    when the header should be ignored."""
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash or not (first or last) or not (first + last).isdigit():
+        return None
+
+    if not first:
+        # suffix range: the last n bytes
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(0, size - suffix), size - 1
+
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    end = int(last) if last else size - 1
+    return start, min(end, size - 1)
+
+
+def header_value(headers, name):
+    for header, value in headers:
+        if header == name:
+            return value
+    return None
+
+
+def accepted_encodings(request_headers):
+    """Return the codings we can send that the client accepts, best first."""
+    accept_encoding = request_headers.get("Accept-Encoding")
+    if not accept_encoding:
+        return ()
+
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[coding.strip().lower()] = quality
+
+    default = qualities.get("*", 0.0)
+    # only an explicitly listed identity outranks a coding
+    identity = qualities.get("identity", 0.0)
+    ranked = []
+    for preference, coding in enumerate(CODING_EXTENSIONS):
+        quality = qualities.get(coding, default)
+        if quality > 0 and quality >= identity:
+            ranked.append((-quality, preference, coding))
+    return tuple(coding for _, _, coding in sorted(ranked))
+
+
+def is_compressible(content_type):
+    return content_type.startswith("text/") or content_type in COMPRESSIBLE_TYPES
+
+
+def is_fresh_sibling(sibling, source_mtime_ns):
+    # a sibling older than its source was left behind by an earlier build
+    try:
+        return os.stat(sibling).st_mtime_ns >= source_mtime_ns
+    except OSError:
+        return False
+
+
+def can_keep_alive(version, request_headers):
+    """Whether the client allows the connection to stay open after this
+    request. Requests with a body are never kept alive, as the body is not
+    read and would be taken for the next request."""
+    if request_headers.get("Content-Length", "0") != "0" or request_headers.get(
+        "Transfer-Encoding"
+    ):
+        return False
+    tokens = {
+        token.strip().lower()
+        for token in request_headers.get("Connection", "").split(",")
+    }
+    if version == "HTTP/1.0":
+        return "keep-alive" in tokens
+    return version >= "HTTP/1.1" and "close" not in tokens
+
+
+def not_modified_response(headers):
+    kept = ("ETag", "Cache-Control", "Last-Modified", "Vary")
+    response = Response(
+        HTTPStatus.NOT_MODIFIED, [header for header in headers if header[0] in kept]
+    )
+    response.length = None
+    return response
+
+
+def guess_type(path):
+    content_type, _ = mimetypes.guess_type(path)
+    return content_type or "application/octet-stream"
+
+
+def error_response(status):
+    body = f"<html><body><h1>{status.value} {status.phrase}</h1></body></html>"
+    return Response(
+        status, [("Content-Type", "text/html;charset=utf-8")], body=body.encode()
+    )
+
+
+class StaticHandler(BaseHTTPRequestHandler):
+    """Serves StaticSite responses, keeping connections open across requests
+    when the server has keep_alive set.
+
+    A kept-alive connection is closed after keep_alive_timeout idle seconds
+    or max_keep_alive_requests requests. Pipelined requests are answered in
+    order since each is read from the buffered stream only after the
+    previous response has been written.
+    """
+
+    server_version = SERVER_VERSION
+    # the head and a sendfile body are separate writes; with Nagle the body
+    # waits on the client's delayed ACK of the head on a reused connection
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        if self.server.keep_alive:
+            self.protocol_version = "HTTP/1.1"
+            # StreamRequestHandler applies this to the socket
+            self.timeout = self.server.keep_alive_timeout
+        self.requests_handled = 0
+        super().setup()
+
+    def do_GET(self):
+        start = time.perf_counter()
+        site = self.server.site
+        response = site.respond(self.command, self.path, self.headers)
+        self.requests_handled += 1
+        if (
+            self.requests_handled >= self.server.max_keep_alive_requests
+            or not can_keep_alive(self.request_version, self.headers)
+        ):
+            self.close_connection = True
+        try:
+            self.send_response(response.status)
+            for name, value in response.headers:
+                self.send_header(name, value)
+            if response.length is not None:
+                self.send_header("Content-Length", str(response.length))
+            if self.server.keep_alive:
+                self.send_header(
+                    "Connection", "close" if self.close_connection else "keep-alive"
+                )
+            self.end_headers()
+            if self.command != "HEAD":
+                self.write_body(response)
+        finally:
+            response.close()
+
+        if site.metrics is not None:
+            site.metrics.record(
+                self.path,
+                response.status.value,
+                response.length if self.command != "HEAD" and response.length else 0,
+                time.perf_counter() - start,
+            )
+        if self.server.access_log is not None:
+            self.server.access_log.log(
+                self.client_address[0],
+                self.command,
+                self.path,
+                self.request_version,
+                response.status.value,
+                response.length,
+            )
+
+    do_HEAD = do_GET
+
+    def log_request(self, code="-", size="-"):
+        # send_response calls this before the body is out; successful
+        # requests go to server.access_log from do_GET instead
+        pass
+
+    def log_error(self, format, *args):
+        # an idle kept-alive connection timing out is routine; it would
+        # otherwise be written to stderr on the request thread
+        if format.startswith("Request timed out"):
+            return
+        super().log_error(format, *args)
+
+    def write_body(self, response):
+        if response.file is not None:
+            # os.sendfile where available: the kernel copies file to socket
+            self.connection.sendfile(response.file, response.offset, response.length)
+        else:
+            self.wfile.write(response.body)
+
+
+class ThreadedHTTPServer(ThreadingHTTPServer):
+    request_queue_size = REQUEST_QUEUE_SIZE
+
+
+class PoolHTTPServer(HTTPServer):
+    """Serves connections on a fixed number of worker threads.
+
+    Unlike ThreadingHTTPServer, a burst of clients queues for a worker
+    instead of starting one thread each.
+    """
+
+    request_queue_size = REQUEST_QUEUE_SIZE
+
+    def __init__(self, server_address, handler_class, workers=DEFAULT_WORKERS):
+        super().__init__(server_address, handler_class)
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def process_request(self, request, client_address):
+        self._executor.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=True)
+
+
+class AsyncHTTPServer:
+    """asyncio server with the serve_forever/shutdown/server_close lifecycle
+    of the socketserver-based servers.
+
+    The loop only moves bytes: StaticSite.respond reads, hashes, compresses
+    and renders files, so it runs on a pool of worker threads. Keep-alive
+    follows the same rules as StaticHandler. On shutdown,
+    requests in progress are finished and idle connections are closed.
+    """
+
+    def __init__(
+        self,
+        server_address,
+        site,
+        keep_alive=False,
+        keep_alive_timeout=KEEP_ALIVE_TIMEOUT,
+        max_keep_alive_requests=MAX_KEEP_ALIVE_REQUESTS,
+        access_log=None,
+        workers=DEFAULT_WORKERS,
+    ):
+        self.site = site
+        self.access_log = access_log
+        self.keep_alive = keep_alive
+        self.keep_alive_timeout = keep_alive_timeout
+        self.max_keep_alive_requests = max_keep_alive_requests
+        self.socket = socket.create_server(
+            server_address, backlog=REQUEST_QUEUE_SIZE
+        )
+        self.server_address = self.socket.getsockname()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._loop = None
+        self._stop = None
+        self._closing = False
+        # handler tasks, and the writers of connections waiting for a request
+        self._handlers = set()
+        self._idle = set()
+        self._started = threading.Event()
+        self._stopped = threading.Event()
+
+    def serve_forever(self):
+        try:
+            asyncio.run(self._serve())
+        finally:
+            self._stopped.set()
+
+    def shutdown(self):
+        self._started.wait()
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._stopped.wait()
+
+    def server_close(self):
+        self.socket.close()
+        self._executor.shutdown(wait=True)
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        server = await asyncio.start_server(self._handle, sock=self.socket)
+        self._started.set()
+        async with server:
+            await self._stop.wait()
+            # asyncio.run would otherwise cancel the handlers mid-read
+            server.close()
+            self._closing = True
+            for writer in self._idle:
+                writer.close()
+            if self._handlers:
+                await asyncio.wait(self._handlers)
+
+    async def _handle(self, reader, writer):
+        # asyncio only sets this itself for sockets created with
+        # proto=IPPROTO_TCP, which create_server does not do
+        writer.get_extra_info("socket").setsockopt(
+            socket.IPPROTO_TCP, socket.TCP_NODELAY, 1
+        )
+        timeout = self.keep_alive_timeout if self.keep_alive else None
+        handled = 0
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            while not self._closing:
+                self._idle.add(writer)
+                try:
+                    request = await asyncio.wait_for(read_request(reader), timeout)
+                except TimeoutError:
+                    break
+                except ValueError:
+                    await self._write(
+                        writer, "GET", error_response(HTTPStatus.BAD_REQUEST)
+                    )
+                    break
+                finally:
+                    self._idle.discard(writer)
+                if request is None:
+                    break
+
+                method, target, version, headers = request
+                start = time.perf_counter()
+                handled += 1
+                keep_alive = (
+                    self.keep_alive
+                    and not self._closing
+                    and handled < self.max_keep_alive_requests
+                    and can_keep_alive(version, headers)
+                )
+                response = await self._loop.run_in_executor(
+                    self._executor, self.site.respond, method, target, headers
+                )
+                await self._write(writer, method, response, keep_alive)
+                self.log_request(writer, method, target, version, response, start)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            self._handlers.discard(task)
+
+    async def _write(self, writer, method, response, keep_alive=False):
+        if self.keep_alive:
+            head = format_head(
+                response, "HTTP/1.1", "keep-alive" if keep_alive else "close"
+            )
+        else:
+            head = format_head(response)
+        try:
+            writer.write(head)
+            if method != "HEAD":
+                if response.file is not None:
+                    await self._loop.sendfile(
+                        writer.transport,
+                        response.file,
+                        response.offset,
+                        response.length,
+                    )
+                else:
+                    writer.write(response.body)
+            await writer.drain()
+        finally:
+            response.close()
+
+    def log_request(self, writer, method, target, version, response, start):
+        metrics = self.site.metrics
+        if metrics is not None:
+            metrics.record(
+                target,
+                response.status.value,
+                response.length if method != "HEAD" and response.length else 0,
+                time.perf_counter() - start,
+            )
+        if self.access_log is not None:
+            self.access_log.log(
+                writer.get_extra_info("peername")[0],
+                method,
+                target,
+                version,
+                response.status.value,
+                response.length,
+            )
+
+
+async def read_request(reader):
+    """Read a request head, returning (method, target, version, headers) or
+    None at EOF.
+
+    Raises ValueError for a malformed or oversized head.
+    """
+    line = await reader.readline()
+    if not line:
+        return None
+    parts = line.decode("iso-8859-1").split()
+    if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+        raise ValueError("Malformed request line.")
+
+    header_lines = []
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        header_lines.append(line)
+        if len(header_lines) > MAX_HEADER_LINES:
+            raise ValueError("Too many headers.")
+
+    headers = email.parser.BytesParser(_class=http.client.HTTPMessage).parsebytes(
+        b"".join(header_lines)
+    )
+    return parts[0], parts[1], parts[2], headers
+
+
+def format_head(response, protocol_version="HTTP/1.0", connection=None):
+    lines = [
+        f"{protocol_version} {response.status.value} {response.status.phrase}",
+        f"Server: {SERVER_VERSION}",
+        f"Date: {email.utils.formatdate(usegmt=True)}",
+    ]
+    lines.extend(f"{name}: {value}" for name, value in response.headers)
+    if response.length is not None:
+        lines.append(f"Content-Length: {response.length}")
+    if connection is not None:
+        lines.append(f"Connection: {connection}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def make_server(
+    site,
+    port=8888,
+    mode="single",
+    workers=DEFAULT_WORKERS,
+    handler_class=StaticHandler,
+    keep_alive=False,
+    keep_alive_timeout=KEEP_ALIVE_TIMEOUT,
+    max_keep_alive_requests=MAX_KEEP_ALIVE_REQUESTS,
+    access_log=None,
+):
+    if mode not in MODES:
+        raise ValueError(f"Unknown server mode '{mode}'.")
+    if keep_alive and mode not in KEEP_ALIVE_MODES:
+        raise ValueError(f"Keep-alive is not supported in {mode} mode.")
+    server_address = ("", port)
+    if mode == "asyncio":
+        return AsyncHTTPServer(
+            server_address,
+            site,
+            keep_alive=keep_alive,
+            keep_alive_timeout=keep_alive_timeout,
+            max_keep_alive_requests=max_keep_alive_requests,
+            access_log=access_log,
+            workers=workers,
+        )
+
+    if mode == "pool":
+        httpd = PoolHTTPServer(server_address, handler_class, workers=workers)
+    elif mode == "threaded":
+        httpd = ThreadedHTTPServer(server_address, handler_class)
+    else:
+        httpd = HTTPServer(server_address, handler_class)
+    httpd.site = site
+    httpd.keep_alive = keep_alive
+    httpd.keep_alive_timeout = keep_alive_timeout
+    httpd.max_keep_alive_requests = max_keep_alive_requests
+    httpd.access_log = access_log
+    return httpd
+
+
+def run(
+    port=8888,
+    directory=".",
+    mode="single",
+    workers=DEFAULT_WORKERS,
+    cache_mb=0,
+    cache_check_interval=1.0,
+    max_age=DEFAULT_MAX_AGE,
+    immutable_max_age=IMMUTABLE_MAX_AGE,
+    keep_alive=False,
+    keep_alive_timeout=KEEP_ALIVE_TIMEOUT,
+    max_keep_alive_requests=MAX_KEEP_ALIVE_REQUESTS,
+    metrics=False,
+    access_log="-",
+    content_dir=None,
+    template_path=None,
+    page_cache_mb=PAGE_CACHE_BYTES // 2**20,
+):
+    """Serve directory until interrupted. access_log is a file to append
+    request lines to, "-" for stderr or None to disable logging. With
+    content_dir, markdown pages are rendered on request."""
+    cache = None
+    if cache_mb > 0:
+        cache = FileCache(cache_mb * 2**20, check_interval=cache_check_interval)
+    options = {
+        "cache": cache,
+        "max_age": max_age,
+        "immutable_max_age": immutable_max_age,
+        "metrics": Metrics() if metrics else None,
+    }
+    if content_dir:
+        page_cache = FileCache(
+            page_cache_mb * 2**20, check_interval=cache_check_interval
+        )
+        site = MarkdownSite(
+            directory, content_dir, template_path, page_cache=page_cache, **options
+        )
+    else:
+        site = StaticSite(directory, **options)
+    log = None
+    if access_log == "-":
+        log = AccessLog(sys.stderr)
+    elif access_log:
+        log = AccessLog(open(access_log, "a", encoding="utf-8"))
+    httpd = make_server(
+        site,
+        port=port,
+        mode=mode,
+        workers=workers,
+        keep_alive=keep_alive,
+        keep_alive_timeout=keep_alive_timeout,
+        max_keep_alive_requests=max_keep_alive_requests,
+        access_log=log,
+    )
+    print(
+        f"Serving HTTP on http://localhost:{port} from directory '{directory}' "
+        f"({mode} mode)..."
+    )
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        site.close()
+        if log is not None:
+            log.close()
+            if log.stream is not sys.stderr:
+                log.stream.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP Server")
+    parser.add_argument(
+        "--dir", type=str, help="Directory to serve files from", default="."
+    )
+    parser.add_argument("--port", type=int, help="Port to serve HTTP on", default=8888)
+    parser.add_argument(
+        "--mode",
+        choices=MODES,
+        help="How concurrent connections are handled",
+        default="single",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Worker threads for --mode pool, or for reading files in --mode asyncio",
+        default=DEFAULT_WORKERS,
+    )
+    parser.add_argument(
+        "--cache-mb",
+        type=int,
+        help="Keep up to this many MiB of files in memory (0 disables)",
+        default=0,
+    )
+    parser.add_argument(
+        "--cache-check-interval",
+        type=float,
+        help="Seconds between checks for changed cached files (0 checks every hit)",
+        default=1.0,
+    )
+    parser.add_argument(
+        "--max-age",
+        type=int,
+        help="Cache-Control max-age for ordinary files (0 means no-cache)",
+        default=DEFAULT_MAX_AGE,
+    )
+    parser.add_argument(
+        "--immutable-max-age",
+        type=int,
+        help="Cache-Control max-age for fingerprinted assets",
+        default=IMMUTABLE_MAX_AGE,
+    )
+    parser.add_argument(
+        "--keep-alive",
+        action="store_true",
+        help="Speak HTTP/1.1 and reuse connections across requests "
+        f"(--mode {' or '.join(KEEP_ALIVE_MODES)} only)",
+    )
+    parser.add_argument(
+        "--keep-alive-timeout",
+        type=float,
+        help="Seconds an idle kept-alive connection stays open",
+        default=KEEP_ALIVE_TIMEOUT,
+    )
+    parser.add_argument(
+        "--max-keep-alive-requests",
+        type=int,
+        help="Requests served on one connection before it is closed",
+        default=MAX_KEEP_ALIVE_REQUESTS,
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help=f"Count requests and serve them at {METRICS_PATH}",
+    )
+    parser.add_argument(
+        "--access-log",
+        type=str,
+        help="File to log requests to, '-' for stderr or 'off'",
+        default="-",
+    )
+    parser.add_argument(
+        "--content",
+        type=str,
+        help="Render markdown pages from this directory on request",
+        default=None,
+    )
+    parser.add_argument(
+        "--template",
+        type=str,
+        help="HTML template for pages rendered from --content",
+        default=None,
+    )
+    parser.add_argument(
+        "--page-cache-mb",
+        type=int,
+        help="Keep up to this many MiB of rendered pages in memory",
+        default=PAGE_CACHE_BYTES // 2**20,
+    )
+    args = parser.parse_args(argv)
+    if args.keep_alive and args.mode not in KEEP_ALIVE_MODES:
+        parser.error(f"--keep-alive is not supported with --mode {args.mode}")
+
+    run(
+        port=args.port,
+        directory=args.dir,
+        mode=args.mode,
+        workers=args.workers,
+        cache_mb=args.cache_mb,
+        cache_check_interval=args.cache_check_interval,
+        max_age=args.max_age,
+        immutable_max_age=args.immutable_max_age,
+        keep_alive=args.keep_alive,
+        keep_alive_timeout=args.keep_alive_timeout,
+        max_keep_alive_requests=args.max_keep_alive_requests,
+        metrics=args.metrics,
+        access_log=None if args.access_log == "off" else args.access_log,
+        content_dir=args.content,
+        template_path=args.template,
+        page_cache_mb=args.page_cache_mb,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import hashlib
+import os
+import re
+
+from htmlnode import escape_html
+from main import text_to_textnodes
+from parentnode import ParentNode
+
+
+# a content directory's _template.html applies to its pages and those below
+TEMPLATE_NAME = "_template.html"
+SLOT_PATTERN = re.compile(r"\{\{\s*(Title|Content|TOC)\s*\}\}")
+TOC_HEADINGS = ("h2", "h3", "h4", "h5", "h6")
+SLUG_PATTERN = re.compile(r"[^\w]+")
+
+
+class Template:
+    """A page template parsed once into literal byte chunks and slots.
+
+    chunks holds the encoded text around the {{ Title }}, {{ Content }} and
+    {{ TOC }} placeholders with None in place of each; slots pairs those
+    positions with the slot name. Rendering fills the slots and joins, so
+    the template text is never searched again. Other {{ ... }} text is kept
+    as is.
+    """
+
+    __slots__ = ("chunks", "slots", "names", "digest")
+
+    def __init__(self, source):
+        if isinstance(source, str):
+            source = source.encode("utf-8")
+        self.digest = hashlib.sha256(source).hexdigest()
+
+        text = source.decode("utf-8")
+        chunks = []
+        slots = []
+        pos = 0
+        for match in SLOT_PATTERN.finditer(text):
+            if match.start() > pos:
+                chunks.append(text[pos : match.start()].encode("utf-8"))
+            slots.append((len(chunks), match.group(1)))
+            chunks.append(None)
+            pos = match.end()
+        if pos < len(text):
+            chunks.append(text[pos:].encode("utf-8"))
+
+        self.chunks = chunks
+        self.slots = tuple(slots)
+        self.names = frozenset(name for _, name in slots)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls(f.read())
+
+    def fill(self, values):
+        """Return the chunks with each slot replaced by its bytes in values."""
+        parts = list(self.chunks)
+        for index, name in self.slots:
+            parts[index] = values[name]
+        return parts
+
+    def render(self, values):
+        return b"".join(self.fill(values))
+
+    def render_to(self, writer, values):
+        writer.writelines(self.fill(values))
+
+    def page_values(self, markdown, node):
+        """Return the encoded slot values for markdown rendered as node,
+        computing only the slots this template uses."""
+        values = {}
+        if "Title" in self.names:
+            values["Title"] = page_title(markdown).encode("utf-8")
+        if "TOC" in self.names:
+            node, toc = add_toc(node)
+            values["TOC"] = toc.encode("utf-8")
+        if "Content" in self.names:
+            values["Content"] = node.to_html().encode("utf-8")
+        return values
+
+    def render_page(self, markdown, node):
+        return self.render(self.page_values(markdown, node))
+
+
+class TemplateSet:
+    """Finds and compiles the template of each page.
+
+    A page uses the nearest _template.html in its directory or a parent
+    directory within content_dir, or default_path when there is none.
+    Lookups are cached per directory and templates compiled once.
+    """
+
+    def __init__(self, content_dir, default_path=None):
+        self.content_dir = content_dir
+        self.default_path = default_path
+        # content-relative directory -> template path or None
+        self._paths = {}
+        # template path -> Template
+        self._templates = {}
+
+    def path_for(self, rel_path):
+        directory = os.path.dirname(rel_path)
+        try:
+            return self._paths[directory]
+        except KeyError:
+            pass
+
+        path = os.path.join(self.content_dir, directory, TEMPLATE_NAME)
+        if not os.path.isfile(path):
+            path = self.path_for(directory) if directory else self.default_path
+        self._paths[directory] = path
+        return path
+
+    def get(self, path):
+        if path is None:
+            return None
+        template = self._templates.get(path)
+        if template is None:
+            template = self._templates[path] = Template.load(path)
+        return template
+
+    def for_page(self, rel_path):
+        return self.get(self.path_for(rel_path))
+
+
+def extract_title(markdown):
+    for line in markdown.splitlines():
+        if line.startswith("# "):
+            return line[2:].strip()
+    raise ValueError("Page requires an h1 heading to use as its title.")
+
+
+def page_title(markdown):
+    """Return the text of the page's h1 as HTML: inline markup is dropped,
+    as in a <title> it would show as is, and the rest escaped."""
+    title = extract_title(markdown)
+    return escape_html("".join(node.text for node in text_to_textnodes(title)))
+
+
+def add_toc(node):
+    """Return a copy of node whose h2-h6 headings have ids, and the HTML of
+    a list linking to them ("" when there are none).
+
+    Headings are replaced rather than given props in place, as node may hold
+    nodes shared through a BlockCache.
+    """
+    children = []
+    items = []
+    seen = set()
+    for child in node.children:
+        if child.tag in TOC_HEADINGS:
+            slug = unique_slug(node_text(child), seen)
+            child = ParentNode(child.tag, child.children, {"id": slug})
+            link = ParentNode("a", child.children, {"href": f"#{slug}"})
+            items.append(ParentNode("li", link, {"class": f"toc-{child.tag}"}))
+        children.append(child)
+
+    toc = ParentNode("ul", items, {"class": "toc"}).to_html() if items else ""
+    return ParentNode(node.tag, children, node.props), toc
+
+
+def node_text(node):
+    if node.children is None:
+        return node.value or ""
+    return "".join(node_text(child) for child in node.children)
+
+
+def unique_slug(text, seen):
+    base = SLUG_PATTERN.sub("-", text.lower()).strip("-") or "section"
+    slug = base
+    number = 2
+    while slug in seen:
+        slug = f"{base}-{number}"
+        number += 1
+    seen.add(slug)
+    return slug
@@ -0,0 +1,112 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from assets import compress_files, fingerprint_assets, process_assets
+
+
+class TestAssets(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.public = self.tmp.name
+        self.write("styles.css", "body { color: red; }")
+        self.write(
+            os.path.join("blog", "post.html"),
+            '<link href="../styles.css"><a href="https://boot.dev/styles.css">x</a>'
+            + " " * 2000,
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, rel_path, text):
+        path = os.path.join(self.public, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, rel_path):
+        with open(os.path.join(self.public, rel_path)) as f:
+            return f.read()
+
+    def test_fingerprint_assets(self):
+        fingerprints = fingerprint_assets(self.public)
+
+        self.assertEqual(list(fingerprints), ["styles.css"])
+        fingerprinted = fingerprints["styles.css"]
+        self.assertRegex(fingerprinted, r"^styles\.[0-9a-f]{8}\.css$")
+        self.assertEqual(self.read(fingerprinted), self.read("styles.css"))
+
+    def test_fingerprint_assets_removes_stale(self):
+        old = fingerprint_assets(self.public)["styles.css"]
+        self.write("styles.css", "body { color: blue; }")
+        new = fingerprint_assets(self.public)["styles.css"]
+
+        self.assertNotEqual(old, new)
+        self.assertFalse(os.path.exists(os.path.join(self.public, old)))
+
+    def test_fingerprint_assets_keeps_lookalike_files(self):
+        # named like a fingerprinted copy, but not made by fingerprint_assets
+        self.write("report.css", "p { margin: 0; }")
+        self.write("report.20241018.css", "p { margin: 1em; }")
+        fingerprint_assets(self.public)
+        self.write("report.css", "p { margin: 2em; }")
+        fingerprints = fingerprint_assets(self.public)
+
+        self.assertEqual(self.read("report.20241018.css"), "p { margin: 1em; }")
+        self.assertIn("report.20241018.css", fingerprints)
+        self.assertEqual(self.read(fingerprints["report.css"]), "p { margin: 2em; }")
+
+    def test_fingerprint_assets_removes_copies_of_deleted(self):
+        old = fingerprint_assets(self.public)["styles.css"]
+        os.remove(os.path.join(self.public, "styles.css"))
+
+        self.assertEqual(fingerprint_assets(self.public), {})
+        self.assertFalse(os.path.exists(os.path.join(self.public, old)))
+
+    def test_process_assets_rewrites_references(self):
+        process_assets(self.public)
+        fingerprinted = fingerprint_assets(self.public)["styles.css"]
+
+        html = self.read(os.path.join("blog", "post.html"))
+        self.assertIn(f'href="../{fingerprinted}"', html)
+        self.assertIn('href="https://boot.dev/styles.css"', html)
+
+    def test_process_assets_follows_changed_fingerprint(self):
+        process_assets(self.public)
+        self.write("styles.css", "body { color: blue; }")
+        process_assets(self.public, html_paths=[])
+        fingerprinted = fingerprint_assets(self.public)["styles.css"]
+
+        html = self.read(os.path.join("blog", "post.html"))
+        self.assertIn(f'href="../{fingerprinted}"', html)
+
+    def test_process_assets_leaves_lookalike_references(self):
+        self.write("report.css", "p { margin: 0; }")
+        self.write("report.20241018.css", "p { margin: 1em; }")
+        self.write("index.html", '<link href="report.20241018.css">')
+        process_assets(self.public)
+        fingerprints = fingerprint_assets(self.public)
+
+        self.assertEqual(
+            self.read("index.html"),
+            f'<link href="{fingerprints["report.20241018.css"]}">',
+        )
+
+    def test_compress_files(self):
+        written = compress_files(self.public)
+
+        gz_path = os.path.join("blog", "post.html.gz")
+        self.assertIn(gz_path, written)
+        self.assertNotIn("styles.css.gz", written)
+        with gzip.open(os.path.join(self.public, gz_path), "rt") as f:
+            self.assertEqual(f.read(), self.read(os.path.join("blog", "post.html")))
+
+    def test_compress_files_skips_fresh(self):
+        compress_files(self.public)
+        self.assertEqual(compress_files(self.public), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import os
+import pickle
+import random
+import tempfile
+import unittest
+
+from blockcache import CACHE_VERSION, BlockCache
+from leafnode import LeafNode
+from main import block_to_html_node, markdown_to_html_node
+
+
+class TestBlockCache(unittest.TestCase):
+    def test_hits_and_misses(self):
+        cache = BlockCache()
+        first = cache.get_or_render("Some **text**", block_to_html_node)
+        second = cache.get_or_render("Some **text**", block_to_html_node)
+
+        self.assertIs(first, second)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(cache.hit_ratio(), 0.5)
+
+    def test_evicts_least_recently_used(self):
+        cache = BlockCache(maxsize=2)
+        render = lambda block: LeafNode("p", block)
+        cache.get_or_render("a", render)
+        cache.get_or_render("b", render)
+        cache.get_or_render("a", render)
+        cache.get_or_render("c", render)
+
+        self.assertEqual(len(cache), 2)
+        cache.get_or_render("a", render)
+        cache.get_or_render("b", render)
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+
+    def test_markdown_to_html_node_with_cache(self):
+        markdown = "# Title\n\nShared *footer*.\n\nShared *footer*."
+        cache = BlockCache()
+
+        self.assertEqual(
+            markdown_to_html_node(markdown, cache), markdown_to_html_node(markdown)
+        )
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_save_and_load(self):
+        cache = BlockCache()
+        cache.get_or_render("Licensed under *MIT*.", block_to_html_node)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "blocks.cache")
+            cache.save(path)
+            loaded = BlockCache.load(path)
+
+        node = loaded.get_or_render("Licensed under *MIT*.", block_to_html_node)
+        self.assertEqual(node, block_to_html_node("Licensed under *MIT*."))
+        self.assertEqual((loaded.hits, loaded.misses), (1, 0))
+
+    def test_load_missing(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = BlockCache.load(os.path.join(tmp, "missing.cache"), maxsize=8)
+
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.maxsize, 8)
+
+
+    def test_load_unusable(self):
+        payloads = {
+            "not a dict": pickle.dumps(["entries"]),
+            # a class that no longer exists, as after an upgrade
+            "missing module": pickle.dumps(LeafNode).replace(b"leafnode", b"lostnode"),
+            "missing class": pickle.dumps(LeafNode).replace(b"LeafNode", b"GoneNode"),
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "blocks.cache")
+            for label, payload in payloads.items():
+                with self.subTest(label):
+                    with open(path, "wb") as f:
+                        f.write(payload)
+                    self.assertEqual(len(BlockCache.load(path)), 0)
+
+    def test_load_corrupted(self):
+        cache = BlockCache()
+        for block in ("# Title", "Some *text*.", "* one\n* [two](/two)"):
+            cache.get_or_render(block, block_to_html_node)
+        rng = random.Random(0)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "blocks.cache")
+            cache.save(path)
+            with open(path, "rb") as f:
+                saved = f.read()
+            for _ in range(300):
+                corrupted = bytearray(saved)
+                for _ in range(3):
+                    corrupted[rng.randrange(len(corrupted))] = rng.randrange(256)
+                with open(path, "wb") as f:
+                    f.write(corrupted)
+                self.assertLessEqual(len(BlockCache.load(path)), 3)
+
+    def test_load_invalid_entries(self):
+        invalid = ["entries", [("key",)], [(b"key", "<p>not a node</p>")]]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "blocks.cache")
+            for entries in invalid:
+                with self.subTest(entries=entries):
+                    with open(path, "wb") as f:
+                        pickle.dump({"version": CACHE_VERSION, "entries": entries}, f)
+                    self.assertEqual(len(BlockCache.load(path)), 0)
+
+    def test_merge_changes_of_a_copy(self):
+        cache = BlockCache()
+        cache.get_or_render("a", block_to_html_node)
+        copy = pickle.loads(pickle.dumps(cache))
+        copy.track_changes()
+        copy.get_or_render("a", block_to_html_node)
+        copy.get_or_render("b", block_to_html_node)
+
+        cache.merge(copy.take_changes())
+        self.assertEqual(len(cache), 2)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertEqual(copy.take_changes(), (0, 0, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import json
+import os
+import unittest
+
+from blockcache import BlockCache
+from build import MANIFEST_NAME, PageError, build
+from sitetest import SiteTestCase
+
+
+class TestBuild(SiteTestCase):
+    def test_build_writes_pages(self):
+        built = build(self.content, self.dest, self.template)
+
+        self.assertEqual(built, [os.path.join("blog", "post.md"), "index.md"])
+        self.assertEqual(
+            self.read(os.path.join(self.dest, "blog", "post.html")),
+            "<title>Post</title><div><h1>Post</h1><p>Some <i>text</i>.</p></div>",
+        )
+        self.assertTrue(os.path.exists(os.path.join(self.dest, MANIFEST_NAME)))
+
+    def test_rebuild_unchanged(self):
+        build(self.content, self.dest, self.template)
+        self.assertEqual(build(self.content, self.dest, self.template), [])
+
+    def test_rebuild_changed_source(self):
+        build(self.content, self.dest, self.template)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome back.")
+
+        self.assertEqual(build(self.content, self.dest, self.template), ["index.md"])
+        self.assertIn(
+            "Welcome back.", self.read(os.path.join(self.dest, "index.html"))
+        )
+
+    def test_rebuild_touched_source(self):
+        build(self.content, self.dest, self.template)
+        path = os.path.join(self.content, "index.md")
+        os.utime(path, ns=(1, 1))
+
+        self.assertEqual(build(self.content, self.dest, self.template), [])
+
+    def test_rebuild_changed_template(self):
+        build(self.content, self.dest, self.template)
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+
+        built = build(self.content, self.dest, self.template)
+        self.assertEqual(len(built), 2)
+
+    def test_directory_template(self):
+        self.write(
+            os.path.join(self.content, "blog", "_template.html"),
+            "<article>{{ Content }}</article>",
+        )
+        build(self.content, self.dest, self.template)
+
+        self.assertEqual(
+            self.read(os.path.join(self.dest, "blog", "post.html")),
+            "<article><div><h1>Post</h1><p>Some <i>text</i>.</p></div></article>",
+        )
+        self.assertTrue(
+            self.read(os.path.join(self.dest, "index.html")).startswith("<title>")
+        )
+
+    def test_rebuild_changed_directory_template(self):
+        blog_template = os.path.join(self.content, "blog", "_template.html")
+        self.write(blog_template, "<article>{{ Content }}</article>")
+        build(self.content, self.dest, self.template)
+        self.write(blog_template, "<main>{{ Content }}</main>")
+
+        self.assertEqual(
+            build(self.content, self.dest, self.template),
+            [os.path.join("blog", "post.md")],
+        )
+        with open(os.path.join(self.dest, MANIFEST_NAME)) as f:
+            pages = json.load(f)["pages"]
+        self.assertNotEqual(
+            pages["index.md"]["template"],
+            pages[os.path.join("blog", "post.md")]["template"],
+        )
+
+        os.remove(blog_template)
+        self.assertEqual(
+            build(self.content, self.dest, self.template),
+            [os.path.join("blog", "post.md")],
+        )
+
+    def test_rebuild_missing_output(self):
+        build(self.content, self.dest, self.template)
+        os.remove(os.path.join(self.dest, "index.html"))
+
+        self.assertEqual(build(self.content, self.dest, self.template), ["index.md"])
+
+    def test_rebuild_removed_source(self):
+        build(self.content, self.dest, self.template)
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+
+        self.assertEqual(build(self.content, self.dest, self.template), [])
+        self.assertFalse(
+            os.path.exists(os.path.join(self.dest, "blog", "post.html"))
+        )
+
+    def test_build_parallel_matches_serial(self):
+        self.write(
+            os.path.join(self.content, "docs", "_template.html"),
+            "<h1>{{ Title }}</h1>{{ TOC }}{{ Content }}",
+        )
+        for i in range(10):
+            self.write(
+                os.path.join(self.content, "docs", f"page{i}.md"),
+                f"# Page {i}\n\n* **item** {i}\n* [link](/{i})",
+            )
+        serial_dest = os.path.join(self.tmp.name, "serial")
+
+        serial = build(self.content, serial_dest, self.template)
+        parallel = build(self.content, self.dest, self.template, jobs=3)
+
+        self.assertEqual(parallel, serial)
+        for rel_path in serial:
+            html_path = os.path.splitext(rel_path)[0] + ".html"
+            self.assertEqual(
+                self.read(os.path.join(self.dest, html_path)),
+                self.read(os.path.join(serial_dest, html_path)),
+            )
+
+    def test_build_parallel_fills_block_cache(self):
+        block_cache = BlockCache()
+        build(self.content, self.dest, self.template, jobs=2, block_cache=block_cache)
+
+        self.assertEqual(len(block_cache), 4)
+        self.assertEqual((block_cache.hits, block_cache.misses), (0, 4))
+
+    def test_build_invalid_page(self):
+        self.write(os.path.join(self.content, "blog", "draft.md"), "No title yet")
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs):
+                with self.assertRaises(PageError) as raised:
+                    build(self.content, self.dest, self.template, jobs=jobs)
+                draft = os.path.join("blog", "draft.md")
+                self.assertEqual(raised.exception.rel_path, draft)
+                self.assertIn(f"'{draft}'", str(raised.exception))
+
+    def test_build_missing_content(self):
+        with self.assertRaises(FileNotFoundError):
+            build(os.path.join(self.tmp.name, "missing"), self.dest)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+import os
+import threading
+import unittest
+from http import HTTPStatus
+
+from build import build
+from devserver import (
+    LIVE_RELOAD_SCRIPT,
+    DevBuilder,
+    LiveReloadSite,
+    ReloadBroadcaster,
+    SiteWatcher,
+    _Poller,
+    inject_script,
+)
+from sitetest import SiteTestCase
+
+
+class TestDevServer(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        build(self.content, self.dest, self.template)
+        self.builder = DevBuilder(self.content, self.dest, self.template)
+
+    def test_rebuild_changed_page(self):
+        path = os.path.join(self.content, "index.md")
+        self.write(path, "# Home\n\nWelcome back.")
+
+        self.assertEqual(self.builder.rebuild({os.path.abspath(path)}), ["index.md"])
+        self.assertEqual(
+            self.read(os.path.join(self.dest, "index.html")),
+            "<title>Home</title><div><h1>Home</h1><p>Welcome back.</p></div>",
+        )
+
+    def test_rebuild_removed_page(self):
+        path = os.path.join(self.content, "blog", "post.md")
+        os.remove(path)
+
+        self.assertEqual(
+            self.builder.rebuild({os.path.abspath(path)}),
+            [os.path.join("blog", "post.md")],
+        )
+        self.assertFalse(
+            os.path.exists(os.path.join(self.dest, "blog", "post.html"))
+        )
+
+    def test_rebuild_changed_template(self):
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+
+        built = self.builder.rebuild({os.path.abspath(self.template)})
+        self.assertEqual(len(built), 2)
+        self.assertTrue(
+            self.read(os.path.join(self.dest, "index.html")).startswith("<h1>Home")
+        )
+
+    def test_rebuild_changed_directory_template(self):
+        path = os.path.join(self.content, "blog", "_template.html")
+        self.write(path, "<article>{{ Content }}</article>")
+
+        built = self.builder.rebuild({os.path.abspath(path)})
+        self.assertEqual(built, [os.path.join("blog", "post.md")])
+        self.assertTrue(
+            self.read(os.path.join(self.dest, "blog", "post.html")).startswith(
+                "<article>"
+            )
+        )
+
+        os.remove(path)
+        built = self.builder.rebuild({os.path.abspath(path)})
+        self.assertEqual(built, [os.path.join("blog", "post.md")])
+        self.assertTrue(
+            self.read(os.path.join(self.dest, "blog", "post.html")).startswith(
+                "<title>"
+            )
+        )
+
+    def test_rebuild_invalid_page_keeps_output(self):
+        path = os.path.join(self.content, "index.md")
+        self.write(path, "No title yet")
+
+        self.assertEqual(self.builder.rebuild({os.path.abspath(path)}), [])
+        self.assertIn("Welcome.", self.read(os.path.join(self.dest, "index.html")))
+        self.assertEqual([e.rel_path for e in self.builder.errors], ["index.md"])
+
+    def test_rebuild_ignores_other_files(self):
+        path = os.path.join(self.content, "index.md.swp")
+        self.write(path, "")
+
+        self.assertEqual(self.builder.rebuild({os.path.abspath(path)}), [])
+
+    def test_watcher_batches_changes(self):
+        batches = []
+        changed = threading.Event()
+
+        def callback(paths):
+            batches.append(paths)
+            changed.set()
+
+        watcher = SiteWatcher(
+            self.content, self.template, callback, debounce=0.05, poll_interval=0.01
+        )
+        try:
+            self.write(os.path.join(self.content, "index.md"), "# Home\n\nOne.")
+            self.write(os.path.join(self.content, "new.md"), "# New")
+            self.assertTrue(changed.wait(5))
+        finally:
+            watcher.close()
+
+        paths = set().union(*batches)
+        self.assertIn(os.path.abspath(os.path.join(self.content, "index.md")), paths)
+        self.assertIn(os.path.abspath(os.path.join(self.content, "new.md")), paths)
+
+    def test_poller_finds_changes(self):
+        poller = _Poller(self.content)
+        self.assertEqual(poller.poll(), [])
+        post = os.path.join(self.content, "blog", "post.md")
+        page = os.path.join(self.content, "docs", "page.md")
+
+        # an edit in place, found when its slice comes round
+        self.write(post, "# Post\n\nEdited.")
+        os.utime(post, ns=(0, 0))
+        self.assertEqual(poller.poll(), [post])
+        self.assertIn(post, poller.hot)
+
+        self.write(page, "# Page")
+        self.assertEqual(poller.poll(), [page])
+
+        os.remove(os.path.join(self.content, "index.md"))
+        self.assertEqual(poller.poll(), [os.path.join(self.content, "index.md")])
+
+        os.remove(post)
+        os.rmdir(os.path.dirname(post))
+        self.assertEqual(poller.poll(), [post])
+        self.assertNotIn(post, poller.files)
+
+    def test_live_reload_site_injects_script(self):
+        site = LiveReloadSite(self.dest, ReloadBroadcaster())
+        response = site.respond("GET", "/index.html", {"Accept-Encoding": "gzip"})
+
+        self.assertEqual(response.status, HTTPStatus.OK)
+        self.assertTrue(response.body.endswith(LIVE_RELOAD_SCRIPT))
+        self.assertEqual(response.length, len(response.body))
+        site.close()
+
+    def test_inject_script(self):
+        self.assertEqual(
+            inject_script(b"<body><p>x</p></body></html>"),
+            b"<body><p>x</p>" + LIVE_RELOAD_SCRIPT + b"</body></html>",
+        )
+        self.assertEqual(inject_script(b"<p>x</p>"), b"<p>x</p>" + LIVE_RELOAD_SCRIPT)
+
+    def test_reload_broadcaster(self):
+        reloads = ReloadBroadcaster()
+        self.assertEqual(reloads.wait(0, timeout=0), 0)
+
+        threading.Timer(0.01, reloads.notify).start()
+        self.assertEqual(reloads.wait(0, timeout=5), 1)
+
+        reloads.close()
+        self.assertIsNone(reloads.wait(1, timeout=5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+
+import parentnode
+from fragmentcache import FragmentCache
+from leafnode import LeafNode
+from parentnode import ParentNode
+
+
+def notice(text="Read the docs."):
+    return ParentNode(
+        "blockquote",
+        [LeafNode("b", "Note:"), LeafNode(None, " "), LeafNode("i", text)]
+        + [LeafNode(None, f" {i}") for i in range(5)],
+    )
+
+
+class TestFragmentCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = FragmentCache()
+        parentnode.fragment_cache = self.cache
+
+    def tearDown(self):
+        parentnode.fragment_cache = None
+
+    def test_hits_and_misses(self):
+        node = notice()
+        self.assertIsNone(self.cache.get(node))
+        self.cache.put(node, "<blockquote>...</blockquote>")
+
+        self.assertEqual(self.cache.get(node), "<blockquote>...</blockquote>")
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertEqual(self.cache.hit_ratio(), 0.5)
+
+    def test_equal_tree_hits(self):
+        self.cache.put(notice(), "<blockquote>...</blockquote>")
+        self.assertEqual(self.cache.get(notice()), "<blockquote>...</blockquote>")
+        self.assertIsNone(self.cache.get(notice("Other text.")))
+
+    def test_evicts_least_recently_used(self):
+        cache = FragmentCache(max_size=32)
+        cache.max_fragment_size = 16
+        first, second, third = notice("a"), notice("b"), notice("c")
+        cache.put(first, "x" * 16)
+        cache.put(second, "y" * 16)
+        cache.get(first)
+        cache.put(third, "z" * 16)
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.size, 32)
+        self.assertIsNone(cache.get(second))
+        self.assertEqual(cache.get(first), "x" * 16)
+
+    def test_skips_huge_fragments(self):
+        cache = FragmentCache(max_size=32)
+        cache.put(notice(), "x" * 3)
+        self.assertEqual(len(cache), 0)
+
+    def test_to_html_reuses_fragments(self):
+        page = ParentNode("div", [notice(), LeafNode("p", "Text")])
+        other = ParentNode("div", [LeafNode("p", "More"), notice()])
+
+        html = page.to_html()
+        self.assertEqual((self.cache.hits, len(self.cache)), (0, 2))
+        self.assertIn(notice().to_html(), other.to_html())
+        self.assertEqual(self.cache.hits, 2)
+        self.assertEqual(page.to_html(), html)
+        self.assertEqual(self.cache.hits, 3)
+
+    def test_to_html_freezes_cached_tree(self):
+        page = ParentNode("div", [notice(), LeafNode("p", "Text")])
+        page.to_html()
+
+        with self.assertRaises(AttributeError):
+            page.children[0].children[2].value = "Changed."
+        with self.assertRaises(TypeError):
+            page.children.append(LeafNode("p", "More"))
+        more = ParentNode("div", page.children + [LeafNode("p", "More")])
+        self.assertTrue(more.to_html().endswith("<p>More</p></div>"))
+
+    def test_to_html_freezes_props(self):
+        props = {"class": "nav"}
+        page = ParentNode("ul", [notice(), LeafNode("li", "x")], props)
+        html = page.to_html()
+
+        with self.assertRaises(TypeError):
+            page.props["class"] = "changed"
+        props["class"] = "changed"
+        parentnode.fragment_cache = None
+        self.assertEqual(page.to_html(), html)
+        self.assertIn('class="nav"', html)
+
+    def test_to_html_matches_uncached(self):
+        page = ParentNode(
+            "div", [notice(), ParentNode("ul", [notice(), LeafNode("li", "x")])]
+        )
+        cached = page.to_html()
+        parentnode.fragment_cache = None
+        self.assertEqual(page.to_html(), cached)
+
+
+if __name__ == "__main__":
+    unittest.main()
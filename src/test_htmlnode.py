@@ -1,6 +1,6 @@
 import unittest
 
-from htmlnode import HTMLNode
+from htmlnode import HTMLNode, escape_attribute, escape_html
 
 class TestHTMLNode(unittest.TestCase):
     def test_props_to_html(self):
@@ -15,6 +15,36 @@ class TestHTMLNode(unittest.TestCase):
         props_html = ""
         self.assertEqual(node.props_to_html(), props_html)
     
+    def test_props_to_html_escapes_values(self):
+        node = HTMLNode(tag="img", props={"src": "a.png?x=1&y=2", "alt": 'A "cat"'})
+
+        props_html = ' src="a.png?x=1&amp;y=2" alt="A &quot;cat&quot;"'
+        self.assertEqual(node.props_to_html(), props_html)
+        # served from the cache the second time
+        self.assertEqual(node.props_to_html(), props_html)
+
+    def test_props_to_html_cache_keeps_order(self):
+        first = HTMLNode(tag="a", props={"href": "/", "class": "nav"})
+        second = HTMLNode(tag="a", props={"class": "nav", "href": "/"})
+
+        self.assertEqual(first.props_to_html(), ' href="/" class="nav"')
+        self.assertEqual(second.props_to_html(), ' class="nav" href="/"')
+
+    def test_escape_html(self):
+        self.assertEqual(escape_html("a < b && c > d"), "a &lt; b &amp;&amp; c &gt; d")
+        self.assertEqual(escape_html('"quoted"'), '"quoted"')
+        self.assertEqual(escape_html("&lt;"), "&amp;lt;")
+
+    def test_escape_html_returns_clean_text(self):
+        text = "nothing to escape"
+        self.assertIs(escape_html(text), text)
+        self.assertIs(escape_attribute(text), text)
+
+    def test_escape_attribute(self):
+        self.assertEqual(
+            escape_attribute('say "<hi>" & go'), "say &quot;&lt;hi&gt;&quot; &amp; go"
+        )
+
     def test_repr(self):
         props = {"href": "https://www.google.com", "target": "_blank"}
         node = HTMLNode(tag="a", value="Google", props=props)
@@ -22,6 +52,12 @@ class TestHTMLNode(unittest.TestCase):
         node_repr = f"HTMLNode(a, Google, None, {props})"
         self.assertEqual(repr(node), node_repr)
 
+    def test_no_instance_dict(self):
+        node = HTMLNode(tag="p", value="Google")
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = "value"
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
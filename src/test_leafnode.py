@@ -19,6 +19,27 @@ class TestLeafNode(unittest.TestCase):
         node_html = "Raw text."
         self.assertEqual(node.to_html(), node_html)
 
+    def test_render_img_tag_empty_value(self):
+        node = LeafNode("img", "", {"src": "cat.png", "alt": "A cat"})
+        node_html = '<img src="cat.png" alt="A cat"></img>'
+        self.assertEqual(node.to_html(), node_html)
+
+    def test_render_escapes_value(self):
+        node = LeafNode("code", "if a < b && c > d:")
+        node_html = "<code>if a &lt; b &amp;&amp; c &gt; d:</code>"
+        self.assertEqual(node.to_html(), node_html)
+
+    def test_render_raw_text_escaped(self):
+        self.assertEqual(LeafNode(value="<script>").to_html(), "&lt;script&gt;")
+
+    def test_render_no_value(self):
+        error = None
+        try:
+            LeafNode("p").to_html()
+        except ValueError as e:
+            error = str(e)
+        self.assertEqual(error, "Leaf Node requires a non-null value.")
+
 
 if __name__ == "__main__":
     unittest.main()
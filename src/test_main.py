@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from parentnode import ParentNode
@@ -14,6 +15,8 @@ from main import (
     split_nodes_image,
     text_to_textnodes,
     markdown_to_html_node,
+    iter_markdown_blocks,
+    write_markdown_html,
 )
 
 
@@ -278,6 +281,36 @@ class TestMain(unittest.TestCase):
         ]
         self.assertEqual(new_nodes, expected)
 
+    def test_split_nodes_link_repeated(self):
+        node = TextNode(
+            "[docs](https://boot.dev) and [docs](https://boot.dev), then [docs](https://boot.dev/2)",
+            "text",
+        )
+        new_nodes = split_nodes_link([node])
+
+        expected = [
+            TextNode("docs", "link", "https://boot.dev"),
+            TextNode(" and ", "text"),
+            TextNode("docs", "link", "https://boot.dev"),
+            TextNode(", then ", "text"),
+            TextNode("docs", "link", "https://boot.dev/2"),
+        ]
+        self.assertEqual(new_nodes, expected)
+
+    def test_split_nodes_image_skips_other_types(self):
+        nodes = [
+            TextNode("![alt](https://boot.dev/a.png)", "code"),
+            TextNode("![alt](https://boot.dev/a.png) tail", "text"),
+        ]
+        new_nodes = split_nodes_image(nodes)
+
+        expected = [
+            TextNode("![alt](https://boot.dev/a.png)", "code"),
+            TextNode("alt", "image", "https://boot.dev/a.png"),
+            TextNode(" tail", "text"),
+        ]
+        self.assertEqual(new_nodes, expected)
+
     def test_text_to_textnodes(self):
         text = "This is **text** with an *italic* word and a `code block` and an ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)"
         nodes = text_to_textnodes(text)
@@ -364,6 +397,35 @@ class TestMain(unittest.TestCase):
         ]
         self.assertEqual(nodes, expected)
 
+    def test_text_to_textnodes_italic_inside_bold(self):
+        text = "A **bold *and* starred** word"
+        nodes = text_to_textnodes(text)
+        expected = [
+            TextNode("A ", "text"),
+            TextNode("bold *and* starred", "bold"),
+            TextNode(" word", "text"),
+        ]
+        self.assertEqual(nodes, expected)
+
+    def test_text_to_textnodes_link_inside_code(self):
+        text = "Run `[x](y)` then [docs](https://boot.dev)"
+        nodes = text_to_textnodes(text)
+        expected = [
+            TextNode("Run ", "text"),
+            TextNode("[x](y)", "code"),
+            TextNode(" then ", "text"),
+            TextNode("docs", "link", "https://boot.dev"),
+        ]
+        self.assertEqual(nodes, expected)
+
+    def test_text_to_textnodes_unclosed(self):
+        error = None
+        try:
+            text_to_textnodes("This is *italic with **bold** inside*")
+        except ValueError as e:
+            error = str(e)
+        self.assertEqual(error, "Invalid markdown, formatted section not closed")
+
     def test_markdown_to_blocks(self):
         markdown = """# This is a heading
 
@@ -420,6 +482,49 @@ This is a paragraph of text. It has some **bold** and *italic* words inside of i
 
         self.assertEqual(blocks, expected)
 
+    def test_iter_markdown_blocks(self):
+        markdown = """# This is a heading
+
+
+This is a paragraph of text.
+It has two lines.
+
+   
+
+* This is a list item
+* This is another list item
+"""
+        blocks = list(iter_markdown_blocks(io.StringIO(markdown)))
+
+        self.assertEqual(blocks, markdown_to_blocks(markdown))
+
+    def test_iter_markdown_blocks_bytes(self):
+        lines = [b"# Heading\n", b"\n", b"Caf\xc3\xa9 text\n"]
+        blocks = list(iter_markdown_blocks(lines))
+
+        self.assertEqual(blocks, ["# Heading", "Caf\u00e9 text"])
+
+    def test_write_markdown_html(self):
+        markdown = """# This is a heading
+
+This is a paragraph of text. It has some **bold** and *italic* words inside of it.
+
+1. First
+2. Second
+"""
+        out = io.StringIO()
+        write_markdown_html(io.StringIO(markdown), out)
+
+        self.assertEqual(out.getvalue(), markdown_to_html_node(markdown).to_html())
+
+    def test_write_markdown_html_empty(self):
+        error = None
+        try:
+            write_markdown_html(io.StringIO("\n\n"), io.StringIO())
+        except ValueError as e:
+            error = str(e)
+        self.assertEqual(error, "ParentNode children attribute cannot be None.")
+
     def test_is_paragraph(self):
         text = "This is a paragraph."
 
@@ -499,6 +604,26 @@ This is a paragraph of text. It has some **bold** and *italic* words inside of i
 
         self.assertEqual(block_to_block_type(text), "paragraph")
 
+    def test_is_ordered_list_many_items(self):
+        text = "\n".join(f"{i}. Item {i}" for i in range(1, 121))
+
+        self.assertEqual(block_to_block_type(text), "ordered_list")
+
+    def test_is_ordered_list_out_of_order(self):
+        text = "1. First\n2. Second\n4. Fourth"
+
+        self.assertEqual(block_to_block_type(text), "paragraph")
+
+    def test_is_ordered_list_not_starting_at_one(self):
+        text = "2. Second\n3. Third"
+
+        self.assertEqual(block_to_block_type(text), "paragraph")
+
+    def test_is_code_multiline(self):
+        text = "```first line\nsecond line```"
+
+        self.assertEqual(block_to_block_type(text), "paragraph")
+
     def test_markdown_to_html_node_just_heading(self):
         markdown = "# H1 heading."
         html_node = markdown_to_html_node(markdown)
@@ -1,3 +1,8 @@
+import io
+import os
+import pickle
+import subprocess
+import sys
 import unittest
 
 from parentnode import ParentNode
@@ -111,6 +116,141 @@ class TestLeafNode(unittest.TestCase):
             error = str(e)
         self.assertEqual(error, "ParentNode children attribute cannot be None.")
 
+    def test_parent_to_html_props(self):
+        node = ParentNode("div", LeafNode("b", "Bold text"), {"class": "note"})
+        node_html = '<div class="note"><b>Bold text</b></div>'
+        self.assertEqual(node.to_html(), node_html)
+
+    def test_parent_iter_html(self):
+        node = ParentNode(
+            "p",
+            [
+                LeafNode("b", "Bold text"),
+                ParentNode("i", LeafNode(None, "italic text")),
+            ],
+        )
+        chunks = list(node.iter_html())
+        self.assertEqual(
+            chunks, ["<p>", "<b>Bold text</b>", "<i>", "italic text", "</i>", "</p>"]
+        )
+
+    def test_parent_render_to(self):
+        node = ParentNode(
+            "ul",
+            [LeafNode("li", "Item 1"), LeafNode("li", "Item 2")],
+        )
+        out = io.StringIO()
+        node.render_to(out)
+        self.assertEqual(out.getvalue(), node.to_html())
+
+    def test_parent_to_html_beyond_recursion_limit(self):
+        depth = sys.getrecursionlimit() * 2
+        node = nested_list(depth)
+
+        html = node.to_html()
+        self.assertTrue(html.startswith("<ul><li>0</li><ul><li>1</li>"))
+        self.assertEqual(html.count("</ul>"), depth)
+        self.assertEqual("".join(node.iter_html()), html)
+
+    def test_eq(self):
+        self.assertEqual(nested_list(5), nested_list(5))
+        self.assertNotEqual(nested_list(5), nested_list(4))
+        self.assertNotEqual(
+            ParentNode("p", LeafNode("b", "x")), ParentNode("p", LeafNode("i", "x"))
+        )
+        self.assertNotEqual(ParentNode("p", LeafNode("b", "x")), LeafNode("p", "x"))
+        self.assertNotEqual(ParentNode("p", LeafNode("b", "x")), "<p><b>x</b></p>")
+
+    def test_eq_beyond_recursion_limit(self):
+        depth = sys.getrecursionlimit() * 2
+        self.assertEqual(nested_list(depth), nested_list(depth))
+
+    def test_hash(self):
+        first = ParentNode("a", LeafNode("b", "x"), {"href": "/", "class": "nav"})
+        second = ParentNode("a", LeafNode("b", "x"), {"class": "nav", "href": "/"})
+
+        self.assertEqual(hash(first), hash(second))
+        self.assertEqual(len({first, second, nested_list(3), nested_list(3)}), 2)
+        self.assertNotEqual(hash(nested_list(3)), hash(nested_list(4)))
+        self.assertEqual(
+            hash(nested_list(sys.getrecursionlimit() * 2)),
+            hash(nested_list(sys.getrecursionlimit() * 2)),
+        )
+
+    def test_hash_freezes_tree(self):
+        node = nested_list(3)
+        inner = node.children[1].children[1]
+        before = hash(node)
+
+        with self.assertRaises(AttributeError):
+            inner.children[0].value = "changed"
+        with self.assertRaises(TypeError):
+            inner.children.append(LeafNode("li", "3"))
+        with self.assertRaises(AttributeError):
+            node.tag = "ol"
+        self.assertEqual(hash(node), before)
+        self.assertEqual(node.fingerprint()[1], 6)
+
+        copy = pickle.loads(pickle.dumps(node))
+        copy.children[1].children[1].children.append(LeafNode("li", "3"))
+        self.assertNotEqual(hash(copy), before)
+        self.assertEqual(copy.fingerprint()[1], 7)
+
+    def test_hash_freezes_props(self):
+        props = {"href": "/", "class": "nav"}
+        link = LeafNode("a", "Home", props)
+        node = ParentNode("nav", [link], {"class": "top"})
+        before = hash(node)
+
+        with self.assertRaises(TypeError):
+            link.props["class"] = "changed"
+        with self.assertRaises(TypeError):
+            node.props.update({"id": "menu"})
+        props["class"] = "changed"
+        self.assertEqual(hash(node), before)
+        self.assertEqual(
+            node.to_html(), '<nav class="top"><a href="/" class="nav">Home</a></nav>'
+        )
+        self.assertEqual(link.props, {"href": "/", "class": "nav"})
+
+        copy = pickle.loads(pickle.dumps(node))
+        copy.children[0].props["class"] = "changed"
+        self.assertNotEqual(hash(copy), before)
+
+    def test_fingerprint_is_stable_across_processes(self):
+        code = (
+            "from test_parentnode import nested_list; "
+            "print(nested_list(3).fingerprint()[0])"
+        )
+        digests = {
+            subprocess.run(
+                [sys.executable, "-c", code],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                env={**os.environ, "PYTHONHASHSEED": seed},
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            for seed in ("1", "2")
+        }
+        self.assertEqual(digests, {nested_list(3).fingerprint()[0] + "\n"})
+
+    def test_pickle_drops_cached_hash(self):
+        node = nested_list(3)
+        hash(node)
+        copy = pickle.loads(pickle.dumps(node))
+
+        self.assertIsNone(copy._hash)
+        self.assertEqual(copy, node)
+        self.assertEqual(hash(copy), hash(node))
+
+
+def nested_list(depth):
+    node = ParentNode("ul", LeafNode("li", str(depth - 1)))
+    for i in reversed(range(depth - 1)):
+        node = ParentNode("ul", [LeafNode("li", str(i)), node])
+    return node
+
 
 if __name__ == "__main__":
     unittest.main()
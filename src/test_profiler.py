@@ -0,0 +1,84 @@
+import json
+import os
+import unittest
+
+import main
+from build import build
+from leafnode import LeafNode
+from parentnode import ParentNode
+from profiler import PHASES, BuildProfile, count_nodes, profile_page
+from sitetest import SiteTestCase
+
+
+class TestProfiler(SiteTestCase):
+    PAGES = {
+        **SiteTestCase.PAGES,
+        os.path.join("blog", "post.md"): "# Post\n\nSome *text*.\n\n* one\n* **two**",
+    }
+
+    def test_profile_matches_build(self):
+        plain_dest = os.path.join(self.tmp.name, "plain")
+        build(self.content, plain_dest, self.template)
+        profile = BuildProfile()
+        build(self.content, self.dest, self.template, profile=profile)
+
+        for name in ("index.html", os.path.join("blog", "post.html")):
+            self.assertEqual(
+                self.read(os.path.join(self.dest, name)),
+                self.read(os.path.join(plain_dest, name)),
+            )
+
+    def test_profile_records_pages(self):
+        profile = BuildProfile()
+        build(self.content, self.dest, self.template, profile=profile)
+
+        pages = {page["page"]: page for page in profile.pages}
+        post = pages[os.path.join("blog", "post.md")]
+        self.assertEqual(set(post["phases"]), set(PHASES))
+        self.assertEqual(post["blocks"], 3)
+        self.assertEqual(post["nodes"], 12)
+        self.assertEqual(post["leaves"], 6)
+        self.assertGreater(post["phases"]["inline"]["wall"], 0)
+
+    def test_profile_rebuilds_unchanged_pages(self):
+        build(self.content, self.dest, self.template)
+        profile = BuildProfile()
+
+        built = build(self.content, self.dest, self.template, profile=profile)
+        self.assertEqual(len(built), 2)
+        self.assertEqual(len(profile.pages), 2)
+
+    def test_profile_restores_functions(self):
+        original = main.text_to_textnodes
+        build(self.content, self.dest, self.template, profile=BuildProfile())
+        self.assertIs(main.text_to_textnodes, original)
+
+    def test_report(self):
+        profile = BuildProfile()
+        build(self.content, self.dest, self.template, profile=profile)
+        path = os.path.join(self.tmp.name, "report.json")
+        profile.save(path, top=1, build_seconds=0.5)
+
+        with open(path) as f:
+            report = json.load(f)
+        self.assertEqual(report["pages"], 2)
+        self.assertEqual(report["build_seconds"], 0.5)
+        self.assertEqual(report["slowest"], [profile.slowest(1)[0]["page"]])
+        self.assertEqual(set(report["phases"]), set(PHASES))
+
+    def test_count_nodes(self):
+        node = ParentNode(
+            "pre", ParentNode("code", [LeafNode(value="a"), LeafNode("b", "c")])
+        )
+        self.assertEqual(count_nodes(node), {"nodes": 4, "leaves": 2})
+
+    def test_profile_page(self):
+        stats_path = os.path.join(self.tmp.name, "page.pstats")
+        text = profile_page("# Home\n\n*hi*", stats_path=stats_path)
+
+        self.assertIn("markdown_to_html_node", text)
+        self.assertTrue(os.path.exists(stats_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,546 @@
+import contextlib
+import email.utils
+import gzip
+import http.client
+import io
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from http import HTTPStatus
+
+from assets import fingerprint_assets
+from staticserver import (
+    CachedFile,
+    FileCache,
+    MarkdownSite,
+    Metrics,
+    RangeNotSatisfiable,
+    Response,
+    StaticSite,
+    accepted_encodings,
+    apply_range,
+    can_keep_alive,
+    is_not_modified,
+    make_server,
+    parse_range,
+)
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def touch_later(path):
+    # mtimes can be coarse; make sure a rewrite is seen as a change
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+class TestRanges(unittest.TestCase):
+    def test_parse_range(self):
+        self.assertEqual(parse_range("bytes=0-99", 1000), (0, 99))
+        self.assertEqual(parse_range("bytes=900-", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=900-5000", 1000), (900, 999))
+
+    def test_parse_range_suffix(self):
+        self.assertEqual(parse_range("bytes=-100", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=-5000", 1000), (0, 999))
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range("bytes=-0", 1000)
+
+    def test_parse_range_ignored(self):
+        self.assertIsNone(parse_range("items=0-1", 1000))
+        self.assertIsNone(parse_range("bytes=0-1,5-6", 1000))
+        self.assertIsNone(parse_range("bytes=5-2", 1000))
+        self.assertIsNone(parse_range("bytes=a-b", 1000))
+
+    def test_parse_range_not_satisfiable(self):
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range("bytes=1000-", 1000)
+
+    def test_apply_range(self):
+        response = Response(HTTPStatus.OK, [], body=b"0123456789")
+        response = apply_range(response, {"Range": "bytes=2-4"})
+
+        self.assertEqual(response.status, HTTPStatus.PARTIAL_CONTENT)
+        self.assertEqual(bytes(response.body), b"234")
+        self.assertEqual(response.length, 3)
+        self.assertIn(("Content-Range", "bytes 2-4/10"), response.headers)
+
+    def test_apply_range_not_satisfiable(self):
+        response = Response(HTTPStatus.OK, [], body=b"0123456789")
+        response = apply_range(response, {"Range": "bytes=10-"})
+
+        self.assertEqual(response.status, HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertIn(("Content-Range", "bytes */10"), response.headers)
+
+    def test_apply_range_if_range(self):
+        response = Response(HTTPStatus.OK, [("ETag", '"abc"')], body=b"0123456789")
+        stale = apply_range(response, {"Range": "bytes=2-4", "If-Range": '"old"'})
+        self.assertEqual(stale.status, HTTPStatus.OK)
+
+        fresh = apply_range(response, {"Range": "bytes=2-4", "If-Range": '"abc"'})
+        self.assertEqual(fresh.status, HTTPStatus.PARTIAL_CONTENT)
+
+
+class TestHeaders(unittest.TestCase):
+    def test_is_not_modified_etag(self):
+        self.assertTrue(is_not_modified({"If-None-Match": '"a", "b"'}, '"b"', 0))
+        self.assertTrue(is_not_modified({"If-None-Match": 'W/"b"'}, '"b"', 0))
+        self.assertTrue(is_not_modified({"If-None-Match": "*"}, '"b"', 0))
+        self.assertFalse(is_not_modified({"If-None-Match": '"a"'}, '"b"', 0))
+
+    def test_is_not_modified_since(self):
+        mtime_ns = 1_700_000_000 * 10**9
+        since = email.utils.formatdate(1_700_000_000, usegmt=True)
+        earlier = email.utils.formatdate(1_600_000_000, usegmt=True)
+
+        self.assertTrue(is_not_modified({"If-Modified-Since": since}, '"b"', mtime_ns))
+        self.assertFalse(
+            is_not_modified({"If-Modified-Since": earlier}, '"b"', mtime_ns)
+        )
+        self.assertFalse(is_not_modified({"If-Modified-Since": "soon"}, '"b"', 0))
+        # If-None-Match wins when both are sent
+        self.assertFalse(
+            is_not_modified(
+                {"If-None-Match": '"a"', "If-Modified-Since": since}, '"b"', mtime_ns
+            )
+        )
+
+    def test_accepted_encodings(self):
+        self.assertEqual(accepted_encodings({}), ())
+        self.assertEqual(accepted_encodings({"Accept-Encoding": "gzip"}), ("gzip",))
+        self.assertEqual(
+            accepted_encodings({"Accept-Encoding": "gzip, deflate, br"}),
+            ("br", "gzip"),
+        )
+        self.assertEqual(
+            accepted_encodings({"Accept-Encoding": "br;q=0.5, gzip"}),
+            ("gzip", "br"),
+        )
+        self.assertEqual(accepted_encodings({"Accept-Encoding": "gzip;q=0"}), ())
+        self.assertEqual(
+            accepted_encodings({"Accept-Encoding": "gzip;q=0.5, identity"}), ()
+        )
+        self.assertEqual(accepted_encodings({"Accept-Encoding": "*"}), ("br", "gzip"))
+
+    def test_can_keep_alive(self):
+        self.assertTrue(can_keep_alive("HTTP/1.1", {}))
+        self.assertFalse(can_keep_alive("HTTP/1.1", {"Connection": "close"}))
+        self.assertFalse(can_keep_alive("HTTP/1.0", {}))
+        self.assertTrue(can_keep_alive("HTTP/1.0", {"Connection": "Keep-Alive"}))
+        self.assertFalse(can_keep_alive("HTTP/1.1", {"Content-Length": "12"}))
+        self.assertFalse(
+            can_keep_alive("HTTP/1.1", {"Transfer-Encoding": "chunked"})
+        )
+
+
+class TestMetrics(unittest.TestCase):
+    def test_render(self):
+        metrics = Metrics()
+        metrics.record("/index.html?x=1", 200, 100, 0.0002)
+        metrics.record("/index.html", 304, 0, 3.0)
+        text = metrics.render()
+
+        self.assertIn('static_requests_total{path="/index.html"} 2', text)
+        self.assertIn('static_sent_bytes_total{path="/index.html"} 100', text)
+        self.assertIn('static_responses_total{status="304"} 1', text)
+        self.assertIn('static_request_duration_seconds_bucket{le="0.00025"} 1', text)
+        self.assertIn('static_request_duration_seconds_bucket{le="+Inf"} 2', text)
+        self.assertIn("static_request_duration_seconds_count 2", text)
+
+    def test_render_caches(self):
+        cache = FileCache(1024, check_interval=0)
+        cache.get("/missing")
+        text = Metrics().render({"files": cache})
+
+        self.assertIn('static_cache_misses_total{cache="files"} 1', text)
+        self.assertIn('static_cache_hit_ratio{cache="files"} 0.000000', text)
+
+    def test_bounded_paths(self):
+        metrics = Metrics(max_paths=2)
+        for path in ("/a", "/b", "/c", "/d"):
+            metrics.record(path, 404, 0, 0.001)
+        text = metrics.render()
+
+        self.assertIn('static_requests_total{path="other"} 2', text)
+        self.assertNotIn('path="/c"', text)
+
+    def test_escapes_labels(self):
+        metrics = Metrics()
+        metrics.record('/a"b', 200, 0, 0.001)
+        self.assertIn('path="/a\\"b"', metrics.render())
+
+
+class TestFileCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def entry(self, name, size):
+        path = os.path.join(self.tmp.name, name)
+        write(path, "x" * size)
+        return CachedFile(path, b"x" * size, [], '"etag"', os.stat(path).st_mtime_ns)
+
+    def test_evicts_least_recently_used(self):
+        cache = FileCache(400, check_interval=0)
+        cache.put("/a", self.entry("a", 100))
+        cache.put("/b", self.entry("b", 100))
+        cache.put("/c", self.entry("c", 100))
+        cache.get("/a")
+        cache.put("/d", self.entry("d", 100))
+        cache.put("/e", self.entry("e", 100))
+
+        self.assertEqual(cache.size, 400)
+        self.assertIsNone(cache.get("/b"))
+        self.assertIsNotNone(cache.get("/a"))
+
+    def test_skips_big_files(self):
+        cache = FileCache(400, check_interval=0)
+        cache.put("/big", self.entry("big", 101))
+        self.assertIsNone(cache.get("/big"))
+        self.assertEqual(cache.size, 0)
+
+    def test_drops_changed_files(self):
+        cache = FileCache(400, check_interval=0)
+        entry = self.entry("a", 10)
+        cache.put("/a", entry)
+        touch_later(entry.path)
+
+        self.assertIsNone(cache.get("/a"))
+        self.assertEqual((cache.hits, cache.misses, cache.size), (0, 1, 0))
+
+
+class TestStaticSite(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        write(os.path.join(self.root, "index.html"), "<p>Home</p>" * 200)
+        write(os.path.join(self.root, "styles.css"), "body { color: red; }")
+        write(os.path.join(self.root, "notes.20241018.css"), "p { margin: 0; }")
+        write(os.path.join(self.root, "blog", "index.html"), "<p>Blog</p>")
+        self.site = StaticSite(self.root, metrics=Metrics())
+
+    def tearDown(self):
+        self.site.close()
+        self.tmp.cleanup()
+
+    def get(self, target, headers=None):
+        response = self.site.respond("GET", target, headers or {})
+        if response.file is not None:
+            with response.file:
+                response.file.seek(response.offset)
+                response.body = response.file.read(response.length)
+            response.file = None
+        return response
+
+    def header(self, response, name):
+        return dict(response.headers).get(name)
+
+    def test_serves_file(self):
+        response = self.get("/styles.css")
+
+        self.assertEqual(response.status, HTTPStatus.OK)
+        self.assertEqual(response.body, b"body { color: red; }")
+        self.assertEqual(self.header(response, "Content-Type"), "text/css")
+        self.assertEqual(self.header(response, "Cache-Control"), "no-cache")
+
+    def test_not_modified(self):
+        etag = self.header(self.get("/styles.css"), "ETag")
+        response = self.get("/styles.css", {"If-None-Match": etag})
+
+        self.assertEqual(response.status, HTTPStatus.NOT_MODIFIED)
+        self.assertIsNone(response.length)
+
+    def test_range(self):
+        response = self.get("/styles.css", {"Range": "bytes=-4"})
+
+        self.assertEqual(response.status, HTTPStatus.PARTIAL_CONTENT)
+        self.assertEqual(bytes(response.body), b"d; }")
+
+    def test_compresses_on_the_fly(self):
+        response = self.get("/index.html", {"Accept-Encoding": "gzip"})
+
+        self.assertEqual(self.header(response, "Content-Encoding"), "gzip")
+        self.assertEqual(self.header(response, "Vary"), "Accept-Encoding")
+        self.assertLess(response.length, 2200)
+
+    def test_cached_sibling_follows_original(self):
+        site = StaticSite(self.root, cache=FileCache(2**20, check_interval=0))
+        self.addCleanup(site.close)
+        page = os.path.join(self.root, "page.html")
+        write(page, "<p>old</p>")
+        with gzip.open(page + ".gz", "wb") as f:
+            f.write(b"<p>old</p>")
+        os.utime(page, ns=(0, 10**9))
+        os.utime(page + ".gz", ns=(0, 2 * 10**9))
+        gzip_only = {"Accept-Encoding": "gzip"}
+        old = site.respond("GET", "/page.html", gzip_only)
+        self.assertEqual(gzip.decompress(old.body), b"<p>old</p>")
+
+        write(page, "<p>new</p>")
+        os.utime(page, ns=(0, 3 * 10**9))
+        new = site.respond("GET", "/page.html", gzip_only)
+        self.assertIsNone(self.header(new, "Content-Encoding"))
+        self.assertEqual(bytes(new.body), b"<p>new</p>")
+
+    def test_caches_uncompressible_types_once(self):
+        site = StaticSite(self.root, cache=FileCache(2**20, check_interval=0))
+        self.addCleanup(site.close)
+        write(os.path.join(self.root, "logo.png"), "x" * 5000)
+        for accept_encoding in ("", "gzip", "br", "gzip, br"):
+            response = site.respond(
+                "GET", "/logo.png", {"Accept-Encoding": accept_encoding}
+            )
+            self.assertIsNone(self.header(response, "Content-Encoding"))
+        response = site.respond("GET", "/blog/", {"Accept-Encoding": "gzip"})
+        self.assertEqual(bytes(response.body), b"<p>Blog</p>")
+
+        self.assertEqual(site.cache.size, 5000 + len(b"<p>Blog</p>"))
+        self.assertEqual((site.cache.hits, site.cache.misses), (3, 2))
+
+    def test_directories(self):
+        moved = self.get("/blog?page=2")
+        self.assertEqual(moved.status, HTTPStatus.MOVED_PERMANENTLY)
+        self.assertEqual(self.header(moved, "Location"), "/blog/?page=2")
+
+        self.assertEqual(self.get("/blog/").body, b"<p>Blog</p>")
+        self.assertEqual(self.get("/missing/").status, HTTPStatus.NOT_FOUND)
+        self.assertEqual(self.get("/../index.html").status, HTTPStatus.OK)
+
+    def test_not_implemented(self):
+        response = self.site.respond("POST", "/index.html", {})
+        self.assertEqual(response.status, HTTPStatus.NOT_IMPLEMENTED)
+
+    def test_immutable_only_for_manifest_copies(self):
+        fingerprints = fingerprint_assets(self.root)
+
+        copy = self.get("/" + fingerprints["styles.css"])
+        self.assertEqual(
+            self.header(copy, "Cache-Control"), "public, max-age=31536000, immutable"
+        )
+        # named like a fingerprinted copy, but only listed as an original
+        lookalike = self.get("/notes.20241018.css")
+        self.assertEqual(self.header(lookalike, "Cache-Control"), "no-cache")
+
+    def test_metrics(self):
+        response = self.get("/__metrics")
+
+        self.assertEqual(response.status, HTTPStatus.OK)
+        self.assertEqual(self.header(response, "Cache-Control"), "no-store")
+        self.assertIn(b'cache="compressed"', bytes(response.body))
+
+
+class TestMarkdownSite(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.public = os.path.join(self.tmp.name, "public")
+        write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome.")
+        write(os.path.join(self.public, "styles.css"), "body {}")
+        self.site = MarkdownSite(
+            self.public, self.content, page_cache=FileCache(2**20, check_interval=0)
+        )
+
+    def tearDown(self):
+        self.site.close()
+        self.tmp.cleanup()
+
+    def test_renders_pages(self):
+        for target in ("/", "/index.html", "/index", "/"):
+            response = self.site.respond("GET", target, {})
+            self.assertEqual(response.status, HTTPStatus.OK)
+            self.assertEqual(
+                bytes(response.body), b"<div><h1>Home</h1><p>Welcome.</p></div>"
+            )
+        # pages are cached by URL path
+        self.assertEqual(self.site.renders, 3)
+
+        static = self.site.respond("GET", "/styles.css", {})
+        static.close()
+        self.assertEqual(static.status, HTTPStatus.OK)
+        self.assertEqual(
+            self.site.respond("GET", "/missing.html", {}).status,
+            HTTPStatus.NOT_FOUND,
+        )
+
+    def test_rerenders_changed_source(self):
+        self.site.respond("GET", "/", {})
+        path = os.path.join(self.content, "index.md")
+        write(path, "# Home\n\nChanged.")
+        touch_later(path)
+
+        response = self.site.respond("GET", "/", {})
+        self.assertIn(b"Changed.", bytes(response.body))
+        self.assertEqual(self.site.renders, 2)
+
+    def test_coalesces_concurrent_renders(self):
+        started = threading.Event()
+        release = threading.Event()
+        render_page = self.site._render_page
+
+        def slow_render(markdown, template):
+            started.set()
+            release.wait(5)
+            return render_page(markdown, template)
+
+        self.site._render_page = slow_render
+        responses = []
+
+        def request():
+            responses.append(self.site.respond("GET", "/", {}))
+
+        threads = [threading.Thread(target=request) for _ in range(4)]
+        threads[0].start()
+        self.assertTrue(started.wait(5))
+        for thread in threads[1:]:
+            thread.start()
+        # let the others reach the render in progress
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(self.site.renders, 1)
+        self.assertEqual(len(responses), 4)
+        self.assertTrue(all(r.status == HTTPStatus.OK for r in responses))
+
+    def test_template_change_during_render(self):
+        template = os.path.join(self.tmp.name, "template.html")
+        write(template, "<p>old</p>{{ Content }}")
+        os.utime(template, ns=(0, 10**9))
+        site = MarkdownSite(
+            self.public,
+            self.content,
+            template,
+            page_cache=FileCache(2**20, check_interval=0),
+        )
+        self.addCleanup(site.close)
+        started = threading.Event()
+        release = threading.Event()
+        render_page = site._render_page
+
+        def slow_render(markdown, template):
+            started.set()
+            release.wait(5)
+            return render_page(markdown, template)
+
+        site._render_page = slow_render
+        thread = threading.Thread(target=site.respond, args=("GET", "/", {}))
+        thread.start()
+        self.assertTrue(started.wait(5))
+        write(template, "<p>new</p>{{ Content }}")
+        os.utime(template, ns=(0, 2 * 10**9))
+        site.load_template()
+        release.set()
+        thread.join(5)
+
+        site._render_page = render_page
+        response = site.respond("GET", "/", {})
+        self.assertTrue(bytes(response.body).startswith(b"<p>new</p>"))
+        self.assertEqual(site.renders, 2)
+
+    def test_invalid_page(self):
+        write(os.path.join(self.content, "broken.md"), "Some *unclosed text")
+        response = self.site.respond("GET", "/broken.html", {})
+        self.assertEqual(response.status, HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
+class TestServers(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        write(os.path.join(self.tmp.name, "index.html"), "<p>Home</p>")
+        self.site = StaticSite(self.tmp.name)
+
+    def tearDown(self):
+        self.site.close()
+        self.tmp.cleanup()
+
+    def serve(self, mode, keep_alive=False, **kwargs):
+        httpd = make_server(
+            self.site, port=0, mode=mode, keep_alive=keep_alive, **kwargs
+        )
+        thread = threading.Thread(target=httpd.serve_forever)
+        thread.start()
+
+        def stop():
+            httpd.shutdown()
+            httpd.server_close()
+            thread.join()
+
+        self.addCleanup(stop)
+        return httpd.server_address[1]
+
+    def test_modes(self):
+        for mode in ("single", "threaded", "pool", "asyncio"):
+            with self.subTest(mode=mode):
+                connection = http.client.HTTPConnection("127.0.0.1", self.serve(mode))
+                connection.request("GET", "/")
+                response = connection.getresponse()
+                self.assertEqual(response.status, HTTPStatus.OK)
+                self.assertEqual(response.read(), b"<p>Home</p>")
+                connection.close()
+
+    def test_keep_alive(self):
+        for mode in ("threaded", "asyncio"):
+            with self.subTest(mode=mode):
+                port = self.serve(mode, keep_alive=True)
+                connection = http.client.HTTPConnection("127.0.0.1", port)
+                for _ in range(3):
+                    connection.request("GET", "/index.html")
+                    response = connection.getresponse()
+                    self.assertEqual(response.getheader("Connection"), "keep-alive")
+                    self.assertEqual(response.read(), b"<p>Home</p>")
+                # still the socket the first request opened
+                self.assertIsNotNone(connection.sock)
+                connection.close()
+
+    def test_keep_alive_timeout_is_quiet(self):
+        port = self.serve("threaded", keep_alive=True, keep_alive_timeout=0.05)
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            with socket.create_connection(("127.0.0.1", port)) as sock:
+                sock.sendall(b"GET / HTTP/1.1\r\nHost: localhost\r\n\r\n")
+                sock.settimeout(5)
+                # the response, then EOF once the server times out
+                while sock.recv(4096):
+                    pass
+
+        self.assertEqual(stderr.getvalue(), "")
+
+    def test_records_metrics(self):
+        self.site.metrics = Metrics()
+        connection = http.client.HTTPConnection("127.0.0.1", self.serve("threaded"))
+        connection.request("GET", "/index.html")
+        connection.getresponse().read()
+        # a request is recorded once its response is out, so the client can
+        # ask before it is counted
+        expected = 'static_requests_total{path="/index.html"} 1'
+        for _ in range(100):
+            connection.request("GET", "/__metrics")
+            text = connection.getresponse().read().decode()
+            if expected in text:
+                break
+            time.sleep(0.01)
+        connection.close()
+
+        self.assertIn(expected, text)
+        self.assertIn('static_sent_bytes_total{path="/index.html"} 11', text)
+
+    def test_keep_alive_needs_threads(self):
+        for mode in ("single", "pool"):
+            with self.assertRaises(ValueError):
+                make_server(self.site, port=0, mode=mode, keep_alive=True)
+        with self.assertRaises(ValueError):
+            make_server(self.site, port=0, mode="forking")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import io
+import os
+import tempfile
+import unittest
+
+from leafnode import LeafNode
+from main import markdown_to_html_node
+from parentnode import ParentNode
+from template import (
+    Template,
+    TemplateSet,
+    add_toc,
+    extract_title,
+    page_title,
+    unique_slug,
+)
+
+
+class TestTemplate(unittest.TestCase):
+    def test_compile(self):
+        template = Template("<title>{{ Title }}</title>{{Content}}!")
+
+        self.assertEqual(template.chunks, [b"<title>", None, b"</title>", None, b"!"])
+        self.assertEqual(template.slots, ((1, "Title"), (3, "Content")))
+        self.assertEqual(template.names, {"Title", "Content"})
+
+    def test_render(self):
+        template = Template("<title>{{ Title }}</title>{{  Content }}")
+        values = {"Title": b"Home", "Content": b"<p>hi</p>"}
+
+        self.assertEqual(template.render(values), b"<title>Home</title><p>hi</p>")
+        out = io.BytesIO()
+        template.render_to(out, values)
+        self.assertEqual(out.getvalue(), b"<title>Home</title><p>hi</p>")
+
+    def test_render_repeated_slot(self):
+        template = Template("{{ Title }}|{{ Title }}")
+        self.assertEqual(template.render({"Title": b"x"}), b"x|x")
+
+    def test_other_placeholders_kept(self):
+        template = Template("{{ Author }}{{ Content }}")
+        self.assertEqual(template.render({"Content": b"c"}), b"{{ Author }}c")
+
+    def test_render_page(self):
+        markdown = "# Home\n\n## First part\n\ntext\n\n## First part"
+        template = Template("<title>{{ Title }}</title>{{ TOC }}")
+
+        self.assertEqual(
+            template.render_page(markdown, markdown_to_html_node(markdown)),
+            b'<title>Home</title><ul class="toc">'
+            b'<li class="toc-h2"><a href="#first-part">First part</a></li>'
+            b'<li class="toc-h2"><a href="#first-part-2">First part</a></li></ul>',
+        )
+
+    def test_render_page_without_title_slot(self):
+        # pages need no h1 when the template has no title
+        template = Template("{{ Content }}")
+        node = markdown_to_html_node("text")
+        self.assertEqual(template.render_page("text", node), b"<div><p>text</p></div>")
+
+    def test_digest(self):
+        self.assertEqual(Template("a").digest, Template(b"a").digest)
+        self.assertNotEqual(Template("a").digest, Template("b").digest)
+
+    def test_add_toc(self):
+        node = markdown_to_html_node("# Title\n\n## A **bold** move\n\n### Details")
+        with_ids, toc = add_toc(node)
+
+        self.assertEqual(
+            with_ids.to_html(),
+            '<div><h1>Title</h1><h2 id="a-bold-move">A <b>bold</b> move</h2>'
+            '<h3 id="details">Details</h3></div>',
+        )
+        self.assertIn('<a href="#details">Details</a>', toc)
+        # the original tree, which a block cache may share, is untouched
+        self.assertNotIn("id=", node.to_html())
+
+    def test_add_toc_without_headings(self):
+        node = ParentNode("div", [LeafNode("p", "text")])
+        self.assertEqual(add_toc(node)[1], "")
+
+    def test_unique_slug(self):
+        seen = set()
+        self.assertEqual(unique_slug("Hello, World!", seen), "hello-world")
+        self.assertEqual(unique_slug("hello world", seen), "hello-world-2")
+        self.assertEqual(unique_slug("!!!", seen), "section")
+
+    def test_extract_title(self):
+        self.assertEqual(extract_title("Intro\n\n# Hello  \n\n## Sub"), "Hello")
+
+    def test_page_title(self):
+        self.assertEqual(
+            page_title("# Fish & <Chips> **now** [here](/x)"),
+            "Fish &amp; &lt;Chips&gt; now here",
+        )
+
+    def test_render_page_escapes_title(self):
+        markdown = "# Fish & <Chips> **now**"
+        template = Template("<title>{{ Title }}</title>")
+        self.assertEqual(
+            template.render_page(markdown, markdown_to_html_node(markdown)),
+            b"<title>Fish &amp; &lt;Chips&gt; now</title>",
+        )
+
+    def test_extract_title_missing(self):
+        error = None
+        try:
+            extract_title("## Not a title")
+        except ValueError as e:
+            error = str(e)
+        self.assertEqual(error, "Page requires an h1 heading to use as its title.")
+
+
+class TestTemplateSet(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.default = os.path.join(self.tmp.name, "template.html")
+        self.blog = os.path.join(self.content, "blog", "_template.html")
+        self.write(self.default, "{{ Content }}")
+        self.write(self.blog, "<article>{{ Content }}</article>")
+        os.makedirs(os.path.join(self.content, "blog", "2024"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def test_nearest_template(self):
+        templates = TemplateSet(self.content, self.default)
+
+        self.assertEqual(templates.path_for("index.md"), self.default)
+        self.assertEqual(templates.path_for(os.path.join("blog", "a.md")), self.blog)
+        self.assertEqual(
+            templates.path_for(os.path.join("blog", "2024", "b.md")), self.blog
+        )
+
+    def test_templates_compiled_once(self):
+        templates = TemplateSet(self.content, self.default)
+        self.assertIs(
+            templates.for_page(os.path.join("blog", "a.md")),
+            templates.for_page(os.path.join("blog", "2024", "b.md")),
+        )
+
+    def test_no_template(self):
+        self.assertIsNone(TemplateSet(self.content).for_page("index.md"))
+
+
+if __name__ == "__main__":
+    unittest.main()
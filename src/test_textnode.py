@@ -27,6 +27,12 @@ class TestTextNode(unittest.TestCase):
         text = "TextNode(This is a text node, bold, None)"
         self.assertEqual(repr(node), text)
 
+    def test_no_instance_dict(self):
+        node = TextNode("This is a text node", "bold")
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = "value"
+
 
 if __name__ == "__main__":
     unittest.main()